@@ -85,7 +85,7 @@ class AtlasPopulator:
             logger.error(f"Error creating bulk entities: {e}")
             return []
 
-    def create_data_source_entity(self, row: pd.Series) -> Dict[str, Any]:
+    def create_data_source_entity(self, row: Dict[str, Any]) -> Dict[str, Any]:
         """Create a DataSource entity from Référentiel Sources sheet"""
         guid = str(uuid.uuid4())
         return {
@@ -119,7 +119,7 @@ class AtlasPopulator:
             }
         }
 
-    def create_glossary_term_entity(self, row: pd.Series) -> Dict[str, Any]:
+    def create_glossary_term_entity(self, row: Dict[str, Any]) -> Dict[str, Any]:
         """Create a GlossaryTerm entity from Glossaire Métier sheet"""
         guid = str(uuid.uuid4())
         return {
@@ -143,7 +143,7 @@ class AtlasPopulator:
             }
         }
 
-    def create_technical_field_entity(self, row: pd.Series) -> Dict[str, Any]:
+    def create_technical_field_entity(self, row: Dict[str, Any]) -> Dict[str, Any]:
         """Create a Column entity from Réf technique sheet"""
         guid = str(uuid.uuid4())
         return {
@@ -166,7 +166,7 @@ class AtlasPopulator:
             }
         }
 
-    def create_data_flow_entity(self, row: pd.Series) -> Dict[str, Any]:
+    def create_data_flow_entity(self, row: Dict[str, Any]) -> Dict[str, Any]:
         """Create a Process entity from Référentiel Flux sheet"""
         guid = str(uuid.uuid4())
         return {
@@ -210,26 +210,27 @@ class AtlasPopulator:
             for sheet_name, df in all_sheets.items():
                 logger.info(f"Processing sheet: {sheet_name} ({len(df)} rows)")
                 df = df.fillna('')  # Replace NaN with empty strings
+                rows = df.to_dict(orient='records')  # One bulk conversion instead of df.iterrows()
                 
                 entities = []
                 
                 if sheet_name == 'Référentiel Sources':
-                    for _, row in df.iterrows():
+                    for row in rows:
                         entity = self.create_data_source_entity(row)
                         entities.append(entity)
                         
                 elif sheet_name == 'Glossaire Métier':
-                    for _, row in df.iterrows():
+                    for row in rows:
                         entity = self.create_glossary_term_entity(row)
                         entities.append(entity)
                         
                 elif sheet_name == 'Réf technique':
-                    for _, row in df.iterrows():
+                    for row in rows:
                         entity = self.create_technical_field_entity(row)
                         entities.append(entity)
                         
                 elif sheet_name == 'Référentiel Flux':
-                    for _, row in df.iterrows():
+                    for row in rows:
                         entity = self.create_data_flow_entity(row)
                         entities.append(entity)
                 
@@ -23,6 +23,14 @@ except ImportError as e:
     logging.error("Please install: pip install qdrant-client sentence-transformers")
     sys.exit(1)
 
+# Optional: shared embedding cache from the main project (available when run from the
+# repository; the scripts container only ships this folder and encodes everything)
+try:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    from api.core.embedding_cache import EmbeddingCache, encode_with_cache
+except ImportError:
+    EmbeddingCache = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -56,6 +64,15 @@ class AtlasToQdrantSyncer:
         self.embedding_model = SentenceTransformer(embedding_model_name)
         logger.info("Embedding model loaded successfully")
 
+        # Embedding cache shared with the other ingestion paths (if the main project is importable)
+        self.embedding_cache = None
+        cache_dir = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "api", "embedding_cache"))
+        if EmbeddingCache is not None:
+            try:
+                self.embedding_cache = EmbeddingCache(cache_dir, embedding_model_name, self.embedding_model.get_sentence_embedding_dimension())
+            except OSError as e:
+                logger.warning(f"Embedding cache unavailable at {cache_dir}: {e}")
+
     def wait_for_atlas(self, max_retries: int = 30) -> bool:
         """Wait for Atlas to be ready"""
         logger.info("Waiting for Atlas to be ready...")
@@ -240,6 +257,11 @@ class AtlasToQdrantSyncer:
         # Add all custom attributes to metadata
         for key, value in custom_attributes.items():
             metadata[f"custom_{key}"] = str(value) if value else ""
+
+        # Lineage of Process entities (read by the API lineage graph)
+        if entity.get("typeName") == "Process":
+            metadata["lineage_inputs"] = self._qualified_names(attributes.get("inputs"))
+            metadata["lineage_outputs"] = self._qualified_names(attributes.get("outputs"))
         
         return {
             "id": guid,
@@ -247,6 +269,16 @@ class AtlasToQdrantSyncer:
             "metadata": metadata
         }
 
+    @staticmethod
+    def _qualified_names(object_ids: Optional[List[Dict[str, Any]]]) -> List[str]:
+        """qualifiedNames of the entities referenced by a Process inputs/outputs attribute"""
+        names = []
+        for object_id in object_ids or []:
+            qualified_name = (object_id.get("uniqueAttributes") or {}).get("qualifiedName") if isinstance(object_id, dict) else None
+            if qualified_name:
+                names.append(qualified_name)
+        return names
+
     def sync_to_qdrant(self, entities: List[Dict[str, Any]]) -> bool:
         """Sync Atlas entities to Qdrant"""
         try:
@@ -268,7 +300,10 @@ class AtlasToQdrantSyncer:
                 return True
             
             logger.info(f"Generating embeddings for {len(texts_to_embed)} entities...")
-            embeddings = self.embedding_model.encode(texts_to_embed, show_progress_bar=True)
+            if self.embedding_cache is not None:
+                embeddings = encode_with_cache(self.embedding_model, texts_to_embed, self.embedding_cache, show_progress_bar=True)
+            else:
+                embeddings = self.embedding_model.encode(texts_to_embed, show_progress_bar=True)
             
             # Create Qdrant points
             logger.info("Creating Qdrant points...")
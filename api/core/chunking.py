@@ -0,0 +1,204 @@
+# api/core/chunking.py
+"""
+Columnar text-chunk builder shared by every Excel ingestion path
+(admin catalog upload, conversation file upload, embeddata.py).
+
+Chunks are rendered sheet by sheet with vectorized pandas string operations
+instead of `df.iterrows()` + per-row f-strings. This module only depends on
+pandas/NumPy so standalone scripts can import it without loading the API.
+
+Catalog rows can also carry a stable identity (row_key + content_hash) so that
+re-uploads only re-embed the rows that actually changed.
+"""
+import hashlib
+import json
+import re
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Chunk styles
+CATALOG_STYLE = "catalog"  # Templates per catalog sheet (admin upload, embeddata.py)
+FILE_STYLE = "file"        # "Sheet: X" + "colonne: valeur" lines (user files)
+
+# One template per catalog sheet; {Colonne} is replaced by the cell value,
+# or 'N/A' when the column is missing from the sheet.
+SHEET_TEMPLATES: Dict[str, str] = {
+    'Référentiel Sources': (
+        "Source: {Nom source} ({Type Source} sur {Plateforme source}). "
+        "Flux: {Flux/Scénario SD}. "
+        "Domaine: {Domaine} / {Sous domaine}. "
+        "Application source: {Application Source}. "
+        "Cible: {Plateforme cible} ({Nom cible}). "
+        "Chargement: {Mode chargement} ({Fréquence MAJ}) via {Technologie de chargement(Outil)} ({Technologie}). "
+        "Procédure: {Nom Flux/Procedure}. "
+        "Taille: {Taille Objet}. Format: {Format}. "
+        "Description: {Description}. "
+        "Filiale: {Filiale}."
+    ),
+    'Glossaire Métier': (
+        "Terme métier: {Libellé Métier}. Propriétaire: {Propriétaire}. "
+        "Description: {Description}. Confidentialité: {Confidentialité}. "
+        "Règle métier: {Règle métier}. "
+        "Criticité: {Criticité}. "
+        "Qualité adressée: {Aspect de performance adressé (Qualité)}. "
+        "Commentaire: {Commentaire}."
+    ),
+    'Réf technique': (
+        "Champ technique: {Libellé champ} dans la source {Nom source} (Plateforme: {Plateforme}). "
+        "Type: {Type}({Taille}). Obligatoire: {Obligatoire}. "
+        "Confidentialité: {Confidentialité}. Règle métier: {Règle métier}. "
+        "Libellé métier: {Libellé Métier}. "
+        "Commentaire: {Commentaire}."
+    ),
+    'Référentiel Flux': (
+        "Traitement dans Flux: {Nom Flux}. Champ source: {Nom Champ SD Source} (de {Nom SD Source} sur {Plateforme source}). "
+        "Règle: {Règle de Gestion}. Champ cible: {Nom Champ Cible} (vers {Nom SD Cible} sur {Plateforme cible}). "
+        "Confidentialité: {Confidentialité}. Description traitement: {Description traitement}. "
+        "Commentaire: {Commentaire}."
+    ),
+}
+
+# Columns identifying a catalog row within its sheet (business key).
+# Sheets without a declared key fall back to the whole row content.
+SHEET_KEY_COLUMNS: Dict[str, List[str]] = {
+    'Référentiel Sources': ['Nom Flux/Procedure'],
+    'Glossaire Métier': ['Libellé Métier', 'Propriétaire'],
+    'Réf technique': ['Nom source', 'Libellé champ'],
+    'Référentiel Flux': ['Nom Flux', 'Nom Champ SD Source', 'Nom Champ Cible'],
+}
+
+# Browse filters (catalog browse API) -> original_data columns they match, across sheets.
+# Written as payload["facets"] (flat keys, keyword-indexed in Qdrant) since the column
+# names hold spaces/accents and one filter may span several columns.
+CATALOG_FACET_COLUMNS: Dict[str, List[str]] = {
+    'filiale': ['Filiale'],
+    'plateforme': ['Plateforme', 'Plateforme source', 'Plateforme cible'],
+    'domaine': ['Domaine', 'Sous domaine'],
+    'technologie': ['Technologie', 'Technologie de chargement(Outil)'],
+}
+
+# Fixed namespace so that a (sheet, row key) pair always maps to the same Qdrant point id
+CATALOG_POINT_NAMESPACE = uuid.UUID("5b0f6a52-3c1e-4f4e-9a57-2d3f0c7e8a11")
+
+_PLACEHOLDER_PATTERN = re.compile(r'\{([^{}]+)\}')
+
+
+def _render_template(df: pd.DataFrame, template: str) -> pd.Series:
+    """Renders a sheet template for all rows at once (column-wise concatenation)."""
+    parts = _PLACEHOLDER_PATTERN.split(template)  # literals at even positions, columns at odd ones
+    rendered = pd.Series(parts[0], index=df.index, dtype=object)
+    for i in range(1, len(parts), 2):
+        column = parts[i]
+        values = df[column] if column in df.columns else 'N/A'
+        rendered = rendered + values + parts[i + 1]
+    return rendered
+
+
+def _render_key_values(df: pd.DataFrame, separator: str, prefix: str = "") -> pd.Series:
+    """Renders 'colonne: valeur' pairs of non-empty cells, joined by `separator`."""
+    rendered = pd.Series(prefix, index=df.index, dtype=object)
+    for position, column in enumerate(df.columns):
+        values = df.iloc[:, position]
+        non_empty = (values.str.strip() != '').to_numpy()
+        rendered = rendered + np.where(non_empty, f"{column}: " + values + separator, '')
+    if separator and not prefix:
+        # Drop the trailing separator (equivalent to separator.join(parts))
+        rendered = rendered.where(rendered == '', rendered.str[:-len(separator)])
+    return rendered
+
+
+def build_text_chunks(df: pd.DataFrame, sheet_name: str, style: str = CATALOG_STYLE) -> pd.Series:
+    """
+    Returns one text chunk per row of `df` (already filled and cast to str).
+    Empty strings mark rows that produce no chunk.
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    if style == FILE_STYLE:
+        return _render_key_values(df, "\n", prefix=f"Sheet: {sheet_name}\n").str.strip()
+    template = SHEET_TEMPLATES.get(sheet_name)
+    if template is not None:
+        chunks = _render_template(df, template)
+    else:
+        chunks = _render_key_values(df, ". ")
+    return chunks.str.replace('\n', ' ', regex=False).str.strip()
+
+
+def build_row_keys(df: pd.DataFrame, sheet_name: str) -> pd.Series:
+    """
+    Returns the business key of each row of `df` (already filled and cast to str).
+    Duplicate keys are disambiguated by their order of appearance ("key#1", "key#2"...).
+    """
+    columns = [column for column in SHEET_KEY_COLUMNS.get(sheet_name, []) if column in df.columns]
+    if not columns:
+        columns = list(df.columns)
+    keys = df[columns[0]].str.strip()
+    for column in columns[1:]:
+        keys = keys + "|" + df[column].str.strip()
+    occurrence = keys.groupby(keys).cumcount()
+    return keys.where(occurrence == 0, keys + "#" + occurrence.astype(str))
+
+
+def content_hash(text_chunk: str, record: Dict[str, Any]) -> str:
+    """Hash of what a catalog point is made of (embedded text + original row)."""
+    raw = json.dumps({"text": text_chunk, "original_data": record}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def catalog_facets(record: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Distinct non-empty values of each browse filter for a catalog row."""
+    facets = {}
+    for facet, columns in CATALOG_FACET_COLUMNS.items():
+        values = [str(record.get(column, '')).strip() for column in columns]
+        facets[facet] = list(dict.fromkeys(value for value in values if value and value.lower() != 'nan'))
+    return facets
+
+
+def catalog_point_id(sheet_name: str, row_key: str) -> str:
+    """Deterministic Qdrant point id of a catalog row."""
+    return str(uuid.uuid5(CATALOG_POINT_NAMESPACE, f"{sheet_name}\x1f{row_key}"))
+
+
+def build_chunk_payloads(
+    all_sheets_data: Dict[str, pd.DataFrame],
+    style: str = CATALOG_STYLE,
+    base_payload: Optional[Dict[str, Any]] = None,
+    row_identity: bool = False
+) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Builds the texts to embed and their Qdrant payloads for every sheet.
+    Each payload holds `base_payload` plus source_sheet, original_row_index,
+    text and original_data (the row as a dict of strings), plus the browse
+    facets for the catalog style.
+    With `row_identity`, payloads also get row_key and content_hash
+    (see catalog_point_id() for the matching point id).
+    """
+    base_payload = base_payload or {}
+    texts: List[str] = []
+    payloads: List[Dict[str, Any]] = []
+    for sheet_name, df in all_sheets_data.items():
+        df = df.fillna('').astype(str)  # Ensure all data is string
+        chunks = build_text_chunks(df, sheet_name, style).tolist()
+        records = df.to_dict(orient='records')
+        row_keys = build_row_keys(df, sheet_name).tolist() if row_identity and not df.empty else [None] * len(df)
+        for row_index, text_chunk, record, row_key in zip(df.index.tolist(), chunks, records, row_keys):
+            if not text_chunk:
+                continue
+            texts.append(text_chunk)
+            payload = {
+                **base_payload,
+                "source_sheet": sheet_name,
+                "original_row_index": row_index,
+                "text": text_chunk,
+                "original_data": record,
+            }
+            if style == CATALOG_STYLE:
+                payload["facets"] = catalog_facets(record)
+            if row_identity:
+                payload["row_key"] = row_key
+                payload["content_hash"] = content_hash(text_chunk, record)
+            payloads.append(payload)
+    return texts, payloads
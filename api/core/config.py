@@ -20,20 +20,137 @@ class Settings(BaseSettings):
     QDRANT_URL: str = os.getenv("QDRANT_URL", "http://qdrant:6333")
     QDRANT_COLLECTION_NAME: str = os.getenv("QDRANT_COLLECTION_NAME", "banque_ma_data_catalog")
     QDRANT_CLIENT_TIMEOUT: int = int(os.getenv("QDRANT_CLIENT_TIMEOUT", "20")) # Timeout for Qdrant client operations (seconds)
+    QDRANT_PREFER_GRPC: bool = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true" # Async request-path client over gRPC
+    QDRANT_GRPC_PORT: int = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+    QDRANT_MAX_CONNECTIONS: int = int(os.getenv("QDRANT_MAX_CONNECTIONS", "50")) # HTTP connection pool of the async client
+    QDRANT_HNSW_M: int = int(os.getenv("QDRANT_HNSW_M", "16"))
+    QDRANT_HNSW_EF_CONSTRUCT: int = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+    QDRANT_INDEXING_THRESHOLD_KB: int = int(os.getenv("QDRANT_INDEXING_THRESHOLD_KB", "20000"))
+    QDRANT_USER_FILES_TENANT_PARTITIONING: bool = os.getenv("QDRANT_USER_FILES_TENANT_PARTITIONING", "false").lower() == "true" # Per-file HNSW graphs (new collections only)
+    QDRANT_QUANTIZATION: str = os.getenv("QDRANT_QUANTIZATION", "scalar").lower() # none / scalar (int8) / binary - see benchmark_quantization.py
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = os.getenv("QDRANT_QUANTIZATION_ALWAYS_RAM", "true").lower() == "true"
+    QDRANT_SCALAR_QUANTILE: float = float(os.getenv("QDRANT_SCALAR_QUANTILE", "0.99"))
+    QDRANT_VECTORS_ON_DISK: bool = os.getenv("QDRANT_VECTORS_ON_DISK", "false").lower() == "true" # Keep only quantized vectors in RAM (new collections only)
+    QDRANT_SEARCH_OVERSAMPLING: float = float(os.getenv("QDRANT_SEARCH_OVERSAMPLING", "2.0"))
+    QDRANT_SEARCH_RESCORE: bool = os.getenv("QDRANT_SEARCH_RESCORE", "true").lower() == "true" # Re-rank candidates with the original vectors
 
     EMBEDDING_MODEL_NAME: str = os.getenv("EMBEDDING_MODEL_NAME", 'paraphrase-multilingual-MiniLM-L12-v2')
     # Optional: Add TRANSFORMERS_CACHE=/path/in/container if needed
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch").lower() # torch / onnx / onnx-int8 (see core/embedding_backend.py)
+    EMBEDDING_ONNX_QUANTIZATION: str = os.getenv("EMBEDDING_ONNX_QUANTIZATION", "avx2") # avx2 / avx512 / avx512_vnni / arm64
+    EMBEDDING_ONNX_EXPORT_DIR: str = os.getenv("EMBEDDING_ONNX_EXPORT_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "onnx_models"))
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_DIR: str = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "embedding_cache")) # Shared by the API and the ingestion worker
+    QUERY_EMBEDDING_CACHE_SIZE: int = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048")) # In-memory LRU of query vectors (0 = disabled)
 
     OLLAMA_MODEL_NAME: str = os.getenv("OLLAMA_MODEL_NAME", "llama3:8b")
     OLLAMA_HOST: str = os.getenv("OLLAMA_HOST", "http://ollama:11434")
     OLLAMA_CLIENT_TIMEOUT: int = int(os.getenv("OLLAMA_CLIENT_TIMEOUT", "1800")) # Timeout for Ollama client operations (30 minutes)
+    OLLAMA_HOSTS: str = os.getenv("OLLAMA_HOSTS", "") # Comma-separated list for round-robin; defaults to OLLAMA_HOST
+    LLM_MAX_IN_FLIGHT_PER_HOST: int = int(os.getenv("LLM_MAX_IN_FLIGHT_PER_HOST", "2")) # Concurrent generations per Ollama host
 
     # Configuration pour les requêtes longues
     MAX_CONTENT_LENGTH: int = int(os.getenv("MAX_CONTENT_LENGTH", "104857600"))  # 100MB
     REQUEST_TIMEOUT: int = int(os.getenv("REQUEST_TIMEOUT", "1800"))  # 30 minutes
 
+    # Dependency registry: background health probes and circuit breakers (core/dependency_registry.py)
+    DEPENDENCY_PROBE_INTERVAL_SECONDS: float = float(os.getenv("DEPENDENCY_PROBE_INTERVAL_SECONDS", "10"))
+    DEPENDENCY_PROBE_TIMEOUT_SECONDS: float = float(os.getenv("DEPENDENCY_PROBE_TIMEOUT_SECONDS", "5"))
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3")) # Consecutive failures before opening
+    CIRCUIT_BASE_BACKOFF_SECONDS: float = float(os.getenv("CIRCUIT_BASE_BACKOFF_SECONDS", "2")) # Doubles on each reopening
+    CIRCUIT_MAX_BACKOFF_SECONDS: float = float(os.getenv("CIRCUIT_MAX_BACKOFF_SECONDS", "60"))
+
     NUM_RESULTS_TO_RETRIEVE: int = int(os.getenv("NUM_RESULTS_TO_RETRIEVE", 18))
 
+    # Parallel retrieval across catalog, conversation files and Atlas (services/retrieval_service.py)
+    RETRIEVAL_FANOUT_ENABLED: bool = os.getenv("RETRIEVAL_FANOUT_ENABLED", "true").lower() == "true"
+    ATLAS_COLLECTION_NAME: str = os.getenv("ATLAS_COLLECTION_NAME", "atlas_catalog") # Filled by sync_atlas_to_qdrant.py; empty = not searched
+    RETRIEVAL_SOURCE_TIMEOUT_MS: int = int(os.getenv("RETRIEVAL_SOURCE_TIMEOUT_MS", "1500")) # Per source; a late source is ignored
+    RETRIEVAL_USER_FILES_LIMIT: int = int(os.getenv("RETRIEVAL_USER_FILES_LIMIT", "6"))
+    RETRIEVAL_ATLAS_LIMIT: int = int(os.getenv("RETRIEVAL_ATLAS_LIMIT", "6"))
+    RETRIEVAL_CATALOG_WEIGHT: float = float(os.getenv("RETRIEVAL_CATALOG_WEIGHT", "1.0")) # Applied to min-max normalized scores
+    RETRIEVAL_USER_FILES_WEIGHT: float = float(os.getenv("RETRIEVAL_USER_FILES_WEIGHT", "1.0"))
+    RETRIEVAL_ATLAS_WEIGHT: float = float(os.getenv("RETRIEVAL_ATLAS_WEIGHT", "0.8"))
+
+    # Structured catalog lookup (services/catalog_lookup.py): exact metadata questions answered without the LLM
+    CATALOG_LOOKUP_ENABLED: bool = os.getenv("CATALOG_LOOKUP_ENABLED", "true").lower() == "true"
+    CATALOG_LOOKUP_REFRESH_SECONDS: float = float(os.getenv("CATALOG_LOOKUP_REFRESH_SECONDS", "600")) # Full rebuild even without a new ingestion
+    CATALOG_INGESTION_POLL_SECONDS: float = float(os.getenv("CATALOG_INGESTION_POLL_SECONDS", "15")) # In-memory indexes rebuilt when an ingestion job completes
+    CATALOG_LOOKUP_MAX_ROWS: int = int(os.getenv("CATALOG_LOOKUP_MAX_ROWS", "50"))
+
+    # Catalog typeahead (services/catalog_suggest.py)
+    CATALOG_SUGGEST_ENABLED: bool = os.getenv("CATALOG_SUGGEST_ENABLED", "true").lower() == "true"
+    CATALOG_SUGGEST_DEFAULT_LIMIT: int = int(os.getenv("CATALOG_SUGGEST_DEFAULT_LIMIT", "10"))
+    CATALOG_SUGGEST_MAX_LIMIT: int = int(os.getenv("CATALOG_SUGGEST_MAX_LIMIT", "20")) # Precomputed rankings keep this many results
+
+    # Faceted catalog browsing (services/catalog_browse.py)
+    CATALOG_BROWSE_DEFAULT_LIMIT: int = int(os.getenv("CATALOG_BROWSE_DEFAULT_LIMIT", "50"))
+    CATALOG_BROWSE_MAX_LIMIT: int = int(os.getenv("CATALOG_BROWSE_MAX_LIMIT", "500"))
+
+    # Fuzzy identifier resolver (core/identifier_index.py): misspelled table/field/flux names rewritten before retrieval
+    IDENTIFIER_RESOLVER_ENABLED: bool = os.getenv("IDENTIFIER_RESOLVER_ENABLED", "true").lower() == "true"
+    IDENTIFIER_MIN_SIMILARITY: float = float(os.getenv("IDENTIFIER_MIN_SIMILARITY", "0.6")) # Trigram Dice coefficient
+    IDENTIFIER_WORD_SIMILARITY: float = float(os.getenv("IDENTIFIER_WORD_SIMILARITY", "0.8")) # For a single plain word ("client")
+
+    # Lineage graph (services/lineage_graph.py) over Référentiel Flux and Atlas Process entities
+    LINEAGE_ENABLED: bool = os.getenv("LINEAGE_ENABLED", "true").lower() == "true"
+    LINEAGE_REFRESH_SECONDS: float = float(os.getenv("LINEAGE_REFRESH_SECONDS", "300"))
+    LINEAGE_MAX_HOPS: int = int(os.getenv("LINEAGE_MAX_HOPS", "3")) # Flows crossed when answering a lineage question
+    LINEAGE_CONTEXT_HOPS: int = int(os.getenv("LINEAGE_CONTEXT_HOPS", "1")) # Lineage added to the RAG context
+    LINEAGE_CONTEXT_MAX_EDGES: int = int(os.getenv("LINEAGE_CONTEXT_MAX_EDGES", "12"))
+
+    # Per-request deadline and retrieval-only degraded answers (services/degraded_answer.py)
+    RAG_REQUEST_DEADLINE_SECONDS: float = float(os.getenv("RAG_REQUEST_DEADLINE_SECONDS", "0")) # 0 = OLLAMA_MAX_REQUEST_TIMEOUT + RAG_RETRIEVAL_ALLOWANCE_SECONDS
+    RAG_RETRIEVAL_ALLOWANCE_SECONDS: float = float(os.getenv("RAG_RETRIEVAL_ALLOWANCE_SECONDS", "15")) # Conversation load, retrieval and reranking before generation
+    DEGRADED_ANSWERS_ENABLED: bool = os.getenv("DEGRADED_ANSWERS_ENABLED", "true").lower() == "true"
+    LLM_DEGRADE_QUEUE_DEPTH: int = int(os.getenv("LLM_DEGRADE_QUEUE_DEPTH", "4")) # Calls already waiting for a generation slot
+    LLM_MIN_GENERATION_SECONDS: float = float(os.getenv("LLM_MIN_GENERATION_SECONDS", "6")) # Below this remaining budget, do not start generating
+    DEGRADED_ANSWER_MAX_ITEMS: int = int(os.getenv("DEGRADED_ANSWER_MAX_ITEMS", "3"))
+    DEGRADED_ANSWER_MAX_FIELDS: int = int(os.getenv("DEGRADED_ANSWER_MAX_FIELDS", "8"))
+
+    # Cross-encoder reranking of the vector search candidates (services/reranker.py)
+    RERANK_ENABLED: bool = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    RERANK_MODEL_NAME: str = os.getenv("RERANK_MODEL_NAME", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1") # Multilingual, CPU-friendly
+    RERANK_TOP_K: int = int(os.getenv("RERANK_TOP_K", "20")) # Candidates scored by the cross-encoder
+    RERANK_KEEP: int = int(os.getenv("RERANK_KEEP", "6")) # Chunks sent to the LLM after reranking
+    RERANK_TIME_BUDGET_MS: int = int(os.getenv("RERANK_TIME_BUDGET_MS", "400")) # Falls back to vector order beyond this
+    RERANK_BATCH_SIZE: int = int(os.getenv("RERANK_BATCH_SIZE", "8"))
+    RERANK_MAX_LENGTH: int = int(os.getenv("RERANK_MAX_LENGTH", "256"))
+    RERANK_SCORE_CACHE_SIZE: int = int(os.getenv("RERANK_SCORE_CACHE_SIZE", "8192")) # (query hash, point id) -> score
+
+    # Intent classifier (short-circuits small-talk before retrieval/LLM)
+    INTENT_CLASSIFIER_ENABLED: bool = os.getenv("INTENT_CLASSIFIER_ENABLED", "true").lower() == "true"
+    INTENT_CONFIDENCE_THRESHOLD: float = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.75"))
+    INTENT_CONFIDENCE_MARGIN: float = float(os.getenv("INTENT_CONFIDENCE_MARGIN", "0.05"))
+
+    # Prompt token budget (tokenizer of the Ollama model, loaded locally)
+    PROMPT_TOKENIZER_NAME: str = os.getenv("PROMPT_TOKENIZER_NAME", "unsloth/Llama-3.2-1B-Instruct")
+    PROMPT_CONTEXT_TOKEN_BUDGET: int = int(os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", "1024"))
+    PROMPT_HISTORY_TOKEN_BUDGET: int = int(os.getenv("PROMPT_HISTORY_TOKEN_BUDGET", "96"))
+    PROMPT_MIN_CHUNK_TOKENS: int = int(os.getenv("PROMPT_MIN_CHUNK_TOKENS", "32"))
+    PROMPT_RESPONSE_TOKEN_RESERVE: int = int(os.getenv("PROMPT_RESPONSE_TOKEN_RESERVE", "512"))
+    PROMPT_STATIC_TOKEN_ALLOWANCE: int = int(os.getenv("PROMPT_STATIC_TOKEN_ALLOWANCE", "512")) # System prompt + chat template
+    PROMPT_QUERY_TOKEN_ALLOWANCE: int = int(os.getenv("PROMPT_QUERY_TOKEN_ALLOWANCE", "256"))
+    # Output caps (num_predict) by kind of answer; capped by PROMPT_RESPONSE_TOKEN_RESERVE
+    NUM_PREDICT_GENERAL: int = int(os.getenv("NUM_PREDICT_GENERAL", "160"))
+    NUM_PREDICT_SHORT: int = int(os.getenv("NUM_PREDICT_SHORT", "256")) # Definition / single fact about the catalog
+    NUM_PREDICT_LIST: int = int(os.getenv("NUM_PREDICT_LIST", "512")) # Lists of fields, sources, comparisons
+    NUM_PREDICT_TITLE: int = int(os.getenv("NUM_PREDICT_TITLE", "24"))
+    OLLAMA_KEEP_ALIVE: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m") # Same value on every call, keeps the model and its KV cache loaded
+    OLLAMA_MIN_NUM_CTX: int = int(os.getenv("OLLAMA_MIN_NUM_CTX", "2048"))
+    OLLAMA_TIMEOUT_BASE_SECONDS: int = int(os.getenv("OLLAMA_TIMEOUT_BASE_SECONDS", "30"))
+    OLLAMA_TIMEOUT_PER_1K_PROMPT_TOKENS: int = int(os.getenv("OLLAMA_TIMEOUT_PER_1K_PROMPT_TOKENS", "60"))
+    OLLAMA_MIN_REQUEST_TIMEOUT: int = int(os.getenv("OLLAMA_MIN_REQUEST_TIMEOUT", "45"))
+    OLLAMA_MAX_REQUEST_TIMEOUT: int = int(os.getenv("OLLAMA_MAX_REQUEST_TIMEOUT", "180"))
+
+    # Catalog ingestion pipeline (read -> embed -> upsert stages)
+    INGESTION_BATCH_SIZE: int = int(os.getenv("INGESTION_BATCH_SIZE", "256")) # Rows per encode/upsert batch
+    INGESTION_QUEUE_SIZE: int = int(os.getenv("INGESTION_QUEUE_SIZE", "4")) # Batches buffered between stages (bounds memory)
+    INGESTION_JOB_MAX_ATTEMPTS: int = int(os.getenv("INGESTION_JOB_MAX_ATTEMPTS", "3"))
+    INGESTION_JOB_RETRY_BACKOFF_SECONDS: float = float(os.getenv("INGESTION_JOB_RETRY_BACKOFF_SECONDS", "30")) # Delay before retrying a failed attempt, doubled at each attempt
+    INGESTION_JOB_STALE_SECONDS: int = int(os.getenv("INGESTION_JOB_STALE_SECONDS", "300")) # No heartbeat for this long = worker lost, job resumed
+    INGESTION_WORKER_POLL_SECONDS: float = float(os.getenv("INGESTION_WORKER_POLL_SECONDS", "5"))
+
     # User Files Configuration
     USER_FILES_DIR: str = os.getenv("USER_FILES_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "user_files"))
 
@@ -50,6 +167,22 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     JWT_EXP_DELTA_SECONDS: int = 3600 # 1h
 
+    @property
+    def ollama_hosts(self) -> list[str]:
+        """Ollama hosts used by the LLM gateway (OLLAMA_HOSTS, or OLLAMA_HOST alone)."""
+        hosts = [host.strip() for host in self.OLLAMA_HOSTS.split(",") if host.strip()]
+        return hosts or [self.OLLAMA_HOST]
+
+    @property
+    def rag_request_deadline_seconds(self) -> float:
+        """
+        Budget of a chat request. By default the slowest generation the adaptive timeout
+        allows still fits: only a saturated queue or a late retrieval degrades the answer.
+        """
+        if self.RAG_REQUEST_DEADLINE_SECONDS > 0:
+            return self.RAG_REQUEST_DEADLINE_SECONDS
+        return self.OLLAMA_MAX_REQUEST_TIMEOUT + self.RAG_RETRIEVAL_ALLOWANCE_SECONDS
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -118,7 +251,7 @@ def get_settings() -> Settings:
     logger.info(f"Using Qdrant URL: {settings_instance.QDRANT_URL}")
     logger.info(f"Using Qdrant Collection: {settings_instance.QDRANT_COLLECTION_NAME}")
     logger.info(f"Using Embedding Model: {settings_instance.EMBEDDING_MODEL_NAME}")
-    logger.info(f"Using Ollama Host: {settings_instance.OLLAMA_HOST}")
+    logger.info(f"Using Ollama Hosts: {settings_instance.ollama_hosts}")
     logger.info(f"Using Ollama Model: {settings_instance.OLLAMA_MODEL_NAME}")
     logger.info(f"User files directory: {settings_instance.USER_FILES_DIR}")
 
@@ -0,0 +1,189 @@
+# api/core/dependency_registry.py
+"""
+Managed external dependencies (Ollama, Qdrant, embedding model) with circuit breakers.
+
+Each dependency is connected once and then probed in the background. While a
+dependency is down its breaker is open: request-time getters return None at
+once (the FastAPI dependency turns it into a 503) instead of every request
+retrying the connection. Reconnection attempts are spaced with exponential
+backoff and only one attempt runs at a time; a successful probe or reconnect
+closes the breaker, so outages recover without restarting the API.
+"""
+import asyncio
+import logging
+import random
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"        # Healthy, calls allowed
+    OPEN = "open"            # Failing, calls rejected until retry_at
+    HALF_OPEN = "half_open"  # One trial (reconnect/probe) in progress
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with exponential, jittered reopen delays."""
+
+    def __init__(self, failure_threshold: int = 3, base_backoff: float = 2.0, max_backoff: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.open_count = 0  # Consecutive openings, drives the backoff
+        self.retry_at = 0.0
+        self.last_error: Optional[str] = None
+
+    def allow_trial(self) -> bool:
+        """True if a (re)connection attempt may run now; moves OPEN to HALF_OPEN."""
+        if self.state == CircuitState.CLOSED:
+            return True
+        if self.state == CircuitState.OPEN and time.monotonic() >= self.retry_at:
+            self.state = CircuitState.HALF_OPEN
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.state != CircuitState.CLOSED:
+            logger.info("Circuit closed after a successful trial.")
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.open_count = 0
+        self.last_error = None
+
+    def record_failure(self, error: Any, force_open: bool = False) -> None:
+        self.consecutive_failures += 1
+        self.last_error = str(error)
+        if force_open or self.state == CircuitState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.open_count += 1
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** (self.open_count - 1))
+            self.retry_at = time.monotonic() + backoff * random.uniform(0.8, 1.2)
+            self.state = CircuitState.OPEN
+
+    def seconds_until_retry(self) -> float:
+        return max(0.0, self.retry_at - time.monotonic()) if self.state == CircuitState.OPEN else 0.0
+
+
+class ManagedDependency:
+    """One external dependency: its instance, connect/probe functions and breaker."""
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], Awaitable[Any]],
+        probe: Callable[[Any], Awaitable[None]],
+        breaker: CircuitBreaker
+    ):
+        self.name = name
+        self._connect = connect
+        self._probe = probe
+        self.breaker = breaker
+        self.instance: Any = None
+        self._lock = asyncio.Lock()
+        self.last_check: Optional[float] = None
+        self.last_latency_ms: Optional[float] = None
+
+    async def get(self) -> Any:
+        """Returns the live instance, or None immediately while the dependency is down."""
+        if self.instance is not None and self.breaker.state == CircuitState.CLOSED:
+            return self.instance
+        if self._lock.locked():
+            return None  # A (re)connection is already running: fail fast instead of piling up
+        await self.check()
+        return self.instance if self.breaker.state == CircuitState.CLOSED else None
+
+    async def check(self) -> None:
+        """Probes the instance (or connects it) if the breaker allows a trial. Single-flight."""
+        if self._lock.locked() or not self.breaker.allow_trial():
+            return
+        async with self._lock:
+            start = time.perf_counter()
+            try:
+                if self.instance is None:
+                    self.instance = await self._connect()
+                    logger.info(f"Dependency '{self.name}' connected.")
+                else:
+                    await self._probe(self.instance)
+                self.breaker.record_success()
+            except Exception as e:
+                # Nothing to serve without an instance: open at once instead of after N failures
+                self.breaker.record_failure(e, force_open=self.instance is None)
+                logger.warning(f"Dependency '{self.name}' check failed ({self.breaker.state.value}, "
+                               f"retry in {self.breaker.seconds_until_retry():.0f}s): {e}")
+            finally:
+                self.last_check = time.time()
+                self.last_latency_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    def report_failure(self, error: Any, force_open: bool = False) -> None:
+        """
+        Lets request paths report a connection-level failure without waiting for the
+        next probe. With force_open the breaker opens at once instead of after N failures.
+        """
+        self.breaker.record_failure(error, force_open=force_open)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state.value,
+            "connected": self.instance is not None,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "retry_in_seconds": round(self.breaker.seconds_until_retry(), 1),
+            "last_error": self.breaker.last_error,
+            "last_check": self.last_check,
+            "last_latency_ms": self.last_latency_ms,
+        }
+
+
+class DependencyRegistry:
+    """Holds the managed dependencies and runs their background health probes."""
+
+    def __init__(self):
+        self._dependencies: Dict[str, ManagedDependency] = {}
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def register(self, dependency: ManagedDependency) -> ManagedDependency:
+        self._dependencies[dependency.name] = dependency
+        return dependency
+
+    def __getitem__(self, name: str) -> ManagedDependency:
+        return self._dependencies[name]
+
+    async def get(self, name: str) -> Any:
+        return await self._dependencies[name].get()
+
+    def report_failure(self, name: str, error: Any, force_open: bool = False) -> None:
+        if name in self._dependencies:
+            self._dependencies[name].report_failure(error, force_open=force_open)
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(dependency.check() for dependency in self._dependencies.values()))
+
+    def start(self, interval_seconds: float) -> None:
+        """Starts the background probe loop (first checks connect every dependency)."""
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop(interval_seconds))
+
+    async def stop(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    async def _probe_loop(self, interval_seconds: float) -> None:
+        while True:
+            try:
+                await self.check_all()
+            except Exception as e:
+                logger.error(f"Dependency probe loop error: {e}", exc_info=True)
+            await asyncio.sleep(interval_seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        dependencies = {name: dependency.snapshot() for name, dependency in self._dependencies.items()}
+        healthy = all(dep["state"] == CircuitState.CLOSED.value and dep["connected"] for dep in dependencies.values())
+        return {"status": "healthy" if healthy else "degraded", "dependencies": dependencies}
@@ -0,0 +1,90 @@
+# api/core/embedding_backend.py
+"""
+Embedding backends behind the SentenceTransformer `encode` interface.
+
+EMBEDDING_BACKEND selects how the model runs on CPU:
+  - torch:     PyTorch FP32 (default, original behaviour),
+  - onnx:      ONNX Runtime FP32 export of the same model,
+  - onnx-int8: ONNX Runtime with dynamic int8 quantization.
+
+The ONNX variants use sentence-transformers' ONNX backend (sentence-transformers[onnx]).
+Pre-exported files of the Hub repository are used when present, otherwise the
+model is exported once into EMBEDDING_ONNX_EXPORT_DIR. Any failure falls back
+to the torch backend. See benchmark_embedding_backend.py for parity/latency.
+"""
+import logging
+import os
+
+from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+TORCH_BACKEND = "torch"
+ONNX_BACKEND = "onnx"
+ONNX_INT8_BACKEND = "onnx-int8"
+BACKENDS = (TORCH_BACKEND, ONNX_BACKEND, ONNX_INT8_BACKEND)
+
+
+def _quantized_file_name(quantization_config: str) -> str:
+    return f"model_qint8_{quantization_config}.onnx"
+
+
+def _load_onnx_int8(model_name: str, quantization_config: str, export_dir: str) -> SentenceTransformer:
+    file_name = _quantized_file_name(quantization_config)
+    try:
+        # Quantized file published in the model repository (onnx/ folder)
+        return SentenceTransformer(model_name, backend="onnx", model_kwargs={"file_name": f"onnx/{file_name}"})
+    except Exception as e:
+        logger.info(f"No pre-quantized ONNX file for '{model_name}' ({e}), exporting one...")
+
+    local_dir = os.path.join(export_dir, model_name.replace("/", "_"))
+    local_file = os.path.join(local_dir, "onnx", file_name)
+    if not os.path.exists(local_file):
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+        fp32_model = SentenceTransformer(model_name, backend="onnx")  # Exports model.onnx if missing
+        fp32_model.save_pretrained(local_dir)
+        export_dynamic_quantized_onnx_model(fp32_model, quantization_config, local_dir)
+    return SentenceTransformer(local_dir, backend="onnx", model_kwargs={"file_name": f"onnx/{file_name}"})
+
+
+def load_embedding_model(
+    model_name: str,
+    backend: str = TORCH_BACKEND,
+    quantization_config: str = "avx2",
+    export_dir: str = "onnx_models"
+) -> SentenceTransformer:
+    """
+    Loads `model_name` with the requested backend, falling back to torch on failure.
+    The backend actually used is recorded on the model (see loaded_backend).
+    """
+    backend = backend.lower()
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown EMBEDDING_BACKEND '{backend}', using '{TORCH_BACKEND}'.")
+        backend = TORCH_BACKEND
+    model = None
+    try:
+        if backend == ONNX_BACKEND:
+            model = SentenceTransformer(model_name, backend="onnx")
+        elif backend == ONNX_INT8_BACKEND:
+            model = _load_onnx_int8(model_name, quantization_config, export_dir)
+    except Exception as e:
+        logger.error(f"Could not load '{model_name}' with the {backend} backend ({e}). Falling back to torch.", exc_info=True)
+        backend = TORCH_BACKEND
+    if model is None:
+        model = SentenceTransformer(model_name)
+    model.embedding_backend = backend
+    return model
+
+
+def loaded_backend(model: SentenceTransformer) -> str:
+    """Backend a model returned by load_embedding_model actually runs on."""
+    return getattr(model, "embedding_backend", TORCH_BACKEND)
+
+
+def embedding_model_id(model_name: str, backend: str) -> str:
+    """
+    Identifier of the vector space produced by a model/backend pair (used to key
+    the embedding cache): int8 vectors are close to, but not equal to, FP32 ones.
+    Pass loaded_backend(model), not the configured backend, which may have fallen back.
+    """
+    return f"{model_name}@int8" if backend.lower() == ONNX_INT8_BACKEND else model_name
@@ -0,0 +1,235 @@
+# api/core/embedding_cache.py
+"""
+Persistent embedding cache shared by every ingestion path (admin catalog
+upload, conversation file upload, embeddata.py, Atlas sync).
+
+Vectors are keyed by sha256(model name + normalized text) and stored per model
+in a directory holding:
+  - vectors.f32: float32 matrix (n x dim), read through np.memmap,
+  - keys.idx: append-only "<key> <row>" lines mapping a key to its matrix row.
+
+Appends are serialized with an exclusive file lock so the API and the
+ingestion worker can share the same directory. A key line is only written
+after its vector, so an interrupted append never maps a key to garbage.
+QueryEmbeddingCache is the in-memory counterpart for the query path: a bounded
+LRU of query vectors shared by the RAG search, file context and voice flows.
+Like chunking.py, this module only depends on NumPy and the standard library.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl  # POSIX only (containers); scripts run on Windows fall back to the thread lock
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """NFC + collapsed whitespace: formatting-only differences map to the same key."""
+    return _WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def _model_dir_name(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+
+
+class EmbeddingCache:
+    """Memory-mapped float32 embedding store for one model."""
+
+    def __init__(self, cache_dir: str, model_name: str, dimension: int):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.directory = os.path.join(cache_dir, _model_dir_name(model_name))
+        os.makedirs(self.directory, exist_ok=True)
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._keys_path = os.path.join(self.directory, "keys.idx")
+        self._lock_path = os.path.join(self.directory, ".lock")
+        self._row_bytes = dimension * np.dtype(np.float32).itemsize
+        self._index: Dict[str, int] = {}
+        self._keys_offset = 0  # Bytes of keys.idx already loaded
+        self._matrix = None
+        self._matrix_rows = 0
+        self._thread_lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        with self._thread_lock:
+            self._refresh_index()
+        logger.info(f"Embedding cache for '{model_name}' at {self.directory}: {len(self._index)} vectors.")
+
+    def key(self, text: str) -> str:
+        raw = f"{self.model_name}\x1f{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "vectors": len(self._index), "hits": self.hits, "misses": self.misses}
+
+    def get_many(self, texts: Sequence[str]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Returns a (len(texts) x dim) float32 matrix filled with the cached vectors,
+        and the indexes of the texts that are not cached (their rows are zeros).
+        """
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        missing: List[int] = []
+        with self._thread_lock:
+            self._refresh_index()
+            rows = [self._index.get(self.key(text)) for text in texts]
+            found = [(i, row) for i, row in enumerate(rows) if row is not None]
+            if found:
+                matrix = self._get_matrix(max(row for _, row in found) + 1)
+                positions, matrix_rows = zip(*found)
+                vectors[list(positions)] = matrix[list(matrix_rows)]
+            missing = [i for i, row in enumerate(rows) if row is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return vectors, missing
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """Appends the vectors of texts that are not cached yet."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dimension)
+        with self._thread_lock, self._file_lock():
+            self._refresh_index()  # Another process may have added some of them meanwhile
+            new_entries: Dict[str, int] = {}
+            for i, text in enumerate(texts):
+                key = self.key(text)
+                if key not in self._index and key not in new_entries:
+                    new_entries[key] = i
+            if not new_entries:
+                return
+            with open(self._vectors_path, "ab") as vectors_file:
+                torn_bytes = vectors_file.tell() % self._row_bytes
+                if torn_bytes:
+                    # Partial row left by an interrupted append: pad it so new rows stay aligned
+                    vectors_file.write(b"\0" * (self._row_bytes - torn_bytes))
+                first_row = vectors_file.tell() // self._row_bytes
+                vectors_file.write(np.ascontiguousarray(vectors[list(new_entries.values())]).tobytes())
+            with open(self._keys_path, "a", encoding="ascii") as keys_file:
+                keys_file.write("".join(f"{key} {first_row + n}\n" for n, key in enumerate(new_entries)))
+            self._refresh_index()
+
+    def _refresh_index(self) -> None:
+        """Loads key lines appended since the last call (by this or another process)."""
+        if not os.path.exists(self._keys_path):
+            return
+        with open(self._keys_path, "rb") as keys_file:
+            keys_file.seek(self._keys_offset)
+            chunk = keys_file.read()
+        complete = chunk[:chunk.rfind(b"\n") + 1]  # Ignore a line still being written
+        for line in complete.decode("ascii").splitlines():
+            key, row = line.split(" ")
+            self._index[key] = int(row)
+        self._keys_offset += len(complete)
+
+    def _get_matrix(self, min_rows: int) -> np.ndarray:
+        """Read-only memmap over vectors.f32, reopened when the file has grown."""
+        if self._matrix is None or self._matrix_rows < min_rows:
+            rows = os.path.getsize(self._vectors_path) // self._row_bytes
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimension))
+            self._matrix_rows = rows
+        return self._matrix
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def encode_with_cache(embedding_model, texts: Sequence[str], cache: "EmbeddingCache | None" = None, **encode_kwargs) -> np.ndarray:
+    """
+    Drop-in replacement for `embedding_model.encode(texts, ...)` on ingestion
+    paths: only texts missing from the cache are encoded, then stored.
+    Returns a float32 matrix (len(texts) x dim).
+    """
+    if cache is None:
+        return np.asarray(embedding_model.encode(list(texts), **encode_kwargs), dtype=np.float32)
+    vectors, missing = cache.get_many(texts)
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        encoded = np.asarray(embedding_model.encode(missing_texts, **encode_kwargs), dtype=np.float32)
+        vectors[missing] = encoded
+        try:
+            cache.put_many(missing_texts, encoded)
+        except OSError as e:
+            # A full or read-only cache volume must not fail the ingestion
+            logger.warning(f"Could not write to the embedding cache: {e}")
+    logger.debug(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} encoded.")
+    return vectors
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU of query vectors keyed on (model name, normalized text)."""
+
+    def __init__(self, model_name: str, max_size: int = 2048):
+        self.model_name = model_name
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def encode(self, embedding_model, query: str) -> List[float]:
+        """Returns `embedding_model.encode(query).tolist()`, served from the LRU when possible."""
+        key = (self.model_name, normalize_text(query))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(vector)
+            self.misses += 1
+        # Encoding happens outside the lock: concurrent misses on the same text are harmless
+        vector = tuple(float(x) for x in embedding_model.encode(query, show_progress_bar=False))
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return list(vector)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_name": self.model_name,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+def encode_query(embedding_model, query: str, cache: "QueryEmbeddingCache | None" = None) -> List[float]:
+    """Drop-in replacement for `embedding_model.encode(query).tolist()` on search paths."""
+    if cache is None:
+        return embedding_model.encode(query).tolist()
+    return cache.encode(embedding_model, query)
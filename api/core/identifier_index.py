@@ -0,0 +1,163 @@
+# api/core/identifier_index.py
+"""
+Trigram index over the catalog identifiers (source, field and flux names)
+used to resolve misspelled or mis-transcribed mentions ("client cute",
+"CLIEN_QT") to their canonical spelling before retrieval.
+
+Identifiers are compared on a compact form (lowercase, no accents, only
+letters and digits) so that "client qt", "client_qt" and "ClientQT" are the
+same key. Candidates come from the trigram postings, then the Dice
+coefficient of the trigram sets decides. Only the standard library is used
+so standalone scripts (benchmarks) can import it without loading the API.
+"""
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+_WORD_PATTERN = re.compile(r"[\w\-.]+")
+_COMPACT_PATTERN = re.compile(r"[^a-z0-9]")
+# Identifier-looking strings: codes with underscores, digits or all capitals (CLIENT_QT, FLX_01)
+_IDENTIFIER_PATTERN = re.compile(r"^(?=.*[_\d]|[A-Z0-9_\-.]+$)[A-Za-z][\w\-.]{2,}$")
+# Identifiers that are a single plain word (DATE, DEVISE, CLIENT): never a rewrite target,
+# since "la devise du compte" would otherwise become "la DEVISE du compte"
+_PLAIN_WORD_PATTERN = re.compile(r"^[^\W\d_]+$")
+
+# Common words never taken as (part of) an identifier mention
+_STOP_WORDS = frozenset(
+    "le la les l de du des d un une et ou en a au aux est sont quel quelle quels quelles qui que quoi "
+    "dans sur pour par avec ce cette ces mon ma mes je tu il nous vous veux voudrais savoir donne "
+    "table tables source sources flux champ champs colonne colonnes type types donnee donnees base "
+    "liste structure taille format frequence cible the of".split()
+)
+
+# Trigrams shared by more than this share of the identifiers (prefixes like "FLX") carry
+# little signal and are skipped for candidate generation; they still count in the similarity
+_MAX_POSTINGS_SHARE = 0.02
+_MIN_POSTINGS_CAP = 200
+_MAX_CANDIDATES = 50
+_MAX_WINDOW = 3  # Query words merged into one mention ("client cute" -> CLIENT_QT)
+
+
+def compact(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return _COMPACT_PATTERN.sub("", "".join(char for char in text if not unicodedata.combining(char)))
+
+
+def trigrams(compact_text: str) -> FrozenSet[str]:
+    padded = f"  {compact_text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def looks_like_identifier(text: str) -> bool:
+    return bool(_IDENTIFIER_PATTERN.match(text))
+
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def _same_spelling(mention: str, identifier: str) -> bool:
+    """True if the mention only differs from the identifier by case, accents or a plural (not by separators)."""
+    mention, identifier = _fold(mention), _fold(identifier)
+    return mention == identifier or (mention[-1:] in ("s", "x") and mention[:-1] == identifier)
+
+
+class IdentifierIndex:
+    """Inverted trigram index; lookups touch only the postings of the mention's trigrams."""
+
+    def __init__(self, identifiers: Iterable[str]):
+        self.canonical: List[str] = []
+        self.grams: List[FrozenSet[str]] = []
+        self.plain: List[bool] = []
+        self.exact: Dict[str, int] = {}
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for identifier in identifiers:
+            key = compact(identifier)
+            if len(key) < 3 or key in self.exact:
+                continue
+            identifier_id = len(self.canonical)
+            self.exact[key] = identifier_id
+            self.canonical.append(identifier.strip())
+            self.plain.append(bool(_PLAIN_WORD_PATTERN.match(identifier.strip())))
+            grams = trigrams(key)
+            self.grams.append(grams)
+            for gram in grams:
+                postings[gram].append(identifier_id)
+        cap = max(_MIN_POSTINGS_CAP, int(len(self.canonical) * _MAX_POSTINGS_SHARE))
+        self.postings = {gram: ids for gram, ids in postings.items() if len(ids) <= cap}
+
+    def __len__(self) -> int:
+        return len(self.canonical)
+
+    def best_match(self, mention: str, min_similarity: float, plain_words: bool = True) -> Optional[Tuple[str, float]]:
+        """
+        Closest identifier to `mention` with its Dice similarity, if above min_similarity.
+        With plain_words=False, single plain-word identifiers (DATE, CLIENT) are not candidates.
+        """
+        key = compact(mention)
+        if len(key) < 3:
+            return None
+        exact = self.exact.get(key)
+        if exact is not None and (plain_words or not self.plain[exact]):
+            return self.canonical[exact], 1.0
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        # Candidates sharing the most selective trigrams; exact Dice on the full trigram sets
+        best, best_score = None, min_similarity
+        for identifier_id, _ in shared.most_common(_MAX_CANDIDATES):
+            if not plain_words and self.plain[identifier_id]:
+                continue
+            candidate_grams = self.grams[identifier_id]
+            score = 2 * len(grams & candidate_grams) / (len(grams) + len(candidate_grams))
+            if score >= best_score:
+                best, best_score = identifier_id, score
+        return (self.canonical[best], best_score) if best is not None else None
+
+    def rewrite(self, query: str, min_similarity: float = 0.6, word_similarity: float = 0.8) -> Tuple[str, List[Tuple[str, str]]]:
+        """
+        Replaces fuzzy identifier mentions of `query` by their canonical spelling.
+
+        Windows of 1 to 3 consecutive words are matched; a single plain word
+        (no underscore/digit, not in capitals) needs `word_similarity`, since
+        "client" must not become CLIENT_QT. The longest matching window wins
+        ("client cute" -> CLIENT_QT rather than "client" -> CLIENT). Mentions
+        that only differ by case or plural are left as typed, and plain-word
+        identifiers (DATE, DEVISE) are never substituted. Returns the rewritten
+        query and the (mention, identifier) replacements.
+        """
+        words = list(_WORD_PATTERN.finditer(query))
+        candidates = []  # (score, length, start word, end word, identifier)
+        for start in range(len(words)):
+            for end in range(start + 1, min(start + _MAX_WINDOW, len(words)) + 1):
+                window = words[start:end]
+                if any(compact(word.group()) in _STOP_WORDS for word in window):
+                    break
+                mention = query[window[0].start():window[-1].end()]
+                threshold = min_similarity if end - start > 1 or looks_like_identifier(mention) else word_similarity
+                match = self.best_match(mention, threshold, plain_words=False)
+                if match:
+                    candidates.append((match[1], end - start, start, end, match[0], _same_spelling(mention, match[0])))
+
+        # Longest (then best) non-overlapping mentions win. A window mapped to the same
+        # identifier as a better-scored window inside it is narrowed to that window
+        # ("client qt actifs" keeps "actifs").
+        taken = set()
+        chosen = []
+        for score, _, start, end, identifier, same in sorted(candidates, key=lambda c: (c[1], c[0]), reverse=True):
+            inner = [c for c in candidates if c[4] == identifier and start <= c[2] and c[3] <= end and c[0] > score]
+            if inner:
+                score, _, start, end, identifier, same = max(inner, key=lambda c: c[0])
+            if taken.isdisjoint(range(start, end)):
+                taken.update(range(start, end))
+                if not same:  # Already spelled right: nothing to replace, but the words are taken
+                    chosen.append((start, end, identifier))
+        replacements = []
+        for start, end, identifier in sorted(chosen, reverse=True):
+            mention = query[words[start].start():words[end - 1].end()]
+            query = query[:words[start].start()] + identifier + query[words[end - 1].end():]
+            replacements.append((mention, identifier))
+        return query, replacements[::-1]
@@ -0,0 +1,191 @@
+# api/core/llm_gateway.py
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import logging
+from enum import IntEnum
+from typing import Any, Dict, List, Optional, Set
+
+import httpx
+import ollama
+
+logger = logging.getLogger(__name__)
+
+
+class LLMPriority(IntEnum):
+    """Lower value = served first when the gateway is saturated."""
+    INTERACTIVE = 0   # Chat and voice answers (a user is waiting)
+    BACKGROUND = 10   # Conversation titles and other housekeeping
+
+
+class _HostSlots:
+    """
+    Generation slots of each Ollama host; waiters are woken by priority, then FIFO.
+
+    acquire() returns the host whose slot was taken. A freed slot is handed over
+    directly to the first waiter that may use that host, so a host never has a
+    free slot while an eligible caller is waiting.
+    """
+
+    def __init__(self, hosts: List[str], per_host: int):
+        self._hosts = hosts
+        self._free = {host: per_host for host in hosts}
+        self._waiters: List[Any] = []  # sorted (priority, seq, future, excluded hosts)
+        self._seq = itertools.count()
+        self._next = 0  # Round-robin start among the hosts with a free slot
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, fut, _ in self._waiters if not fut.done())
+
+    def _free_host(self, excluded: Set[str]) -> Optional[str]:
+        for i in range(len(self._hosts)):
+            host = self._hosts[(self._next + i) % len(self._hosts)]
+            if host not in excluded and self._free[host] > 0:
+                self._next = (self._next + i + 1) % len(self._hosts)
+                return host
+        return None
+
+    async def acquire(self, priority: int, excluded: Optional[Set[str]] = None) -> str:
+        excluded = excluded or set()
+        host = self._free_host(excluded)
+        if host is not None:
+            self._free[host] -= 1
+            return host
+        future = asyncio.get_running_loop().create_future()
+        bisect.insort(self._waiters, (priority, next(self._seq), future, frozenset(excluded)), key=lambda w: w[:2])
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before cancellation: give it back
+            if future.done() and not future.cancelled():
+                self.release(future.result())
+            raise
+        finally:
+            self._waiters = [waiter for waiter in self._waiters if waiter[2] is not future]
+
+    def release(self, host: str) -> None:
+        for _, _, future, excluded in self._waiters:
+            if not future.done() and host not in excluded:
+                future.set_result(host)  # Slot handed over directly to the waiter
+                return
+        self._free[host] += 1
+
+
+class LLMGateway:
+    """
+    Single entry point for Ollama calls.
+
+    - bounds the number of in-flight generations on each host (LLM_MAX_IN_FLIGHT_PER_HOST),
+    - serves queued calls by priority (interactive chat before conversation titles),
+    - coalesces identical in-flight requests into a single generation, cancelled
+      once every caller waiting for it has given up (timeout, deadline, disconnect),
+    - spreads calls round-robin across the configured Ollama hosts.
+
+    Exposes `chat()` and `list()` like `ollama.AsyncClient`, so services can use it
+    in place of a raw client.
+    """
+
+    def __init__(self, hosts: List[str], timeout: int, max_in_flight_per_host: int):
+        if not hosts:
+            raise ValueError("LLMGateway requires at least one Ollama host")
+        self.hosts = hosts
+        self._clients = {host: ollama.AsyncClient(host=host, timeout=timeout) for host in hosts}
+        self._slots = _HostSlots(hosts, max_in_flight_per_host)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._callers: Dict[str, int] = {}  # Callers awaiting each in-flight generation
+        self.in_flight = 0
+        self.coalesced_requests = 0
+        self.abandoned_generations = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a generation slot."""
+        return self._slots.waiting
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hosts": self.hosts,
+            "in_flight": self.in_flight,
+            "queued": self.queue_depth,
+            "coalesced_requests": self.coalesced_requests,
+            "abandoned_generations": self.abandoned_generations,
+        }
+
+    async def list(self) -> Any:
+        """Lists models on the first reachable host (connectivity check)."""
+        last_error: Optional[Exception] = None
+        for host in self.hosts:
+            try:
+                return await self._clients[host].list()
+            except (httpx.HTTPError, ollama.ResponseError) as e:
+                logger.warning(f"Ollama host {host} unreachable during list(): {e}")
+                last_error = e
+        raise last_error
+
+    async def chat(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        options: Optional[Dict[str, Any]] = None,
+        keep_alive: Optional[str] = None,
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
+        **kwargs
+    ) -> Any:
+        """Runs (or joins) a non-streaming chat completion."""
+        key = self._request_key(model, messages, options, kwargs)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced_requests += 1
+            logger.info("LLM gateway: identical request already in flight, joining it.")
+        else:
+            task = asyncio.create_task(self._run_chat(model, messages, options, keep_alive, priority, kwargs))
+            self._inflight[key] = task
+            self._callers[key] = 0
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        self._callers[key] += 1
+        try:
+            # shield: a caller giving up must not cancel the generation for the others...
+            return await asyncio.shield(task)
+        finally:
+            if self._inflight.get(key) is task:  # Otherwise already finished and forgotten
+                self._callers[key] -= 1
+            if not task.done() and self._callers.get(key) == 0:
+                # ...but once nobody waits for it, it must not keep a slot busy until the client timeout
+                self.abandoned_generations += 1
+                logger.info("LLM gateway: every caller gave up, cancelling the generation.")
+                self._forget(key, task)
+                task.cancel()
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._callers[key]
+
+    async def _run_chat(self, model, messages, options, keep_alive, priority, extra) -> Any:
+        tried: Set[str] = set()
+        last_error: Optional[Exception] = None
+        while len(tried) < len(self.hosts):
+            host = await self._slots.acquire(int(priority), excluded=tried)
+            self.in_flight += 1
+            try:
+                return await self._clients[host].chat(
+                    model=model, messages=messages, options=options, keep_alive=keep_alive, **extra
+                )
+            except (httpx.ConnectError, httpx.RemoteProtocolError) as e:
+                # Host down: try another one instead of failing the request
+                logger.warning(f"Ollama host {host} failed ({e}). Trying next host.")
+                tried.add(host)
+                last_error = e
+            finally:
+                self.in_flight -= 1
+                self._slots.release(host)
+        raise last_error
+
+    @staticmethod
+    def _request_key(model, messages, options, extra) -> str:
+        raw = json.dumps({"model": model, "messages": messages, "options": options, "extra": extra},
+                         sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
@@ -2,30 +2,52 @@
 import logging
 from functools import lru_cache
 from sentence_transformers import SentenceTransformer
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, AsyncQdrantClient
 import ollama
 import httpx # Import httpx to catch potential timeout errors specifically
 import json
 import asyncio # Added for asyncio.Lock
+import threading
 
 # Use relative import to get settings
 from .config import settings
+from .llm_gateway import LLMGateway
+from .embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from .embedding_backend import load_embedding_model, loaded_backend, embedding_model_id
+from .dependency_registry import CircuitBreaker, DependencyRegistry, ManagedDependency
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # --- Embedding Model ---
-@lru_cache()
+# Only a successful load is cached: a transient failure (e.g. model download)
+# is retried on the next call instead of returning None until restart.
+_embedding_model: SentenceTransformer | None = None
+_embedding_model_lock = threading.Lock()
+
 def get_embedding_model() -> SentenceTransformer | None:
-    """Loads the Sentence Transformer model, logging errors."""
+    """Loads the Sentence Transformer model once, logging errors."""
+    global _embedding_model
+    if _embedding_model is None:
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                _embedding_model = _load_embedding_model()
+    return _embedding_model
+
+def _load_embedding_model() -> SentenceTransformer | None:
     model_name = settings.EMBEDDING_MODEL_NAME
     logger.info(f"Attempting to load embedding model: {model_name}")
     try:
         # Specify cache directory explicitly if needed, otherwise uses default
         # cache_folder = settings.TRANSFORMERS_CACHE # Example if you add this setting
-        model = SentenceTransformer(model_name) # cache_folder=cache_folder)
-        logger.info(f"Embedding model '{model_name}' loaded successfully.")
+        model = load_embedding_model(
+            model_name,
+            backend=settings.EMBEDDING_BACKEND,
+            quantization_config=settings.EMBEDDING_ONNX_QUANTIZATION,
+            export_dir=settings.EMBEDDING_ONNX_EXPORT_DIR
+        ) # cache_folder=cache_folder)
+        logger.info(f"Embedding model '{model_name}' loaded successfully (backend: {loaded_backend(model)}).")
         return model
     except ImportError:
         logger.critical("SentenceTransformers library not found. Please install it: pip install sentence-transformers", exc_info=True)
@@ -35,10 +57,62 @@ def get_embedding_model() -> SentenceTransformer | None:
         logger.critical(f"CRITICAL Error loading embedding model '{model_name}': {e}", exc_info=True)
         return None
 
-# --- Qdrant Client ---
+# --- Embedding Cache (ingestion paths) ---
 @lru_cache()
+def get_embedding_cache() -> EmbeddingCache | None:
+    """Opens the persistent embedding cache of the configured model (None if disabled or unavailable)."""
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    embedding_model = get_embedding_model()
+    if embedding_model is None:
+        return None
+    try:
+        return EmbeddingCache(
+            settings.EMBEDDING_CACHE_DIR,
+            embedding_model_id(settings.EMBEDDING_MODEL_NAME, loaded_backend(embedding_model)),
+            embedding_model.get_sentence_embedding_dimension()
+        )
+    except OSError as e:
+        logger.error(f"Embedding cache unavailable at {settings.EMBEDDING_CACHE_DIR}: {e}", exc_info=True)
+        return None
+
+# --- Query Embedding Cache (search paths) ---
+# Keyed by the backend the model actually loaded with, so it is created (and
+# cached) only once the model is loaded; it never triggers the load itself.
+_query_embedding_cache: QueryEmbeddingCache | None = None
+_query_embedding_cache_lock = threading.Lock()
+
+def get_query_embedding_cache() -> QueryEmbeddingCache | None:
+    """In-memory LRU of query vectors shared by RAG, file context and voice (None if disabled)."""
+    global _query_embedding_cache
+    if settings.QUERY_EMBEDDING_CACHE_SIZE <= 0:
+        return None
+    if _query_embedding_cache is None:
+        embedding_model = _embedding_model
+        if embedding_model is None:
+            return None
+        with _query_embedding_cache_lock:
+            if _query_embedding_cache is None:
+                _query_embedding_cache = QueryEmbeddingCache(
+                    embedding_model_id(settings.EMBEDDING_MODEL_NAME, loaded_backend(embedding_model)),
+                    settings.QUERY_EMBEDDING_CACHE_SIZE
+                )
+    return _query_embedding_cache
+
+# --- Qdrant Client ---
+_qdrant_client: QdrantClient | None = None
+_qdrant_client_lock = threading.Lock()
+
 def get_qdrant_client() -> QdrantClient | None:
-    """Connects to the Qdrant vector database with logging."""
+    """Connects to the Qdrant vector database once (successful connections only are cached)."""
+    global _qdrant_client
+    if _qdrant_client is None:
+        with _qdrant_client_lock:
+            if _qdrant_client is None:
+                _qdrant_client = _connect_qdrant_client()
+    return _qdrant_client
+
+def _connect_qdrant_client() -> QdrantClient | None:
     qdrant_url = settings.QDRANT_URL
     collection_name = settings.QDRANT_COLLECTION_NAME
     qdrant_timeout = settings.QDRANT_CLIENT_TIMEOUT # Use setting from config
@@ -53,39 +127,109 @@ def get_qdrant_client() -> QdrantClient | None:
         logger.critical(f"CRITICAL Error connecting to Qdrant ({qdrant_url}) or verifying collection '{collection_name}': {e}", exc_info=True)
         return None
 
+# --- Async Qdrant Client (request path) ---
+# Request handlers await this client so vector searches never block the event loop.
+# The sync client above stays for ingestion threads, the worker and scripts.
+async def _connect_async_qdrant_client() -> AsyncQdrantClient:
+    qdrant_url = settings.QDRANT_URL
+    collection_name = settings.QDRANT_COLLECTION_NAME
+    logger.info(f"Attempting async connection to Qdrant at {qdrant_url} (gRPC: {settings.QDRANT_PREFER_GRPC})...")
+    client = AsyncQdrantClient(
+        url=qdrant_url,
+        timeout=settings.QDRANT_CLIENT_TIMEOUT,
+        prefer_grpc=settings.QDRANT_PREFER_GRPC,
+        grpc_port=settings.QDRANT_GRPC_PORT,
+        limits=httpx.Limits(
+            max_connections=settings.QDRANT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.QDRANT_MAX_CONNECTIONS
+        )
+    )
+    try:
+        await client.get_collection(collection_name=collection_name)
+    except Exception:
+        await client.close()
+        raise
+    logger.info(f"Async Qdrant client connected and verified collection '{collection_name}'.")
+    return client
+
+async def _probe_async_qdrant_client(client: AsyncQdrantClient) -> None:
+    await client.get_collection(collection_name=settings.QDRANT_COLLECTION_NAME)
+
 # --- Ollama Client ---
-_ollama_async_client: ollama.AsyncClient | None = None
-_ollama_client_lock = asyncio.Lock()
-
-async def get_ollama_client() -> ollama.AsyncClient | None:
-    """Connects to the Ollama async client with configurable timeout and logging.
-    Ensures the client is initialized only once.
-    """
-    global _ollama_async_client
-    if _ollama_async_client is None:
-        async with _ollama_client_lock:
-            # Double-check after acquiring the lock
-            if _ollama_async_client is None:
-                ollama_host = settings.OLLAMA_HOST
-                ollama_timeout = settings.OLLAMA_CLIENT_TIMEOUT
-                logger.info(f"Attempting connection to Ollama (async client) at {ollama_host} (timeout: {ollama_timeout}s)...")
-                try:
-                    client_instance = ollama.AsyncClient(host=ollama_host, timeout=ollama_timeout)
-                    await client_instance.list()  # Test connection
-                    logger.info("Connected to Ollama (async client) successfully.")
-                    _ollama_async_client = client_instance
-                except ImportError:
-                    logger.critical("Ollama library not found. Install it: pip install ollama", exc_info=True)
-                    # _ollama_async_client remains None
-                except (httpx.TimeoutException, ollama.ResponseError) as e:
-                    logger.critical(f"CRITICAL Error connecting to Ollama (async client) ({ollama_host}) during initial check: {e}", exc_info=True)
-                    # _ollama_async_client remains None
-                except Exception as e:
-                    logger.critical(f"CRITICAL Unexpected error connecting to Ollama (async client) ({ollama_host}): {e}", exc_info=True)
-                    # _ollama_async_client remains None
-    return _ollama_async_client
-
-async def get_ollama_client_dependency() -> ollama.AsyncClient:
+# All Ollama calls go through the LLM gateway (concurrency limit, priorities,
+# request coalescing, round-robin across OLLAMA_HOSTS).
+async def _connect_ollama_gateway() -> LLMGateway:
+    ollama_hosts = settings.ollama_hosts
+    ollama_timeout = settings.OLLAMA_CLIENT_TIMEOUT
+    logger.info(f"Attempting connection to Ollama (LLM gateway) at {ollama_hosts} (timeout: {ollama_timeout}s)...")
+    gateway = LLMGateway(
+        hosts=ollama_hosts,
+        timeout=ollama_timeout,
+        max_in_flight_per_host=settings.LLM_MAX_IN_FLIGHT_PER_HOST
+    )
+    await gateway.list()  # Test connection
+    logger.info("Connected to Ollama (LLM gateway) successfully.")
+    return gateway
+
+async def _probe_ollama_gateway(gateway: LLMGateway) -> None:
+    await asyncio.wait_for(gateway.list(), timeout=settings.DEPENDENCY_PROBE_TIMEOUT_SECONDS)
+
+# --- Sync resources, connected in a worker thread so the event loop stays free ---
+async def _in_thread(func):
+    return await asyncio.get_event_loop().run_in_executor(None, func)
+
+async def _connect_embedding_model() -> SentenceTransformer:
+    model = await _in_thread(get_embedding_model)
+    if model is None:
+        raise RuntimeError(f"Embedding model '{settings.EMBEDDING_MODEL_NAME}' could not be loaded")
+    return model
+
+async def _probe_embedding_model(model: SentenceTransformer) -> None:
+    return None  # Loaded in-process: nothing can disconnect it
+
+async def _connect_sync_qdrant_client() -> QdrantClient:
+    client = await _in_thread(get_qdrant_client)
+    if client is None:
+        raise RuntimeError(f"Qdrant at {settings.QDRANT_URL} is unreachable")
+    return client
+
+async def _probe_sync_qdrant_client(client: QdrantClient) -> None:
+    await _in_thread(lambda: client.get_collection(collection_name=settings.QDRANT_COLLECTION_NAME))
+
+# --- Dependency registry (circuit breakers + background probes, see /health) ---
+EMBEDDING_MODEL_DEPENDENCY = "embedding_model"
+QDRANT_DEPENDENCY = "qdrant"
+QDRANT_ASYNC_DEPENDENCY = "qdrant_async"
+OLLAMA_DEPENDENCY = "ollama"
+
+def _breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+        base_backoff=settings.CIRCUIT_BASE_BACKOFF_SECONDS,
+        max_backoff=settings.CIRCUIT_MAX_BACKOFF_SECONDS
+    )
+
+dependency_registry = DependencyRegistry()
+dependency_registry.register(ManagedDependency(EMBEDDING_MODEL_DEPENDENCY, _connect_embedding_model, _probe_embedding_model, _breaker()))
+dependency_registry.register(ManagedDependency(QDRANT_DEPENDENCY, _connect_sync_qdrant_client, _probe_sync_qdrant_client, _breaker()))
+dependency_registry.register(ManagedDependency(QDRANT_ASYNC_DEPENDENCY, _connect_async_qdrant_client, _probe_async_qdrant_client, _breaker()))
+dependency_registry.register(ManagedDependency(OLLAMA_DEPENDENCY, _connect_ollama_gateway, _probe_ollama_gateway, _breaker()))
+
+async def get_async_qdrant_client() -> AsyncQdrantClient | None:
+    """Shared AsyncQdrantClient, or None at once while Qdrant is down (breaker open)."""
+    return await dependency_registry.get(QDRANT_ASYNC_DEPENDENCY)
+
+async def close_async_qdrant_client() -> None:
+    client = dependency_registry[QDRANT_ASYNC_DEPENDENCY].instance
+    if client is not None:
+        await client.close()
+        dependency_registry[QDRANT_ASYNC_DEPENDENCY].instance = None
+
+async def get_ollama_client() -> LLMGateway | None:
+    """LLM gateway, or None at once while Ollama is down (no reconnect storm: one trial per backoff)."""
+    return await dependency_registry.get(OLLAMA_DEPENDENCY)
+
+async def get_ollama_client_dependency() -> LLMGateway:
     """Dependency function to get the Ollama async client."""
     client = await get_ollama_client() # This is line 38 in your traceback
     if client is None:
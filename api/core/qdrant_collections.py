@@ -0,0 +1,191 @@
+# api/core/qdrant_collections.py
+import logging
+from typing import Dict, Optional, Tuple
+
+from qdrant_client import QdrantClient, models as qdrant_models
+
+from .chunking import CATALOG_FACET_COLUMNS
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Payload fields used in filters, with their index type
+USER_FILES_PAYLOAD_INDEXES: Dict[str, qdrant_models.PayloadSchemaType] = {
+    "file_id": qdrant_models.PayloadSchemaType.KEYWORD,
+    "conversation_id": qdrant_models.PayloadSchemaType.KEYWORD,
+    "user_id": qdrant_models.PayloadSchemaType.INTEGER,
+}
+
+CATALOG_PAYLOAD_INDEXES: Dict[str, qdrant_models.PayloadSchemaType] = {
+    "source_sheet": qdrant_models.PayloadSchemaType.KEYWORD,
+    # Browse filters (see core/chunking.py CATALOG_FACET_COLUMNS)
+    **{f"facets.{facet}": qdrant_models.PayloadSchemaType.KEYWORD for facet in CATALOG_FACET_COLUMNS},
+}
+
+
+def user_files_collection_name() -> str:
+    return f"user_files_{settings.QDRANT_COLLECTION_NAME}"
+
+
+def _hnsw_config(tenant_partitioning: bool = False) -> qdrant_models.HnswConfigDiff:
+    if tenant_partitioning:
+        # Multitenancy: no global graph (m=0), one HNSW graph per tenant value (payload_m)
+        return qdrant_models.HnswConfigDiff(m=0, payload_m=settings.QDRANT_HNSW_M, ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT)
+    return qdrant_models.HnswConfigDiff(m=settings.QDRANT_HNSW_M, ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT)
+
+
+def _optimizers_config() -> qdrant_models.OptimizersConfigDiff:
+    return qdrant_models.OptimizersConfigDiff(indexing_threshold=settings.QDRANT_INDEXING_THRESHOLD_KB)
+
+
+def quantization_config(
+    mode: Optional[str] = None,
+    always_ram: Optional[bool] = None
+) -> Optional[qdrant_models.QuantizationConfig]:
+    """Quantization of stored vectors: none, scalar (int8, 4x smaller) or binary (32x smaller)."""
+    mode = (mode or settings.QDRANT_QUANTIZATION).lower()
+    always_ram = settings.QDRANT_QUANTIZATION_ALWAYS_RAM if always_ram is None else always_ram
+    if mode == "scalar":
+        return qdrant_models.ScalarQuantization(scalar=qdrant_models.ScalarQuantizationConfig(
+            type=qdrant_models.ScalarType.INT8,
+            quantile=settings.QDRANT_SCALAR_QUANTILE,
+            always_ram=always_ram
+        ))
+    if mode == "binary":
+        return qdrant_models.BinaryQuantization(binary=qdrant_models.BinaryQuantizationConfig(always_ram=always_ram))
+    if mode != "none":
+        logger.warning(f"Unknown QDRANT_QUANTIZATION '{mode}', storing full float32 vectors.")
+    return None
+
+
+def search_params(
+    oversampling: Optional[float] = None,
+    rescore: Optional[bool] = None
+) -> Optional[qdrant_models.SearchParams]:
+    """
+    Search parameters matching the quantization: candidates are fetched on the
+    quantized vectors (oversampled), then rescored with the original vectors.
+    """
+    if settings.QDRANT_QUANTIZATION.lower() == "none":
+        return None
+    return qdrant_models.SearchParams(quantization=qdrant_models.QuantizationSearchParams(
+        ignore=False,
+        rescore=settings.QDRANT_SEARCH_RESCORE if rescore is None else rescore,
+        oversampling=settings.QDRANT_SEARCH_OVERSAMPLING if oversampling is None else oversampling
+    ))
+
+
+def _ensure_payload_indexes(
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    indexes: Dict[str, qdrant_models.PayloadSchemaType],
+    tenant_field: Optional[str] = None
+) -> None:
+    """
+    Creates the missing payload indexes of a collection. An existing index on the
+    tenant field that is not a tenant index (or the reverse, when partitioning was
+    turned off) is dropped and recreated, so older collections get the new layout.
+    """
+    existing = qdrant_client.get_collection(collection_name=collection_name).payload_schema or {}
+    for field_name, schema_type in indexes.items():
+        if field_name in existing:
+            if _is_tenant_index(existing[field_name]) == (field_name == tenant_field):
+                continue
+            qdrant_client.delete_payload_index(collection_name=collection_name, field_name=field_name, wait=True)
+            logger.info(f"Dropped payload index on '{field_name}' of collection '{collection_name}' to change its tenant setting.")
+        field_schema = schema_type
+        if field_name == tenant_field:
+            field_schema = qdrant_models.KeywordIndexParams(type=qdrant_models.KeywordIndexType.KEYWORD, is_tenant=True)
+        qdrant_client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema,
+            wait=True
+        )
+        logger.info(f"Created payload index on '{field_name}' ({schema_type}) for collection '{collection_name}'.")
+
+
+def _is_tenant_index(index_info: object) -> bool:
+    return bool(getattr(getattr(index_info, "params", None), "is_tenant", False))
+
+
+def _differs(live: object, wanted: object, fields: Tuple[str, ...]) -> bool:
+    """True if a field set in the wanted config diff has another value in the live config."""
+    return any(
+        getattr(wanted, field) is not None and getattr(live, field, None) != getattr(wanted, field)
+        for field in fields
+    )
+
+
+def _sync_collection_config(
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    hnsw: qdrant_models.HnswConfigDiff,
+    optimizers: qdrant_models.OptimizersConfigDiff,
+    quantization: Optional[qdrant_models.QuantizationConfig]
+) -> None:
+    """
+    Applies the configured HNSW/optimizer parameters (and quantization, if the
+    collection was created without it) to an existing collection. Qdrant rebuilds
+    the affected indexes in the background.
+    """
+    config = qdrant_client.get_collection(collection_name=collection_name).config
+    update = {}
+    if _differs(config.hnsw_config, hnsw, ("m", "payload_m", "ef_construct")):
+        update["hnsw_config"] = hnsw
+    if _differs(config.optimizer_config, optimizers, ("indexing_threshold",)):
+        update["optimizers_config"] = optimizers
+    if quantization is not None and config.quantization_config is None:
+        update["quantization_config"] = quantization
+    if not update:
+        return
+    qdrant_client.update_collection(collection_name=collection_name, **update)
+    logger.info(f"Updated {', '.join(update)} of existing collection '{collection_name}'.")
+
+
+def ensure_collection(
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    vector_size: int,
+    indexes: Dict[str, qdrant_models.PayloadSchemaType],
+    tenant_field: Optional[str] = None
+) -> None:
+    """
+    Creates the collection if needed (cosine vectors, HNSW/optimizer parameters),
+    brings the parameters of an existing one in line with the settings and makes
+    sure the payload indexes used by filtered searches exist.
+    """
+    hnsw = _hnsw_config(tenant_partitioning=tenant_field is not None)
+    optimizers = _optimizers_config()
+    quantization = quantization_config()
+    if not qdrant_client.collection_exists(collection_name=collection_name):
+        qdrant_client.create_collection(
+            collection_name=collection_name,
+            vectors_config=qdrant_models.VectorParams(
+                size=vector_size,
+                distance=qdrant_models.Distance.COSINE,
+                on_disk=settings.QDRANT_VECTORS_ON_DISK
+            ),
+            hnsw_config=hnsw,
+            optimizers_config=optimizers,
+            quantization_config=quantization
+        )
+        logger.info(f"Created collection '{collection_name}' (vector size: {vector_size}, tenant field: {tenant_field}, quantization: {settings.QDRANT_QUANTIZATION}).")
+    else:
+        _sync_collection_config(qdrant_client, collection_name, hnsw, optimizers, quantization)
+    _ensure_payload_indexes(qdrant_client, collection_name, indexes, tenant_field)
+
+
+def ensure_user_files_collection(qdrant_client: QdrantClient, vector_size: int) -> str:
+    """Bootstraps the shared user-files collection and returns its name."""
+    collection_name = user_files_collection_name()
+    tenant_field = "file_id" if settings.QDRANT_USER_FILES_TENANT_PARTITIONING else None
+    ensure_collection(qdrant_client, collection_name, vector_size, USER_FILES_PAYLOAD_INDEXES, tenant_field)
+    return collection_name
+
+
+def ensure_catalog_collection(qdrant_client: QdrantClient, vector_size: int) -> str:
+    """Bootstraps the catalog collection and returns its name."""
+    collection_name = settings.QDRANT_COLLECTION_NAME
+    ensure_collection(qdrant_client, collection_name, vector_size, CATALOG_PAYLOAD_INDEXES)
+    return collection_name
@@ -0,0 +1,123 @@
+# api/core/suggest_index.py
+"""
+Sorted-array prefix index behind the catalog typeahead (source, field,
+glossary term and flux names).
+
+Every name is stored under its folded form (lowercase, no accents) and under
+each inner word start ("CLIENT_QT" is also reachable from "qt"), in one
+sorted list: a keystroke is a bisect plus a walk over the matching range.
+Results are ranked by match quality (exact, start of the name, start of an
+inner word), then by how often the name occurs in the catalog, then by kind
+and length. The ranking of every prefix matching more than a few hundred
+keys ("c", "cli_"...) is precomputed at build time, so no keystroke scans
+more than that. Only the standard library is used so standalone scripts
+(benchmarks) can import it.
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+# Ordre d'affichage à fréquence égale
+KINDS = ("source", "flux", "glossary", "field")
+
+_WORD_START = re.compile(r"[\s_\-./:()]+")
+_MATCH_EXACT, _MATCH_NAME_PREFIX, _MATCH_WORD_PREFIX = 0, 1, 2
+_MAX_SCAN = 256  # Prefixes matching more keys than this are ranked at build time
+_LAST_CHAR = chr(0x10FFFF)
+
+
+def fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower().strip())
+    return " ".join("".join(char for char in text if not unicodedata.combining(char)).split())
+
+
+class SuggestIndex:
+    """Immutable prefix index; build a new one and swap it to refresh."""
+
+    def __init__(self, entries: Iterable[Tuple[str, str]], max_limit: int = 20):
+        ids: Dict[Tuple[str, str], int] = {}
+        self.names: List[str] = []
+        self.kinds: List[str] = []
+        self.folded: List[str] = []
+        counts: List[int] = []
+        for name, kind in entries:
+            name = (name or "").strip()
+            folded = fold(name)
+            if not folded or kind not in KINDS:
+                continue
+            entry_id = ids.get((folded, kind))
+            if entry_id is None:
+                entry_id = ids[(folded, kind)] = len(self.names)
+                self.names.append(name)
+                self.kinds.append(kind)
+                self.folded.append(folded)
+                counts.append(0)
+            counts[entry_id] += 1
+
+        # Rang statique : plus fréquent d'abord, puis par type, puis le plus court
+        order = sorted(range(len(self.names)),
+                       key=lambda i: (-counts[i], KINDS.index(self.kinds[i]), len(self.folded[i]), self.folded[i]))
+        self.static_rank = [0] * len(self.names)
+        for rank, entry_id in enumerate(order):
+            self.static_rank[entry_id] = rank
+
+        keyed: List[Tuple[str, int, int]] = []  # (key, entry id, 0 if the key is the whole name)
+        for entry_id, folded in enumerate(self.folded):
+            keyed.append((folded, entry_id, 0))
+            for match in _WORD_START.finditer(folded):
+                if match.end() < len(folded):
+                    keyed.append((folded[match.end():], entry_id, 1))
+        keyed.sort()
+        self.keys = [key for key, _, _ in keyed]
+        self.entry_ids = [entry_id for _, entry_id, _ in keyed]
+        self.inner = [inner for _, _, inner in keyed]
+
+        self.max_limit = max_limit
+        self._precomputed: Dict[str, List[int]] = {}
+        # Parcours en profondeur des plages trop larges : préfixe -> plage de ses extensions d'un caractère
+        stack = [(0, len(self.keys), 0)]
+        while stack:
+            low, high, depth = stack.pop()
+            if depth:
+                self._precomputed[self.keys[low][:depth]] = self._rank(low, high, self.keys[low][:depth], max_limit)
+            position = low
+            while position < high and len(self.keys[position]) <= depth:
+                position += 1  # Clés égales au préfixe (en tête de plage)
+            while position < high:
+                prefix = self.keys[position][:depth + 1]
+                end = bisect_left(self.keys, prefix + _LAST_CHAR, position, high)
+                if end - position > _MAX_SCAN:
+                    stack.append((position, end, depth + 1))
+                position = end
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _rank(self, start: int, end: int, prefix: str, limit: int) -> List[int]:
+        """Best `limit` entries among the keys[start:end] (all starting with prefix)."""
+        best: Dict[int, Tuple[int, int]] = {}
+        for position in range(start, end):
+            entry_id = self.entry_ids[position]
+            if self.inner[position]:
+                quality = _MATCH_WORD_PREFIX
+            else:
+                quality = _MATCH_EXACT if self.keys[position] == prefix else _MATCH_NAME_PREFIX
+            score = (quality, self.static_rank[entry_id])
+            if score < best.get(entry_id, (3, 0)):
+                best[entry_id] = score
+        return [entry_id for entry_id, _ in heapq.nsmallest(limit, best.items(), key=lambda item: item[1])]
+
+    def suggest(self, query: str, limit: int = 10) -> List[Tuple[str, str]]:
+        """Ranked (name, kind) completions of `query`."""
+        prefix = fold(query)
+        if not prefix:
+            return []
+        limit = max(1, min(limit, self.max_limit))
+        entry_ids = self._precomputed.get(prefix)
+        if entry_ids is None:
+            start = bisect_left(self.keys, prefix)
+            entry_ids = self._rank(start, bisect_left(self.keys, prefix + _LAST_CHAR, start), prefix, limit)
+        entry_ids = entry_ids[:limit]
+        return [(self.names[entry_id], self.kinds[entry_id]) for entry_id in entry_ids]
@@ -4,4 +4,5 @@
 from . import user
 from . import conversation
 from . import feedback # ADD THIS LINE
+from . import ingestion_job # Durable catalog ingestion jobs (see api/worker.py)
 from . import db_utils # Import db_utils if needed elsewhere via crud.db_utils
\ No newline at end of file
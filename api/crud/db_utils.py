@@ -125,6 +125,31 @@ def init_db():
             """)
             logger.info("Checked/Created 'conversations' table.")
 
+            # Create ingestion_jobs table (catalog uploads processed by the ingestion worker)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                    id VARCHAR(36) PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    file_content BYTEA NOT NULL, -- Kept until completion so the job can be retried/resumed
+                    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+                    stage VARCHAR(20),
+                    progress JSONB NOT NULL DEFAULT '{}'::jsonb,
+                    checkpoint JSONB, -- Last batch written to Qdrant: {"sheet": ..., "batch": ...}, progress only (a retry skips written rows through the content-hash diff)
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 3,
+                    error TEXT,
+                    worker_id VARCHAR(100),
+                    created_by INTEGER REFERENCES users(id) ON DELETE SET NULL,
+                    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    started_at TIMESTAMP WITH TIME ZONE,
+                    heartbeat_at TIMESTAMP WITH TIME ZONE,
+                    finished_at TIMESTAMP WITH TIME ZONE,
+                    next_attempt_at TIMESTAMP WITH TIME ZONE -- A failed attempt is retried after a backoff delay
+                )
+            """)
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status ON ingestion_jobs (status, created_at)")
+            logger.info("Checked/Created 'ingestion_jobs' table.")
+
             # Insert default admin user if not present
             cur.execute("SELECT 1 FROM users WHERE username = %s LIMIT 1", ('admin',))
             if not cur.fetchone():
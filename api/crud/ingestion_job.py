@@ -0,0 +1,210 @@
+# api/crud/ingestion_job.py
+import logging
+import uuid
+from typing import Any, Dict, List, Optional
+
+import psycopg2
+from psycopg2.extras import Json as PsycopgJson
+
+from .db_utils import db_session
+
+logger = logging.getLogger(__name__)
+
+# Job statuses
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# Every column except the uploaded file itself
+_JOB_COLUMNS = """
+    id, filename, status, stage, progress, checkpoint, attempts, max_attempts, error,
+    worker_id, created_by, created_at, started_at, heartbeat_at, finished_at, next_attempt_at
+"""
+
+
+def create_ingestion_job(
+    filename: str,
+    file_content: bytes,
+    created_by: Optional[int],
+    max_attempts: int
+) -> Optional[Dict[str, Any]]:
+    """Queues a catalog upload for the ingestion worker."""
+    job_id = str(uuid.uuid4())
+    try:
+        with db_session() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO ingestion_jobs (id, filename, file_content, status, created_by, max_attempts)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING {_JOB_COLUMNS}
+                """,
+                (job_id, filename, psycopg2.Binary(file_content), JOB_QUEUED, created_by, max_attempts)
+            )
+            record = cur.fetchone()
+            logger.info(f"Queued ingestion job {job_id} for file '{filename}'.")
+            return dict(record) if record else None
+    except Exception as e:
+        logger.error(f"Error creating ingestion job for '{filename}': {e}", exc_info=True)
+        return None
+
+
+def get_ingestion_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Retrieves a job (without its file content)."""
+    try:
+        with db_session() as cur:
+            cur.execute(f"SELECT {_JOB_COLUMNS} FROM ingestion_jobs WHERE id = %s", (job_id,))
+            record = cur.fetchone()
+            return dict(record) if record else None
+    except Exception as e:
+        logger.error(f"Error retrieving ingestion job {job_id}: {e}", exc_info=True)
+        return None
+
+
+def list_ingestion_jobs(limit: int = 50) -> List[Dict[str, Any]]:
+    """Most recent jobs first."""
+    try:
+        with db_session() as cur:
+            cur.execute(f"SELECT {_JOB_COLUMNS} FROM ingestion_jobs ORDER BY created_at DESC LIMIT %s", (limit,))
+            return [dict(record) for record in cur.fetchall()]
+    except Exception as e:
+        logger.error(f"Error listing ingestion jobs: {e}", exc_info=True)
+        return []
+
+
+def last_completed_ingestion_at() -> Optional[Any]:
+    """finished_at of the most recent completed job (None if none, or on error)."""
+    try:
+        with db_session() as cur:
+            cur.execute("SELECT MAX(finished_at) AS finished_at FROM ingestion_jobs WHERE status = %s", (JOB_COMPLETED,))
+            record = cur.fetchone()
+            return record["finished_at"] if record else None
+    except Exception as e:
+        logger.error(f"Error reading the last completed ingestion job: {e}", exc_info=True)
+        return None
+
+
+def claim_next_ingestion_job(worker_id: str, stale_after_seconds: int) -> Optional[Dict[str, Any]]:
+    """
+    Atomically claims the oldest queued job whose retry delay has elapsed, or a
+    running job whose worker stopped sending heartbeats (resume). Returns the job
+    with its file content, or None.
+    """
+    with db_session() as cur:
+        # Jobs abandoned by a dead worker with no attempt left are marked failed
+        cur.execute(
+            """
+            UPDATE ingestion_jobs
+            SET status = %s, error = COALESCE(error, 'Worker stopped responding'), finished_at = CURRENT_TIMESTAMP
+            WHERE status = %s AND attempts >= max_attempts
+              AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+            """,
+            (JOB_FAILED, JOB_RUNNING, stale_after_seconds)
+        )
+        cur.execute(
+            f"""
+            UPDATE ingestion_jobs
+            SET status = %s, worker_id = %s, attempts = attempts + 1, stage = NULL, error = NULL,
+                started_at = COALESCE(started_at, CURRENT_TIMESTAMP), heartbeat_at = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM ingestion_jobs
+                WHERE (status = %s AND (next_attempt_at IS NULL OR next_attempt_at <= CURRENT_TIMESTAMP))
+                   OR (status = %s AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+                ORDER BY created_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING {_JOB_COLUMNS}, file_content
+            """,
+            (JOB_RUNNING, worker_id, JOB_QUEUED, JOB_RUNNING, stale_after_seconds)
+        )
+        record = cur.fetchone()
+        if not record:
+            return None
+        job = dict(record)
+        job["file_content"] = bytes(job["file_content"])
+        logger.info(f"Worker {worker_id} claimed ingestion job {job['id']} (attempt {job['attempts']}/{job['max_attempts']}).")
+        return job
+
+
+def save_ingestion_progress(
+    job_id: str,
+    progress: Dict[str, Any],
+    stage: Optional[str] = None,
+    checkpoint: Optional[Dict[str, Any]] = None
+) -> None:
+    """Persists progress counters (and the checkpoint when given) and refreshes the heartbeat."""
+    with db_session() as cur:
+        cur.execute(
+            """
+            UPDATE ingestion_jobs
+            SET progress = %s, stage = %s, checkpoint = COALESCE(%s, checkpoint), heartbeat_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+            """,
+            (PsycopgJson(progress), stage, PsycopgJson(checkpoint) if checkpoint is not None else None, job_id)
+        )
+
+
+def finish_ingestion_job(
+    job_id: str,
+    progress: Dict[str, Any],
+    error: Optional[str] = None,
+    retry_backoff_seconds: float = 0
+) -> str:
+    """
+    Records the end of an attempt. A failed attempt goes back to the queue while
+    attempts remain, and is not claimed again before retry_backoff_seconds, doubled
+    at each attempt. The uploaded file is dropped once the job completed.
+    Returns the resulting status.
+    """
+    with db_session() as cur:
+        if error is None:
+            cur.execute(
+                """
+                UPDATE ingestion_jobs
+                SET status = %s, stage = NULL, progress = %s, error = NULL, file_content = ''::bytea,
+                    finished_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+                RETURNING status
+                """,
+                (JOB_COMPLETED, PsycopgJson(progress), job_id)
+            )
+        else:
+            cur.execute(
+                """
+                UPDATE ingestion_jobs
+                SET status = CASE WHEN attempts < max_attempts THEN %s ELSE %s END,
+                    stage = NULL, progress = %s, error = %s, heartbeat_at = CURRENT_TIMESTAMP,
+                    finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE CURRENT_TIMESTAMP END,
+                    next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => %s * power(2, GREATEST(attempts - 1, 0)))
+                WHERE id = %s
+                RETURNING status
+                """,
+                (JOB_QUEUED, JOB_FAILED, PsycopgJson(progress), error, retry_backoff_seconds, job_id)
+            )
+        record = cur.fetchone()
+        return record["status"] if record else JOB_FAILED
+
+
+def requeue_ingestion_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Manually retries a failed job, right away. Rows written by the previous attempts
+    are found unchanged by the content-hash diff and are not encoded again.
+    Returns None if the job is not retryable.
+    """
+    try:
+        with db_session() as cur:
+            cur.execute(
+                f"""
+                UPDATE ingestion_jobs
+                SET status = %s, attempts = 0, finished_at = NULL, next_attempt_at = NULL
+                WHERE id = %s AND status = %s AND octet_length(file_content) > 0
+                RETURNING {_JOB_COLUMNS}
+                """,
+                (JOB_QUEUED, job_id, JOB_FAILED)
+            )
+            record = cur.fetchone()
+            return dict(record) if record else None
+    except Exception as e:
+        logger.error(f"Error requeuing ingestion job {job_id}: {e}", exc_info=True)
+        return None
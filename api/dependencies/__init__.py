@@ -4,12 +4,13 @@ from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sentence_transformers import SentenceTransformer
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, AsyncQdrantClient
 import ollama
 
 # Relative imports
 from ..core.config import settings
 from ..core import models as core_models
+from ..core.llm_gateway import LLMGateway
 from ..crud import user as crud_user
 from ..schemas.user import UserInDB
 
@@ -17,24 +18,34 @@ logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def get_embedding_model_dependency() -> SentenceTransformer:
+# The getters below go through the dependency registry (core/models.py): while a
+# dependency is down its circuit is open and requests get a 503 immediately.
+async def get_embedding_model_dependency() -> SentenceTransformer:
     """Dependency function to get the embedding model."""
-    model = core_models.get_embedding_model()
+    model = await core_models.dependency_registry.get(core_models.EMBEDDING_MODEL_DEPENDENCY)
     if model is None:
         logger.critical("Embedding model dependency not available.")
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Embedding model is not available")
     return model
 
-def get_qdrant_client_dependency() -> QdrantClient:
+async def get_qdrant_client_dependency() -> QdrantClient:
     """Dependency function to get the Qdrant client."""
-    client = core_models.get_qdrant_client()
+    client = await core_models.dependency_registry.get(core_models.QDRANT_DEPENDENCY)
     if client is None:
         logger.critical("Qdrant client dependency not available.")
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Vector database client is not available")
     return client
 
-async def get_ollama_client_dependency() -> ollama.AsyncClient:
-    """Dependency function to get the Ollama async client."""
+async def get_async_qdrant_client_dependency() -> AsyncQdrantClient:
+    """Dependency function to get the async Qdrant client (request-time searches)."""
+    client = await core_models.get_async_qdrant_client()
+    if client is None:
+        logger.critical("Async Qdrant client dependency not available.")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Vector database client is not available")
+    return client
+
+async def get_ollama_client_dependency() -> LLMGateway:
+    """Dependency function to get the Ollama client (LLM gateway)."""
     client = await core_models.get_ollama_client()
     if client is None:
         logger.critical("Ollama async client dependency not available.")
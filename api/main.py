@@ -9,8 +9,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from .routers import auth as auth_router
 from .routers import chat as chat_router
 from .routers import admin as admin_router
+from .routers import catalog as catalog_router
 from .core.config import settings
 from .crud.db_utils import init_db
+from .core.models import close_async_qdrant_client, dependency_registry, get_async_qdrant_client, EMBEDDING_MODEL_DEPENDENCY
+from .services import catalog_lookup, lineage_graph, reranker, intent_classifier, prompt_budget
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -36,11 +39,30 @@ app.add_middleware(
 async def startup_event():
     logger.info("Application startup...")
     init_db() # Ensure DB is initialized on startup
+    # Connects Ollama / Qdrant / embedding model in the background, then keeps probing them
+    dependency_registry.start(settings.DEPENDENCY_PROBE_INTERVAL_SECONDS)
+    # Cross-encoder loaded (or downloaded) in a worker thread, not on the first request
+    reranker.start_loading()
+    # Prompt tokenizer too: token counts fall back to a character estimate until it is there
+    prompt_budget.start_loading()
+    # Intent centroids encoded once the embedding model is up, off the request path
+    intent_classifier.start_building(lambda: dependency_registry.get(EMBEDDING_MODEL_DEPENDENCY))
+    if settings.CATALOG_LOOKUP_ENABLED or settings.CATALOG_SUGGEST_ENABLED:
+        # In-memory index of the lookup sheets, rebuilt from the catalog payloads after each ingestion
+        catalog_lookup.start_refresh(get_async_qdrant_client, settings.CATALOG_LOOKUP_REFRESH_SECONDS,
+                                     settings.CATALOG_INGESTION_POLL_SECONDS)
+    if settings.LINEAGE_ENABLED:
+        lineage_graph.start_refresh(get_async_qdrant_client, settings.LINEAGE_REFRESH_SECONDS,
+                                    settings.CATALOG_INGESTION_POLL_SECONDS)
     logger.info("Application startup complete.")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Application shutdown...")
+    await dependency_registry.stop()
+    await catalog_lookup.stop_refresh()
+    await lineage_graph.stop_refresh()
+    await close_async_qdrant_client()
     logger.info("Application shutdown complete.")
 
 # --- Exception Handlers ---
@@ -56,10 +78,13 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 # >>> ADD THIS SECTION <<<
 @app.get("/health", tags=["Health Check"], status_code=status.HTTP_200_OK)
 async def health_check():
-    """Simple health check endpoint."""
+    """
+    Liveness plus the circuit state of each dependency (Ollama, Qdrant, embedding model).
+    Always 200 while the API runs: a down dependency is reported as "degraded" and
+    answered with fast 503s, it must not make the container healthcheck restart the API.
+    """
     logger.debug("Health check endpoint '/health' accessed.")
-    # Optionally add checks here (e.g., DB connection) if needed
-    return {"status": "healthy"}
+    return dependency_registry.snapshot()
 # >>> END OF ADDITION <<<
 
 # --- Routers ---
@@ -67,6 +92,7 @@ logger.info("Including API routers...")
 app.include_router(auth_router.router)
 app.include_router(chat_router.router)
 app.include_router(admin_router.router)
+app.include_router(catalog_router.router)
 
 # --- Root Endpoint ---
 @app.get("/", tags=["Root"])
@@ -8,13 +8,11 @@ from fastapi import (
     status,
     UploadFile,
     File,
-    BackgroundTasks,
     Path,
     Query,
     Body
 )
-from qdrant_client import QdrantClient, models as qdrant_models
-from sentence_transformers import SentenceTransformer
+from qdrant_client import AsyncQdrantClient, models as qdrant_models
 
 # Relative imports for schemas, crud, services, dependencies
 from ..schemas.admin import (
@@ -22,16 +20,23 @@ from ..schemas.admin import (
     FeedbackEntry,
     CatalogInfoResponse,
     CatalogUploadResponse,
+    IngestionJobResponse,
     AdminConfigResponse,
-    UpdateAdminEmailRequest
+    UpdateAdminEmailRequest,
+    PromptCacheStatsResponse,
+    LlmGatewayStatsResponse,
+    QueryEmbeddingCacheStatsResponse
 )
 from ..schemas.user import User # For response on email update
 from ..core.config import settings
 from ..core.security import TokenData, get_current_active_admin # Security dependency
+from ..core.llm_gateway import LLMGateway
+from ..core.models import get_query_embedding_cache
 from ..crud import user as crud_user
 from ..crud import feedback as crud_feedback
-from ..services import admin_service # Import the background task logic
-from ..dependencies import get_qdrant_client_dependency, get_embedding_model_dependency # Import dependencies
+from ..crud import ingestion_job as crud_ingestion_job
+from ..services import llm_metrics
+from ..dependencies import get_async_qdrant_client_dependency, get_ollama_client_dependency # Import dependencies
 
 logger = logging.getLogger(__name__)
 
@@ -150,14 +155,13 @@ async def clear_feedback(
 
 @router.post("/catalog/upload", response_model=CatalogUploadResponse)
 async def upload_catalog_file(
-    background_tasks: BackgroundTasks,
-    qdrant_client: QdrantClient = Depends(get_qdrant_client_dependency),
-    embedding_model: SentenceTransformer = Depends(get_embedding_model_dependency),
-    file: UploadFile = File(..., description="Excel file (.xlsx) containing catalog data")
+    file: UploadFile = File(..., description="Excel file (.xlsx) containing catalog data"),
+    current_admin: TokenData = Depends(get_current_active_admin)
 ):
     """
     Uploads an Excel file to update the Qdrant data catalog.
-    Processing happens in the background (Admin only).
+    The file is queued in the ingestion_jobs table and processed by the
+    ingestion worker (python -m api.worker), outside of the API (Admin only).
     """
     if not file.filename.endswith('.xlsx'):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file type. Only .xlsx files are accepted.")
@@ -167,33 +171,60 @@ async def upload_catalog_file(
     try:
         # Read file content into memory - careful with very large files
         contents = await file.read()
-        # Add the processing to background tasks
-        background_tasks.add_task(
-            admin_service.process_and_upsert_excel_task,
-            file_content=contents,
-            filename=file.filename,
-            qdrant_client=qdrant_client, # Pass dependencies needed by the task
-            embedding_model=embedding_model
-        )
-        logger.info(f"Added background task for processing file: {file.filename}")
-        return CatalogUploadResponse(filename=file.filename)
-    except Exception as e:
-         logger.error(f"Error handling catalog upload for file {file.filename}: {e}", exc_info=True)
-         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to initiate file processing: {e}")
     finally:
-         await file.close()
+        await file.close()
+
+    job = crud_ingestion_job.create_ingestion_job(
+        filename=file.filename,
+        file_content=contents,
+        created_by=current_admin.user_id,
+        max_attempts=settings.INGESTION_JOB_MAX_ATTEMPTS
+    )
+    if not job:
+        logger.error(f"Error queuing catalog upload for file {file.filename}.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to queue file processing.")
+    logger.info(f"Queued ingestion job {job['id']} for file: {file.filename}")
+    return CatalogUploadResponse(filename=file.filename, job_id=job["id"], message="File received and queued for ingestion.")
+
+@router.get("/catalog/jobs", response_model=List[IngestionJobResponse])
+async def list_catalog_jobs(limit: int = Query(50, ge=1, le=500)):
+    """Lists recent catalog ingestion jobs, most recent first (Admin only)."""
+    logger.info("Admin action: Listing catalog ingestion jobs.")
+    jobs = crud_ingestion_job.list_ingestion_jobs(limit=limit)
+    return [IngestionJobResponse.from_record(job) for job in jobs]
+
+@router.get("/catalog/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_catalog_job(
+    job_id: str = Path(..., description="ID returned by the catalog upload")
+):
+    """Reports the progress of a catalog ingestion job (Admin only)."""
+    job = crud_ingestion_job.get_ingestion_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ingestion job not found")
+    return IngestionJobResponse.from_record(job)
+
+@router.post("/catalog/jobs/{job_id}/retry", response_model=IngestionJobResponse)
+async def retry_catalog_job(
+    job_id: str = Path(..., description="ID of a failed ingestion job")
+):
+    """Queues a failed ingestion job again; rows already written are not re-encoded (Admin only)."""
+    logger.info(f"Admin action: Retrying ingestion job {job_id}")
+    job = crud_ingestion_job.requeue_ingestion_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Job not found or not in a retryable (failed) state")
+    return IngestionJobResponse.from_record(job)
 
 # >>> CORRECTED FUNCTION <<<
 @router.get("/catalog/info", response_model=CatalogInfoResponse)
 async def get_catalog_info(
-    qdrant_client: QdrantClient = Depends(get_qdrant_client_dependency)
+    qdrant_client: AsyncQdrantClient = Depends(get_async_qdrant_client_dependency)
 ):
     """Gets information about the Qdrant data catalog collection (Admin only)."""
     logger.info("Admin action: Requesting catalog info.")
     collection_name = settings.QDRANT_COLLECTION_NAME
     try:
         # Get collection information
-        collection_info = qdrant_client.get_collection(collection_name=collection_name)
+        collection_info = await qdrant_client.get_collection(collection_name=collection_name)
         logger.debug(f"Raw collection info retrieved: {collection_info}") # Add debug log
 
         # --- CORRECTED ACCESS TO VECTOR DIMENSION ---
@@ -241,6 +272,34 @@ async def get_catalog_info(
 # >>> END CORRECTED FUNCTION <<<
 
 
+# --- LLM Metrics Endpoints ---
+
+@router.get("/llm/prompt-cache", response_model=PromptCacheStatsResponse)
+async def get_prompt_cache_stats():
+    """Reports Ollama prompt-eval counters and KV-prefix cache reuse (Admin only)."""
+    logger.info("Admin action: Fetching LLM prompt cache statistics.")
+    return PromptCacheStatsResponse(**llm_metrics.prompt_cache_stats.snapshot())
+
+
+@router.get("/llm/gateway", response_model=LlmGatewayStatsResponse)
+async def get_llm_gateway_stats(
+    llm_gateway: LLMGateway = Depends(get_ollama_client_dependency)
+):
+    """Reports LLM gateway load: in-flight generations, queued calls, coalesced requests (Admin only)."""
+    logger.info("Admin action: Fetching LLM gateway statistics.")
+    return LlmGatewayStatsResponse(**llm_gateway.stats())
+
+
+@router.get("/embedding/query-cache", response_model=QueryEmbeddingCacheStatsResponse)
+async def get_query_embedding_cache_stats():
+    """Reports hit/miss counters of the in-memory query embedding cache (Admin only)."""
+    logger.info("Admin action: Fetching query embedding cache statistics.")
+    cache = get_query_embedding_cache()
+    if cache is None:
+        return QueryEmbeddingCacheStatsResponse(enabled=False, model_name=settings.EMBEDDING_MODEL_NAME)
+    return QueryEmbeddingCacheStatsResponse(enabled=True, **cache.stats())
+
+
 # --- Admin Config Endpoints ---
 
 @router.get("/config", response_model=AdminConfigResponse)
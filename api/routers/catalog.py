@@ -0,0 +1,66 @@
+# api/routers/catalog.py
+import logging
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from qdrant_client import AsyncQdrantClient
+
+from ..core.config import settings
+from ..core.security import get_current_user
+from ..schemas.catalog import CatalogSuggestion, CatalogSuggestResponse, CatalogEntry, CatalogBrowseResponse
+from ..services import catalog_browse, catalog_suggest
+from ..dependencies import get_async_qdrant_client_dependency
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/api/v1/catalog",
+    tags=["Catalog"],
+    dependencies=[Depends(get_current_user)] # Applies auth to all routes
+)
+
+
+@router.get("/suggest", response_model=CatalogSuggestResponse)
+async def suggest_catalog_names(
+    q: str = Query(..., min_length=1, max_length=200, description="Prefix typed by the user"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.CATALOG_SUGGEST_MAX_LIMIT)
+):
+    """
+    Typeahead over the source, field, glossary term and flux names of the catalog.
+    Served from the in-memory index (no Qdrant call): a sub-millisecond lookup, run on the event loop.
+    """
+    if not settings.CATALOG_SUGGEST_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Catalog suggestions are disabled.")
+    completions = catalog_suggest.suggest(q, limit or settings.CATALOG_SUGGEST_DEFAULT_LIMIT)
+    return CatalogSuggestResponse(
+        query=q,
+        suggestions=[CatalogSuggestion(value=value, kind=kind) for value, kind in completions],
+        ready=catalog_suggest.is_ready()
+    )
+
+
+@router.get("/entries", response_model=CatalogBrowseResponse)
+async def browse_catalog(
+    sheet: Optional[List[str]] = Query(None, description="Sheet name(s), e.g. Référentiel Sources"),
+    filiale: Optional[List[str]] = Query(None),
+    plateforme: Optional[List[str]] = Query(None, description="Matches Plateforme, Plateforme source or Plateforme cible"),
+    domaine: Optional[List[str]] = Query(None, description="Matches Domaine or Sous domaine"),
+    technologie: Optional[List[str]] = Query(None, description="Matches Technologie or Technologie de chargement(Outil)"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.CATALOG_BROWSE_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    qdrant_client: AsyncQdrantClient = Depends(get_async_qdrant_client_dependency)
+):
+    """
+    Pages through the catalog rows matching the filters (repeat a parameter to OR values).
+    Filtering runs in Qdrant on the payload indexes written at ingestion.
+    """
+    facets = {"filiale": filiale, "plateforme": plateforme, "domaine": domaine, "technologie": technologie}
+    try:
+        entries, next_cursor = await catalog_browse.browse(
+            qdrant_client, sheet, facets, limit or settings.CATALOG_BROWSE_DEFAULT_LIMIT, cursor
+        )
+    except catalog_browse.InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error browsing the catalog: {e}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to browse the catalog.")
+    return CatalogBrowseResponse(entries=[CatalogEntry(**entry) for entry in entries], next_cursor=next_cursor)
@@ -1,8 +1,11 @@
 ﻿# api/routers/chat.py
 import logging
+import asyncio
+import functools
 import datetime
 import uuid
 import os
+import time
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Body, UploadFile, File, Form, Path, Request
 from fastapi.responses import Response, FileResponse
@@ -19,10 +22,12 @@ from .. import crud, services # Import crud and services
 from ..dependencies import (
     get_embedding_model_dependency,
     get_qdrant_client_dependency,
+    get_async_qdrant_client_dependency,
     get_ollama_client_dependency
 )
-from qdrant_client import QdrantClient # Import types for dependency injection hints
+from qdrant_client import QdrantClient, AsyncQdrantClient # Import types for dependency injection hints
 from ..services.rag_service import ClientDisconnectedError # Importer l'exception personnalisÃ©e
+from ..services.request_cancellation import run_until_disconnected # Cancels the pipeline when the client leaves
 
 
 logger = logging.getLogger(__name__)
@@ -49,6 +54,11 @@ async def create_new_conversation(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not start new conversation")
     return new_conversation
 
+def _write_file(file_path: str, contents: bytes) -> None:
+    with open(file_path, "wb") as f:
+        f.write(contents)
+
+
 # File upload endpoint for conversations
 @router.post("/conversations/{conversation_id}/upload", response_model=FileUploadResponse)
 async def upload_file_to_conversation(
@@ -67,7 +77,7 @@ async def upload_file_to_conversation(
     
     # Verify conversation exists and belongs to user
     logger.info(f"User {current_user.user_id} uploading file to conversation {conversation_id}")
-    conversation = crud.conversation.get_conversation_by_id(conv_id=conversation_id, user_id=current_user.user_id)
+    conversation = await _run_db(crud.conversation.get_conversation_by_id, conv_id=conversation_id, user_id=current_user.user_id)
     if not conversation:
         logger.warning(f"Conversation {conversation_id} not found for user {current_user.user_id}.")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found or access denied")
@@ -82,8 +92,7 @@ async def upload_file_to_conversation(
         
         # Read and save the file
         contents = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        await asyncio.get_event_loop().run_in_executor(None, _write_file, file_path, contents)
         
         # Process file content for RAG database
         await services.chat_service.process_excel_for_conversation(
@@ -106,7 +115,7 @@ async def upload_file_to_conversation(
         
         # Add file to conversation
         conversation.files.append(file_metadata)
-        crud.conversation.save_conversation(conversation_data=conversation)
+        await _run_db(crud.conversation.save_conversation, conversation_data=conversation)
         
         logger.info(f"File {file.filename} uploaded to conversation {conversation_id} with id {file_id}")
         
@@ -179,13 +188,16 @@ async def post_chat_message(
     request: Request,
     current_user: TokenData = Depends(get_current_user),
     embedding_model: SentenceTransformer = Depends(get_embedding_model_dependency),
-    qdrant_client: QdrantClient = Depends(get_qdrant_client_dependency),
+    qdrant_client: AsyncQdrantClient = Depends(get_async_qdrant_client_dependency),
     ollama_client: ollama.Client = Depends(get_ollama_client_dependency)
 ):
     """
     Sends a user message, gets a RAG response, and updates the conversation.
     If conversation_id is omitted, a new conversation is started.
     If file_id is included, the referenced file will be used for context.
+    Independent stages overlap: the conversation is created or loaded (DB, in a
+    worker thread) while the file context, embedding and search run. A watcher
+    cancels the whole pipeline as soon as the client disconnects.
     """
     user_id = current_user.user_id
     prompt = chat_request.prompt
@@ -195,138 +207,153 @@ async def post_chat_message(
     logger.info(f"User {user_id} sending message to conversation '{conversation_id or 'New'}': '{prompt[:50]}...', file_id: {file_id}")
 
     try:
-        # 1. Handle conversation ID
-        if await request.is_disconnected():
-            logger.warning(f"Client disconnected before conversation handling for user {user_id}.")
-            return Response(status_code=204) # Pas de contenu, le client est parti
-
-        if not conversation_id:
-            actual_new_conv = services.history_service.start_new_conversation(user_id=user_id)
-            if not actual_new_conv:
-                 logger.error(f"Failed to start new conversation for user {user_id} from history_service.")
-                 raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not start new conversation")
-            conversation_id = actual_new_conv.id
-            logger.info(f"Started new conversation {conversation_id} for user {user_id}")
-        else:
-             logger.info(f"Using existing conversation {conversation_id}")
-
-        # 2. Get RAG response
-        if await request.is_disconnected():
-            logger.warning(f"Client disconnected before RAG processing for conversation {conversation_id}.")
-            return Response(status_code=204)
-
-        # RÃ©cupÃ©rer l'historique de conversation existant si disponible
-        conversation_history = []
-        current_conversation = crud.conversation.get_conversation_by_id(conv_id=conversation_id, user_id=user_id)
-        if current_conversation and hasattr(current_conversation, 'messages') and current_conversation.messages:
-            # Limiter l'historique aux derniers Ã©changes pour Ã©viter les prompts trop longs
-            # Nous prenons les 6 derniers messages (3 Ã©changes) pour conserver le contexte rÃ©cent
-            conversation_history = current_conversation.messages[-6:] if len(current_conversation.messages) > 6 else current_conversation.messages
-            logger.info(f"Retrieved {len(conversation_history)} messages as conversation history.")
-
-        file_context = None
-        if file_id:
-            logger.info(f"File_id '{file_id}' provided. Attempting to retrieve file context for conversation {conversation_id}.")
-            try:
-                file_context = services.chat_service.get_file_context(
-                    file_id=file_id, 
-                    query=prompt, 
-                    embedding_model=embedding_model,
-                    qdrant_client=qdrant_client
-                )
-                if file_context:
-                    logger.info(f"Successfully retrieved context from file '{file_id}'. Context length: {len(file_context)}")
-                else:
-                    logger.warning(f"No specific context retrieved from file '{file_id}' for query '{prompt[:50]}...'. RAG will proceed without specific file context.")
-            except services.chat_service.FileContextRetrievalError as e:
-                logger.error(f"Error retrieving file context for file_id {file_id}: {e}", exc_info=True)
-            except Exception as e:
-                logger.error(f"Unexpected error retrieving file context for file_id {file_id}: {e}", exc_info=True)
-        
-        # Modifier la requÃªte pour demander une rÃ©ponse en HTML
-        
-        html_prompt = """IMPORTANT: Ta rÃ©ponse doit Ãªtre formatÃ©e en HTML pur, PAS en Markdown.
-
-Formate ta rÃ©ponse avec ces balises HTML:
-- <h1> pour le titre principal
-- <h2> pour les sous-sections
-- <h3> pour les points importants 
-- <p> pour les paragraphes
-- <ul><li>item</li></ul> pour les listes Ã  puces (SANS ESPACES entre les Ã©lÃ©ments)
-- <ol><li>item</li></ol> pour les listes numÃ©rotÃ©es (SANS ESPACES entre les Ã©lÃ©ments)
-- <strong>texte</strong> pour le gras
-- <em>texte</em> pour l'italique
-- <table><tr><th>entÃªte</th></tr><tr><td>cellule</td></tr></table> pour les tableaux
-
-ATTENTION: Ã‰vite Ã  tout prix les espaces entre les Ã©lÃ©ments de liste. Format compact requis.
-
-EXEMPLE de formatage CORRECT pour liste:
-<ul>
-  <li>Premier point</li>
-  <li>Second point</li>
-<li>TroisiÃ¨me point</li>
-</ul>
-
-Question: """ + prompt
-        
-        # CORRECTION: Utiliser d'abord la question originale pour la dÃ©tection, puis appliquer le HTML si nÃ©cessaire
-        assistant_response_content = await services.rag_service.get_rag_response(
-            user_query=prompt,  # IMPORTANT: Utiliser la question originale pour la dÃ©tection
-            embedding_model=embedding_model,
-            qdrant_client=qdrant_client,
-            ollama_client=ollama_client,
-            file_context=file_context,
-            request_object=request,
-            conversation_history=None,  # TEMPORAIRE: DÃ©sactiver l'historique pour rÃ©soudre le bug
-            html_formatting_request=html_prompt  # Nouveau paramÃ¨tre pour le formatage HTML
-        )
-        assistant_message = Message(role="assistant", content=assistant_response_content)
-        logger.info(f"Successfully processed RAG response for conversation {conversation_id}.")
-
-        # 3. Save messages to history
-        if await request.is_disconnected():
-            logger.warning(f"Client disconnected before saving history for conversation {conversation_id}.")
-            return Response(status_code=204)
-        
-        user_message = Message(role="user", content=prompt, file_id=file_id)
-        current_conversation = crud.conversation.get_conversation_by_id(conv_id=conversation_id, user_id=user_id)
-        if not current_conversation:
-             logger.error(f"Failed to retrieve conversation {conversation_id} before saving history.")
-        else:
-            current_conversation.messages.append(user_message)
-            current_conversation.messages.append(assistant_message)
-            current_conversation.timestamp = datetime.datetime.now(datetime.timezone.utc)
-            if len(current_conversation.messages) == 2:
-                current_conversation.title = services.history_service.generate_conversation_title(current_conversation.messages)
-            save_success = crud.conversation.save_conversation(conversation_data=current_conversation)
-            if not save_success:
-                 logger.error(f"Failed to save messages to history for conversation {conversation_id}")
-            else:
-                 logger.info(f"Saved messages to conversation {conversation_id}")
-
-        # 4. Return response
-        if await request.is_disconnected():
-            logger.warning(f"Client disconnected just before sending final response for conversation {conversation_id}.")
-            return Response(status_code=204)
-
-        response = ChatResponse(
-            conversation_id=conversation_id,
-            assistant_message=assistant_message,
-        )
-        return response
-
+        return await run_until_disconnected(request, _process_chat_message(
+            user_id, prompt, conversation_id, file_id, embedding_model, qdrant_client, ollama_client
+        ))
     except ClientDisconnectedError:
         logger.warning(f"Client disconnected during processing for conversation {conversation_id} (user: {user_id}). Request processing stopped.")
-        return Response(status_code=204) # RÃ©pondre avec No Content car le client est parti
+        return Response(status_code=204) # No Content: the client is gone
     except HTTPException as http_exc:
          raise http_exc 
     except Exception as e:
          logger.error(f"[Conv: {conversation_id}] Unexpected Error in post_chat_message: {e}", exc_info=True)
-         if await request.is_disconnected(): # Double check avant de lever une 500
-             logger.warning(f"Client disconnected during unexpected error for conversation {conversation_id}.")
-             return Response(status_code=204)
          raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred.")
 
+
+async def _run_db(func, *args, **kwargs):
+    """Runs a synchronous crud/history call in a worker thread so it overlaps with async stages."""
+    return await asyncio.get_event_loop().run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+async def _load_conversation(conversation_id: Optional[str], user_id: int) -> Conversation:
+    """Creates the conversation if needed, otherwise loads it (history)."""
+    if not conversation_id:
+        new_conversation = await _run_db(services.history_service.start_new_conversation, user_id=user_id)
+        if not new_conversation:
+            logger.error(f"Failed to start new conversation for user {user_id} from history_service.")
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not start new conversation")
+        logger.info(f"Started new conversation {new_conversation.id} for user {user_id}")
+        return new_conversation
+    logger.info(f"Using existing conversation {conversation_id}")
+    conversation = await _run_db(crud.conversation.get_conversation_by_id, conv_id=conversation_id, user_id=user_id)
+    if conversation and conversation.messages:
+        logger.info(f"Retrieved {min(len(conversation.messages), 6)} messages as conversation history.")
+    return conversation
+
+
+async def _get_file_context_safe(file_id: str, prompt: str, embedding_model: SentenceTransformer, qdrant_client: AsyncQdrantClient) -> Optional[str]:
+    logger.info(f"File_id '{file_id}' provided. Attempting to retrieve file context.")
+    try:
+        file_context = await services.chat_service.get_file_context(
+            file_id=file_id,
+            query=prompt,
+            embedding_model=embedding_model,
+            qdrant_client=qdrant_client
+        )
+        if file_context:
+            logger.info(f"Successfully retrieved context from file '{file_id}'. Context length: {len(file_context)}")
+        else:
+            logger.warning(f"No specific context retrieved from file '{file_id}' for query '{prompt[:50]}...'. RAG will proceed without specific file context.")
+        return file_context
+    except services.chat_service.FileContextRetrievalError as e:
+        logger.error(f"Error retrieving file context for file_id {file_id}: {e}", exc_info=True)
+    except Exception as e:
+        logger.error(f"Unexpected error retrieving file context for file_id {file_id}: {e}", exc_info=True)
+    return None
+
+
+async def _answer(
+    prompt: str,
+    conversation_id: Optional[str],
+    file_id: Optional[str],
+    user_id: int,
+    embedding_model: SentenceTransformer,
+    qdrant_client: AsyncQdrantClient,
+    ollama_client,
+    conversation_task: asyncio.Task,
+    deadline: float,
+    answer_meta: Dict[str, Any]
+) -> str:
+    file_context = await _get_file_context_safe(file_id, prompt, embedding_model, qdrant_client) if file_id else None
+    # The model answers in compact Markdown (short instructions in the stable system prompt)
+    # and rag_service renders it to the HTML the frontend expects.
+    return await services.rag_service.get_rag_response(
+        user_query=prompt,  # Original question, used for general-question detection
+        embedding_model=embedding_model,
+        qdrant_client=qdrant_client,
+        ollama_client=ollama_client,
+        file_context=file_context,
+        conversation_history=None,  # TEMPORARY: history disabled in the prompt
+        html_formatting=True,  # Markdown answer rendered to HTML server-side
+        conversation_id=conversation_id,  # Files uploaded in this conversation join the retrieval fan-out
+        user_id=user_id,
+        deadline=deadline,
+        answer_meta=answer_meta,  # Receives degraded/degraded_reason
+        conversation_ready=conversation_task  # Ownership, awaited only before searching the conversation's files
+    )
+
+
+async def _process_chat_message(
+    user_id: int,
+    prompt: str,
+    conversation_id: Optional[str],
+    file_id: Optional[str],
+    embedding_model: SentenceTransformer,
+    qdrant_client: AsyncQdrantClient,
+    ollama_client
+) -> ChatResponse:
+    # Deadline for the whole request: past it, rag_service answers from retrieval only
+    deadline = time.monotonic() + settings.rag_request_deadline_seconds
+    answer_meta: Dict[str, Any] = {}
+    # 1. Conversation creation / history load runs in a thread alongside the file context,
+    # the embedding and the catalog/Atlas searches (rag_service only waits for it before
+    # adding the conversation's files to the retrieval fan-out)
+    conversation_task = asyncio.create_task(_load_conversation(conversation_id, user_id))
+    # 2. Get RAG response. A new conversation has no uploaded files yet, so its id is not needed for retrieval.
+    rag_task = asyncio.create_task(_answer(
+        prompt, conversation_id, file_id, user_id, embedding_model, qdrant_client, ollama_client,
+        conversation_task, deadline, answer_meta
+    ))
+    try:
+        conversation = await conversation_task
+        if conversation_id and not conversation:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
+        assistant_response_content = await rag_task
+    finally:
+        for task in (conversation_task, rag_task):
+            if not task.done():
+                task.cancel()
+    conversation_id = conversation.id if conversation else conversation_id
+    assistant_message = Message(role="assistant", content=assistant_response_content)
+    logger.info(f"Successfully processed RAG response for conversation {conversation_id}.")
+
+    # 3. Save messages to history (reloaded: another request may have updated it meanwhile)
+    user_message = Message(role="user", content=prompt, file_id=file_id)
+    current_conversation = await _run_db(crud.conversation.get_conversation_by_id, conv_id=conversation_id, user_id=user_id)
+    if not current_conversation:
+         logger.error(f"Failed to retrieve conversation {conversation_id} before saving history.")
+    else:
+        current_conversation.messages.append(user_message)
+        current_conversation.messages.append(assistant_message)
+        current_conversation.timestamp = datetime.datetime.now(datetime.timezone.utc)
+        if len(current_conversation.messages) == 2:
+            current_conversation.title = await services.history_service.generate_conversation_title(
+                current_conversation.messages, use_llm=not answer_meta.get("degraded")  # No LLM title while it is saturated
+            )
+        save_success = await _run_db(crud.conversation.save_conversation, conversation_data=current_conversation)
+        if not save_success:
+             logger.error(f"Failed to save messages to history for conversation {conversation_id}")
+        else:
+             logger.info(f"Saved messages to conversation {conversation_id}")
+
+    # 4. Return response
+    return ChatResponse(
+        conversation_id=conversation_id,
+        assistant_message=assistant_message,
+        degraded=answer_meta.get("degraded", False),
+        degraded_reason=answer_meta.get("degraded_reason"),
+    )
+
 # --- NEW FEEDBACK ENDPOINT --- 
 @router.post("/conversations/{conversation_id}/messages/{message_index}/feedback", 
             status_code=status.HTTP_204_NO_CONTENT)
@@ -393,7 +420,7 @@ async def delete_message_from_conversation(
 @router.get("/statistics")
 async def get_statistics(
     current_user: TokenData = Depends(get_current_user),
-    qdrant_client: QdrantClient = Depends(get_qdrant_client_dependency)
+    qdrant_client: AsyncQdrantClient = Depends(get_async_qdrant_client_dependency)
 ):
     try:
         # Initialiser les statistiques
@@ -417,7 +444,7 @@ async def get_statistics(
 
         # RÃ©cupÃ©rer tous les points de Qdrant
         collection_name = "banque_ma_data_catalog"
-        search_result = qdrant_client.scroll(
+        search_result = await qdrant_client.scroll(
             collection_name=collection_name,
             limit=10000,
             with_payload=True,
@@ -561,7 +588,7 @@ async def voice_conversation(
     language: Optional[str] = Form(None, description="Language code for transcription"),
     current_user: TokenData = Depends(get_current_user),
     embedding_model: SentenceTransformer = Depends(get_embedding_model_dependency),
-    qdrant_client: QdrantClient = Depends(get_qdrant_client_dependency),
+    qdrant_client: AsyncQdrantClient = Depends(get_async_qdrant_client_dependency),
     ollama_client: ollama.Client = Depends(get_ollama_client_dependency)
 ):
     """
@@ -591,6 +618,10 @@ async def voice_conversation(
     if suffix not in ['.wav', '.mp3', '.m4a', '.flac', '.ogg', '.webm']:
         raise HTTPException(status_code=400, detail="Unsupported audio format")
     
+    # The conversation id reaches the retrieval of uploaded files: it must belong to the caller
+    if conversation_id and not await _run_db(crud.conversation.get_conversation_by_id, conv_id=conversation_id, user_id=current_user.user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
+
     try:
         # Save uploaded file temporarily
         with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
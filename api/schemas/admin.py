@@ -40,8 +40,67 @@ class CatalogInfoResponse(BaseModel):
 
 class CatalogUploadResponse(BaseModel):
     filename: str
+    job_id: Optional[str] = None # Poll /api/v1/admin/catalog/jobs/{job_id} for progress
     message: str = "File received and background processing started."
 
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    filename: str
+    status: str # queued / running / completed / failed
+    stage: Optional[str] = None
+    sheets_total: int = 0
+    sheets_done: int = 0
+    rows_read: int = 0
+    chunks: int = 0
+    unchanged: int = 0
+    embedded: int = 0
+    upserted: int = 0
+    refreshed: int = 0
+    deleted: int = 0
+    checkpoint: Optional[Dict[str, Any]] = None # Last batch written to Qdrant (progress only, not a resume point)
+    attempts: int = 0
+    max_attempts: int = 0
+    worker_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime.datetime
+    started_at: Optional[datetime.datetime] = None
+    heartbeat_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+    next_attempt_at: Optional[datetime.datetime] = None # Queued after a failure: not retried before this time
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "IngestionJobResponse":
+        """Builds the response from an ingestion_jobs row (progress counters are flattened)."""
+        fields = {key: value for key, value in record.items() if key not in ("id", "progress", "file_content")}
+        return cls(job_id=record["id"], **(record.get("progress") or {}), **fields)
+
+# --- LLM Metrics Schemas ---
+
+class PromptCacheStatsResponse(BaseModel):
+    requests: int
+    cache_hit_requests: int
+    cache_hit_rate: float
+    prompt_tokens: int
+    evaluated_prompt_tokens: int
+    reused_prompt_tokens_ratio: float
+    avg_prompt_eval_ms: float
+
+class LlmGatewayStatsResponse(BaseModel):
+    hosts: List[str]
+    in_flight: int
+    queued: int
+    coalesced_requests: int
+    abandoned_generations: int = 0 # Cancelled because every caller gave up
+
+class QueryEmbeddingCacheStatsResponse(BaseModel):
+    enabled: bool
+    model_name: str
+    size: int = 0
+    max_size: int = 0
+    hits: int = 0
+    misses: int = 0
+    hit_rate: float = 0.0
+
 # --- Config Schemas ---
 class AdminConfigResponse(BaseModel):
     admin_email: Optional[str] = None
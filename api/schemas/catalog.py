@@ -0,0 +1,25 @@
+# api/schemas/catalog.py
+from pydantic import BaseModel
+from typing import Any, Dict, List, Literal, Optional
+
+# --- Typeahead Schemas ---
+
+class CatalogSuggestion(BaseModel):
+    value: str
+    kind: Literal["source", "flux", "glossary", "field"]
+
+class CatalogSuggestResponse(BaseModel):
+    query: str
+    suggestions: List[CatalogSuggestion]
+    ready: bool = True # False until the index has been built from the catalog
+
+# --- Browse Schemas ---
+
+class CatalogEntry(BaseModel):
+    id: str
+    sheet: str
+    data: Dict[str, Any] # original_data of the row
+
+class CatalogBrowseResponse(BaseModel):
+    entries: List[CatalogEntry]
+    next_cursor: Optional[str] = None # Pass as `cursor` to get the next page; None on the last page
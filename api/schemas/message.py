@@ -51,6 +51,8 @@ class ChatResponse(BaseModel):
     conversation_id: str
     assistant_message: Message
     full_conversation: Optional[List[Message]] = None # Optionally return full history
+    degraded: bool = False # True when the answer was rendered from retrieval results only (LLM overloaded / deadline)
+    degraded_reason: Optional[str] = None
 
 class FileUploadResponse(BaseModel):
     file_id: str
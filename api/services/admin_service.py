@@ -1,188 +1,276 @@
 # api/services/admin_service.py
+import io
 import logging
+import queue
+import threading
 import pandas as pd
-import uuid
 from fastapi import UploadFile, HTTPException, status
 from qdrant_client import QdrantClient, models as qdrant_models
 from sentence_transformers import SentenceTransformer
 import time
 import json
+from typing import Any, Dict, List, Optional
 
 # Relative imports
 from ..core.config import settings
+from ..core.chunking import build_chunk_payloads, catalog_point_id, CATALOG_STYLE
+from ..core.embedding_cache import encode_with_cache
+from ..core.models import get_embedding_cache
 from ..schemas.message import Message # If needed for any processing
+from ..core import qdrant_collections
+from . import catalog_sync_service
+from .ingestion_jobs import IngestionJob
 
 logger = logging.getLogger(__name__)
 
-# --- Helper function to create text chunks (Copied/Adapted from admin_logic.py) ---
-# Note: This is duplicated from the Streamlit version. Consider putting shared logic
-# in a common utility module if it grows more complex.
-def _create_text_chunk(row_dict: dict, sheet_name: str) -> str:
-    """Creates a formatted text string from a dictionary row based on the sheet name."""
-    # Row is already a dict of strings here
-    text_chunk = ""
-    # Use .get(column, default_value) for robustness
-    if sheet_name == 'Référentiel Sources':
-        text_chunk = (
-            f"Source: {row_dict.get('Nom source','N/A')} ({row_dict.get('Type Source','N/A')} sur {row_dict.get('Plateforme source','N/A')}). "
-            f"Flux: {row_dict.get('Flux/Scénario SD','N/A')}. "
-            f"Domaine: {row_dict.get('Domaine','N/A')} / {row_dict.get('Sous domaine','N/A')}. "
-            f"Application source: {row_dict.get('Application Source','N/A')}. "
-            f"Cible: {row_dict.get('Plateforme cible','N/A')} ({row_dict.get('Nom cible','N/A')}). "
-            f"Chargement: {row_dict.get('Mode chargement','N/A')} ({row_dict.get('Fréquence MAJ','N/A')}) via {row_dict.get('Technologie de chargement(Outil)','N/A')} ({row_dict.get('Technologie','N/A')}). "
-            f"Procédure: {row_dict.get('Nom Flux/Procedure','N/A')}. "
-            f"Taille: {row_dict.get('Taille Objet','N/A')}. Format: {row_dict.get('Format','N/A')}. "
-            f"Description: {row_dict.get('Description','N/A')}. "
-            f"Filiale: {row_dict.get('Filiale','N/A')}."
-        )
-    elif sheet_name == 'Glossaire Métier':
-        text_chunk = (
-            f"Terme métier: {row_dict.get('Libellé Métier','N/A')}. Propriétaire: {row_dict.get('Propriétaire','N/A')}. "
-            f"Description: {row_dict.get('Description','N/A')}. Confidentialité: {row_dict.get('Confidentialité','N/A')}. "
-            f"Règle métier: {row_dict.get('Règle métier','N/A')}. "
-            f"Criticité: {row_dict.get('Criticité','N/A')}. "
-            f"Qualité adressée: {row_dict.get('Aspect de performance adressé (Qualité)','N/A')}. "
-            f"Commentaire: {row_dict.get('Commentaire','N/A')}."
-        )
-    elif sheet_name == 'Réf technique':
-        text_chunk = (
-            f"Champ technique: {row_dict.get('Libellé champ','N/A')} dans la source {row_dict.get('Nom source','N/A')} (Plateforme: {row_dict.get('Plateforme','N/A')}). "
-            f"Type: {row_dict.get('Type','N/A')}({row_dict.get('Taille','N/A')}). Obligatoire: {row_dict.get('Obligatoire','N/A')}. "
-            f"Confidentialité: {row_dict.get('Confidentialité','N/A')}. Règle métier: {row_dict.get('Règle métier','N/A')}. "
-            f"Libellé métier: {row_dict.get('Libellé Métier','N/A')}. "
-            f"Commentaire: {row_dict.get('Commentaire','N/A')}."
-        )
-    elif sheet_name == 'Référentiel Flux':
-        text_chunk = (
-            f"Traitement dans Flux: {row_dict.get('Nom Flux','N/A')}. Champ source: {row_dict.get('Nom Champ SD Source','N/A')} (de {row_dict.get('Nom SD Source','N/A')} sur {row_dict.get('Plateforme source','N/A')}). "
-            f"Règle: {row_dict.get('Règle de Gestion','N/A')}. Champ cible: {row_dict.get('Nom Champ Cible','N/A')} (vers {row_dict.get('Nom SD Cible','N/A')} sur {row_dict.get('Plateforme cible','N/A')}). "
-            f"Confidentialité: {row_dict.get('Confidentialité','N/A')}. Description traitement: {row_dict.get('Description traitement','N/A')}. "
-            f"Commentaire: {row_dict.get('Commentaire','N/A')}."
-        )
-    else:
-        chunk_parts = [f"{col}: {val}" for col, val in row_dict.items() if str(val).strip()]
-        text_chunk = ". ".join(chunk_parts)
+# End-of-stream marker passed between pipeline stages
+_END_OF_STREAM = None
+
+
+def _put(stage_queue: queue.Queue, item: Any, stop_event: threading.Event) -> bool:
+    """Blocking put that gives up when another stage has failed (avoids deadlocks on a full queue)."""
+    while not stop_event.is_set():
+        try:
+            stage_queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(stage_queue: queue.Queue, stop_event: threading.Event) -> Any:
+    """Blocking get that returns the end-of-stream marker when another stage has failed."""
+    while not stop_event.is_set():
+        try:
+            return stage_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return _END_OF_STREAM
+
+
+def _embed_stage(
+    embed_queue: queue.Queue,
+    upsert_queue: queue.Queue,
+    embedding_model: SentenceTransformer,
+    job: IngestionJob,
+    stop_event: threading.Event,
+    errors: List[str]
+) -> None:
+    """Encodes each batch of new/changed rows and hands the points over to the upsert stage."""
+    try:
+        while True:
+            batch = _get(embed_queue, stop_event)
+            if batch is _END_OF_STREAM:
+                break
+            sheet_name, batch_index, point_ids, texts, payloads = batch
+            # Rows already embedded by any ingestion path are served from the cache
+            embeddings = encode_with_cache(embedding_model, texts, get_embedding_cache(), batch_size=64, show_progress_bar=False) # No progress bar in background
+            points = [
+                qdrant_models.PointStruct(id=point_id, vector=vector.tolist(), payload=payload)
+                for point_id, vector, payload in zip(point_ids, embeddings, payloads)
+            ]
+            job.add(embedded=len(points))
+            if not _put(upsert_queue, (sheet_name, batch_index, points), stop_event):
+                break
+    except Exception as e:
+        logger.error(f"[Ingestion] Embedding stage failed for {job.filename}: {e}", exc_info=True)
+        errors.append(f"embedding: {e}")
+        stop_event.set()
+    finally:
+        _put(upsert_queue, _END_OF_STREAM, stop_event)
+
+
+def _upsert_stage(
+    upsert_queue: queue.Queue,
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    job: IngestionJob,
+    stop_event: threading.Event,
+    errors: List[str]
+) -> None:
+    """Writes point batches to Qdrant while the next batches are being encoded, checkpointing each one."""
+    sheet_name, batch_index = None, None
+    try:
+        while True:
+            item = _get(upsert_queue, stop_event)
+            if item is _END_OF_STREAM:
+                break
+            sheet_name, batch_index, points = item
+            qdrant_client.upsert(collection_name=collection_name, points=points, wait=True)
+            job.add(upserted=len(points))
+            job.checkpoint(sheet_name, batch_index)
+            logger.debug(f"[Ingestion] Upserted batch {batch_index} of sheet '{sheet_name}' ({len(points)} points)")
+    except Exception as e:
+        logger.error(f"[Ingestion] Error during Qdrant upsert (sheet '{sheet_name}', batch {batch_index}) for {job.filename}: {e}", exc_info=True)
+        errors.append(f"upsert: {e}")
+        stop_event.set()
+
 
-    return text_chunk.replace('\n', ' ').strip()
+def _heartbeat_loop(job: IngestionJob, job_done: threading.Event) -> None:
+    """Keeps the job heartbeat fresh during long stages without checkpoints."""
+    interval = max(1.0, settings.INGESTION_JOB_STALE_SECONDS / 5)
+    while not job_done.wait(interval):
+        job.heartbeat()
 
-# --- Main Processing Function for Background Task ---
-# Note: Pass clients/models as arguments because this runs in a background thread/process
-# and won't have access to the request-scoped dependencies directly.
+
+# --- Main Processing Function (run by the ingestion worker, see api/worker.py) ---
+# Note: clients/models are passed as arguments because this runs outside of any request.
 # Also, avoid using Streamlit functions (st.info etc.) here. Use logging.
+def run_ingestion_job(
+    job_record: Dict[str, Any],
+    qdrant_client: QdrantClient,
+    embedding_model: SentenceTransformer
+) -> str:
+    """Runs one attempt of a claimed ingestion job and returns its resulting status."""
+    job = IngestionJob.from_record(job_record)
+    if job.resumed_from:
+        # Rows written by the previous attempt are found unchanged by the content-hash diff
+        logger.info(f"[Ingestion] Retrying job {job.job_id}; the previous attempt reached {job.resumed_from}.")
+    job_done = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(job, job_done), daemon=True)
+    heartbeat.start()
+    try:
+        errors = process_and_upsert_excel_task(
+            file_content=job_record["file_content"],
+            filename=job.filename,
+            qdrant_client=qdrant_client,
+            embedding_model=embedding_model,
+            job=job
+        )
+    except Exception as e:
+        logger.error(f"[Ingestion] Unexpected error in job {job.job_id}: {e}", exc_info=True)
+        errors = [f"unexpected: {e}"]
+    finally:
+        job_done.set()
+        heartbeat.join()
+    job_status = job.finish(error="; ".join(errors) if errors else None)
+    logger.info(f"[Ingestion] Job {job.job_id} ({job.filename}) is now '{job_status}'.")
+    return job_status
+
+
 def process_and_upsert_excel_task(
     file_content: bytes,
     filename: str,
     qdrant_client: QdrantClient,
-    embedding_model: SentenceTransformer
-):
+    embedding_model: SentenceTransformer,
+    job: IngestionJob
+) -> List[str]:
     """
-    Background task to process Excel data and upsert to Qdrant.
-    Uses logging instead of st functions.
+    Processes Excel data and upserts it to Qdrant. Returns the errors (empty on success).
+
+    Runs as a streaming pipeline: sheets are read and chunked one at a time
+    (this thread), new/changed rows are encoded in batches (embedding thread)
+    and written to Qdrant (upsert thread). Stages are connected by bounded
+    queues, so memory stays flat and the wall time approaches the slowest stage.
+    Progress is checkpointed on the ingestion job after every written batch; a
+    retry does not start from the checkpoint, the content-hash diff finds the
+    rows already written unchanged and skips them.
     """
     start_time = time.time()
-    logger.info(f"[Background Task] Starting processing for file: {filename}")
+    logger.info(f"[Ingestion] Starting processing for file: {filename} (job {job.job_id})")
 
-    # Dependency checks already happened in the main thread via Depends()
-    # Add checks here just in case they become None somehow between threads/processes
     if not qdrant_client or not embedding_model:
-         logger.error("[Background Task] Qdrant client or embedding model is None. Aborting.")
-         return # Cannot proceed
+         logger.error("[Ingestion] Qdrant client or embedding model is None. Aborting.")
+         return ["Qdrant client or embedding model unavailable"] # Cannot proceed
 
     try:
-        # Read Excel data from bytes
-        excel_data = pd.ExcelFile(file_content)
-        all_sheets_data = {sheet: excel_data.parse(sheet) for sheet in excel_data.sheet_names}
-        logger.info(f"[Background Task] File read successfully. Sheets: {list(all_sheets_data.keys())}")
+        # Only the sheet list is read here; sheets are parsed one by one in the pipeline
+        excel_data = pd.ExcelFile(io.BytesIO(file_content))
+        sheet_names = excel_data.sheet_names
+        logger.info(f"[Ingestion] File opened successfully. Sheets: {sheet_names}")
     except Exception as e:
-        logger.error(f"[Background Task] Error reading Excel file {filename}: {e}", exc_info=True)
-        return
-
-    texts_to_embed = []
-    metadata_list = []
-    points_processed = 0
-    total_rows = sum(len(df) for df in all_sheets_data.values())
-    if total_rows == 0:
-        logger.warning(f"[Background Task] Excel file {filename} contains no data.")
-        return
-
-    prep_start = time.time()
-    logger.info(f"[Background Task] Preparing data ({total_rows} total rows)...")
-    rows_processed = 0
-    for sheet_name, df in all_sheets_data.items():
-        df = df.fillna('').astype(str) # Ensure all data is string
-        for index, row in df.iterrows():
-            rows_processed += 1
-            # Convert row to dict for helper function
-            row_dict = row.to_dict()
-            text_chunk = _create_text_chunk(row_dict, sheet_name)
-
-            if text_chunk:
-                texts_to_embed.append(text_chunk)
-                metadata = {
-                    "source_sheet": sheet_name,
-                    "source_file": filename,
-                    "original_row_index": index,
-                    "text": text_chunk,
-                    "original_data": row_dict # Store original row data
-                }
-                metadata_list.append(metadata)
-                points_processed += 1
-    prep_end = time.time()
-    logger.info(f"[Background Task] Data preparation finished in {prep_end - prep_start:.2f}s. Found {points_processed} valid points.")
-
-    if not texts_to_embed:
-        logger.warning(f"[Background Task] No processable text found in {filename}.")
-        return
-
-    # Generate Embeddings
-    embed_start = time.time()
-    logger.info(f"[Background Task] Generating embeddings for {len(texts_to_embed)} points...")
+        logger.error(f"[Ingestion] Error reading Excel file {filename}: {e}", exc_info=True)
+        return [f"Unreadable Excel file: {e}"]
+
+    job.start(sheets_total=len(sheet_names))
+
+    # Ensure the catalog collection and its payload indexes exist, then load the stored hashes
+    job.set_stage("diff")
     try:
-        embeddings = embedding_model.encode(texts_to_embed, show_progress_bar=False) # No progress bar in background
-        embed_end = time.time()
-        logger.info(f"[Background Task] Embeddings generated ({len(embeddings)} vectors) in {embed_end - embed_start:.2f}s.")
+        collection_name = qdrant_collections.ensure_catalog_collection(
+            qdrant_client, embedding_model.get_sentence_embedding_dimension()
+        )
+        existing = catalog_sync_service.fetch_catalog_state(qdrant_client, collection_name, sheet_names)
     except Exception as e:
-        logger.error(f"[Background Task] Error generating embeddings for {filename}: {e}", exc_info=True)
-        return
-
-    # Prepare points for Qdrant
-    points_to_upsert = [
-        qdrant_models.PointStruct(
-            id=str(uuid.uuid4()),
-            vector=embeddings[i].tolist(),
-            payload=metadata_list[i]
-        ) for i in range(len(embeddings))
+        logger.error(f"[Ingestion] Error reading Qdrant collection '{settings.QDRANT_COLLECTION_NAME}': {e}", exc_info=True)
+        return [f"Qdrant unavailable: {e}"]
+    logger.info(f"[Ingestion] {len(existing)} points already stored for these sheets.")
+
+    embed_queue: queue.Queue = queue.Queue(maxsize=settings.INGESTION_QUEUE_SIZE)
+    upsert_queue: queue.Queue = queue.Queue(maxsize=settings.INGESTION_QUEUE_SIZE)
+    stop_event = threading.Event()
+    errors: List[str] = []
+    stages = [
+        threading.Thread(target=_embed_stage, name=f"ingest-embed-{job.job_id[:8]}",
+                         args=(embed_queue, upsert_queue, embedding_model, job, stop_event, errors), daemon=True),
+        threading.Thread(target=_upsert_stage, name=f"ingest-upsert-{job.job_id[:8]}",
+                         args=(upsert_queue, qdrant_client, collection_name, job, stop_event, errors), daemon=True),
     ]
+    for stage in stages:
+        stage.start()
 
-    # Upsert in batches
-    upsert_start = time.time()
-    logger.info(f"[Background Task] Upserting {len(points_to_upsert)} points to Qdrant collection '{settings.QDRANT_COLLECTION_NAME}'...")
-    batch_size = 128
-    total_batches = (len(points_to_upsert) - 1) // batch_size + 1
-    errors_occurred = False
-    batches_processed = 0
-
-    for i in range(0, len(points_to_upsert), batch_size):
-        batch = points_to_upsert[i:i + batch_size]
-        batch_num = i // batch_size + 1
-        try:
-            qdrant_client.upsert(
-                collection_name=settings.QDRANT_COLLECTION_NAME,
-                points=batch,
-                wait=True # Set wait=False for faster background upsert? Depends on consistency needs.
+    seen_ids = set()
+    to_refresh = []
+    batch_size = settings.INGESTION_BATCH_SIZE
+    job.set_stage("pipeline")
+    try:
+        for sheet_name in sheet_names:
+            if stop_event.is_set():
+                break
+            df = excel_data.parse(sheet_name)
+            # Chunks and payloads are built column-wise for the sheet (see core/chunking.py).
+            # row_identity adds row_key + content_hash so the upload can be diffed against Qdrant.
+            texts, payloads = build_chunk_payloads(
+                {sheet_name: df},
+                style=CATALOG_STYLE,
+                base_payload={"source_file": filename},
+                row_identity=True
             )
-            batches_processed += 1
-            logger.debug(f"[Background Task] Upserted batch {batch_num}/{total_batches}")
+            job.add(rows_read=len(df), chunks=len(texts))
+            del df
+            for batch_index, i in enumerate(range(0, len(texts), batch_size)):
+                batch_payloads = payloads[i:i + batch_size]
+                point_ids = [catalog_point_id(sheet_name, payload["row_key"]) for payload in batch_payloads]
+                seen_ids.update(point_ids)
+                changed, refreshes = catalog_sync_service.diff_rows(point_ids, batch_payloads, existing)
+                to_refresh.extend(refreshes)
+                job.add(unchanged=len(point_ids) - len(changed))
+                if changed and not _put(
+                    embed_queue,
+                    (sheet_name, batch_index,
+                     [point_ids[j] for j in changed], [texts[i + j] for j in changed], [batch_payloads[j] for j in changed]),
+                    stop_event
+                ):
+                    break
+            job.sheet_done()
+            logger.info(f"[Ingestion] Sheet '{sheet_name}' queued ({len(texts)} chunks). Progress: {job.progress()}")
+    except Exception as e:
+        logger.error(f"[Ingestion] Error preparing data from {filename}: {e}", exc_info=True)
+        errors.append(f"read: {e}")
+        stop_event.set()
+    finally:
+        _put(embed_queue, _END_OF_STREAM, stop_event)
+        for stage in stages:
+            stage.join()
+
+    # Refresh moved rows and drop rows that disappeared, only once the new points are in
+    if not errors:
+        job.set_stage("cleanup")
+        try:
+            to_delete = catalog_sync_service.stale_point_ids(existing, seen_ids)
+            catalog_sync_service.refresh_payloads(qdrant_client, collection_name, to_refresh)
+            job.add(refreshed=len(to_refresh))
+            catalog_sync_service.delete_points(qdrant_client, collection_name, to_delete)
+            job.add(deleted=len(to_delete))
         except Exception as e:
-            logger.error(f"[Background Task] Error during Qdrant upsert (Batch {batch_num}) for {filename}: {e}", exc_info=True)
-            errors_occurred = True
-            break # Stop on first error
-
-    upsert_end = time.time()
-    total_duration = upsert_end - start_time
-    if errors_occurred:
-        logger.error(f"[Background Task] Upload for {filename} failed after {batches_processed}/{total_batches} batches. Total time: {total_duration:.2f}s.")
+            logger.error(f"[Ingestion] Error applying payload refreshes/deletions for {filename}: {e}", exc_info=True)
+            errors.append(f"cleanup: {e}")
+
+    total_duration = time.time() - start_time
+    if errors:
+        logger.error(f"[Ingestion] Upload for {filename} failed ({'; '.join(errors)}). Total time: {total_duration:.2f}s.")
     else:
-        logger.info(f"[Background Task] Successfully upserted {len(points_to_upsert)} points from {filename} to Qdrant. Total time: {total_duration:.2f}s.")
+        logger.info(f"[Ingestion] Synced {filename} to Qdrant in {total_duration:.2f}s: {job.progress()}")
+    return errors
 
-# Add other admin service logic here if needed (e.g., calling CRUD functions)
\ No newline at end of file
+# Add other admin service logic here if needed (e.g., calling CRUD functions)
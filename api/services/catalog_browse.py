@@ -0,0 +1,73 @@
+# api/services/catalog_browse.py
+import logging
+import uuid
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from qdrant_client import AsyncQdrantClient, models as qdrant_models
+
+from ..core.chunking import CATALOG_FACET_COLUMNS
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Navigation paginée dans le catalogue (/api/v1/catalog/entries) : le filtre
+# (feuille + facettes écrites à l'ingestion, voir core/chunking.py) est évalué
+# par Qdrant sur ses index de payload et la page suivante repart de l'offset
+# renvoyé par le scroll. Aucune ligne n'est filtrée côté Python, la latence
+# ne dépend donc pas de la taille du catalogue.
+
+PointId = Union[int, str]
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[PointId]:
+    """Point id to resume the scroll from (catalog ids are UUIDs, legacy ones integers)."""
+    if not cursor:
+        return None
+    if cursor.isdigit():
+        return int(cursor)
+    try:
+        return str(uuid.UUID(cursor))
+    except ValueError:
+        raise InvalidCursorError(f"Invalid cursor '{cursor}'.")
+
+
+def build_filter(sheets: Optional[List[str]], facets: Dict[str, Optional[List[str]]]) -> Optional[qdrant_models.Filter]:
+    """One indexed condition per requested filter; values of the same filter are OR-ed."""
+    conditions = []
+    if sheets:
+        conditions.append(qdrant_models.FieldCondition(key="source_sheet", match=qdrant_models.MatchAny(any=sheets)))
+    for facet, values in facets.items():
+        if facet in CATALOG_FACET_COLUMNS and values:
+            conditions.append(qdrant_models.FieldCondition(key=f"facets.{facet}", match=qdrant_models.MatchAny(any=values)))
+    return qdrant_models.Filter(must=conditions) if conditions else None
+
+
+async def browse(
+    qdrant_client: AsyncQdrantClient,
+    sheets: Optional[List[str]],
+    facets: Dict[str, Optional[List[str]]],
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Returns one page of catalog rows matching the filters and the cursor of the next page (None at the end)."""
+    points, next_offset = await qdrant_client.scroll(
+        collection_name=settings.QDRANT_COLLECTION_NAME,
+        scroll_filter=build_filter(sheets, facets),
+        limit=limit,
+        offset=parse_cursor(cursor),
+        with_payload=["source_sheet", "original_data"],
+        with_vectors=False
+    )
+    entries = [
+        {
+            "id": str(point.id),
+            "sheet": (point.payload or {}).get("source_sheet") or "",
+            "data": (point.payload or {}).get("original_data") or {},
+        }
+        for point in points
+    ]
+    return entries, (str(next_offset) if next_offset is not None else None)
@@ -0,0 +1,359 @@
+# api/services/catalog_lookup.py
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from qdrant_client import AsyncQdrantClient, models as qdrant_models
+
+from ..core.config import settings
+from ..crud import ingestion_job as crud_ingestion_job
+from . import catalog_suggest, identifier_resolver
+
+logger = logging.getLogger(__name__)
+
+# Index structuré du catalogue pour les questions de pure consultation
+# (« types des colonnes de CLIENT_QT », « fréquence MAJ du flux X »).
+# Les lignes des feuilles `Réf technique` et `Référentiel Sources` (original_data
+# écrit par l'ingestion) sont rangées par colonne, avec des listes de postings
+# source -> lignes et flux -> lignes : la réponse est produite en quelques
+# millisecondes, sans embedding, sans Qdrant ni LLM. Les questions ouvertes
+# (pourquoi, comment, expliquer...) passent toujours par le RAG.
+# Les termes du `Glossaire Métier` sont gardés pour l'autocomplétion.
+
+TECHNICAL_SHEET = "Réf technique"
+SOURCES_SHEET = "Référentiel Sources"
+GLOSSARY_SHEET = "Glossaire Métier"
+INDEXED_SHEETS = [TECHNICAL_SHEET, SOURCES_SHEET, GLOSSARY_SHEET]
+
+SCROLL_PAGE_SIZE = 1024
+
+# Colonnes conservées par feuille (stockage colonne par colonne)
+_COLUMNS: Dict[str, List[str]] = {
+    TECHNICAL_SHEET: ["Nom source", "Libellé champ", "Type", "Taille", "Obligatoire", "Confidentialité",
+                      "Libellé Métier", "Plateforme"],
+    SOURCES_SHEET: ["Nom source", "Flux/Scénario SD", "Nom Flux/Procedure", "Type Source", "Plateforme source",
+                    "Application Source", "Plateforme cible", "Nom cible", "Mode chargement", "Fréquence MAJ",
+                    "Technologie de chargement(Outil)", "Technologie", "Format", "Filiale"],
+    GLOSSARY_SHEET: ["Libellé Métier", "Propriétaire"],
+}
+
+_IDENTIFIER_COLUMNS: Dict[str, List[str]] = {
+    TECHNICAL_SHEET: ["Nom source", "Libellé champ"],
+    SOURCES_SHEET: ["Nom source", "Flux/Scénario SD", "Nom Flux/Procedure", "Nom cible"],
+    GLOSSARY_SHEET: [],
+}
+
+# Colonnes publiées pour l'autocomplétion -> type de suggestion
+_SUGGEST_COLUMNS: Dict[str, List[Tuple[str, str]]] = {
+    TECHNICAL_SHEET: [("Nom source", "source"), ("Libellé champ", "field")],
+    SOURCES_SHEET: [("Nom source", "source"), ("Flux/Scénario SD", "flux"), ("Nom Flux/Procedure", "flux")],
+    GLOSSARY_SHEET: [("Libellé Métier", "glossary")],
+}
+
+# Attributs demandés -> colonnes de `Référentiel Sources` (mots-clés sans accents)
+_FLOW_ATTRIBUTES: List[Tuple[Tuple[str, ...], List[str]]] = [
+    (("frequence", "mise a jour", "maj", "rafraich"), ["Fréquence MAJ"]),
+    (("technologie", "outil", "chargement", "alimente"), ["Mode chargement", "Technologie de chargement(Outil)", "Technologie"]),
+    (("cible", "destination"), ["Plateforme cible", "Nom cible"]),
+    (("provenance", "d'ou vient", "d'ou viennent", "source du flux", "plateforme source", "application source"),
+     ["Plateforme source", "Application Source", "Type Source"]),
+    (("format",), ["Format"]),
+    (("filiale",), ["Filiale"]),
+]
+
+# Attributs demandés -> colonnes de `Réf technique`
+_FIELD_ATTRIBUTES: List[Tuple[Tuple[str, ...], List[str]]] = [
+    (("type", "taille", "longueur", "format"), ["Type", "Taille"]),
+    (("confidentialite", "confidentiel", "sensible"), ["Confidentialité"]),
+    (("obligatoire", "nullable"), ["Obligatoire"]),
+    (("libelle metier", "signification"), ["Libellé Métier"]),
+]
+
+_LIST_FIELDS_MARKERS = ("colonnes", "champs", "structure", "attributs")
+# Questions ouvertes : jamais de réponse par consultation
+_OPEN_QUESTION_MARKERS = ("pourquoi", "comment", "expliqu", "difference", "compar", "impact", "conseil", "recommand")
+
+_TOKEN_PATTERN = re.compile(r"[\w./\-]+")
+# Mots de la question jamais pris pour un identifiant (un champ nommé « type » par ex.)
+_STOP_TOKENS = frozenset(
+    "le la les l de du des d un une et ou en a au aux est sont quel quelle quels quelles qui que quoi "
+    "dans sur pour par avec ce cette ces mon ma mes table tables source sources flux champ champs colonne "
+    "colonnes donnee donnees type types taille format frequence maj cible plateforme".split()
+    + [word for keywords, _ in _FLOW_ATTRIBUTES + _FIELD_ATTRIBUTES for keyword in keywords for word in keyword.split()]
+)
+
+
+# Apostrophes typographiques (claviers français, mobile, transcription vocale) -> apostrophe ASCII
+_APOSTROPHES = str.maketrans({"\u2019": "'", "\u2018": "'", "\u02bc": "'"})
+
+
+def fold_text(text: str) -> str:
+    """Lowercase without accents and with ASCII apostrophes, for keyword matching."""
+    text = unicodedata.normalize("NFKD", text.lower().translate(_APOSTROPHES))
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def has_keyword(folded_query: str, keywords) -> bool:
+    """True if one of the keywords starts a word of the query."""
+    return any(re.search(r"(?<!\w)" + re.escape(keyword), folded_query) for keyword in keywords)
+
+
+def normalize_identifier(value: str) -> str:
+    """Normalized identifier (source, flux or field name)."""
+    return fold_text(value).strip().strip(".,;:?!'\"")
+
+
+def mentioned_keys(folded_query: str, postings: Dict[str, Any], multi_word_keys: List[str]) -> List[str]:
+    """Keys of `postings` mentioned in the query (single tokens and multi-word names)."""
+    tokens = (normalize_identifier(token) for token in _TOKEN_PATTERN.findall(folded_query))
+    keys = [token for token in tokens if token in postings and token not in _STOP_TOKENS]
+    keys += [key for key in multi_word_keys if key in postings and key in folded_query]
+    return list(dict.fromkeys(keys))
+
+
+def _clean(value: Any) -> str:
+    value = "" if value is None else str(value).strip()
+    return "" if value.lower() == "nan" else value
+
+
+class CatalogIndex:
+    """Column-oriented copy of the lookup sheets with postings by source, flux and field."""
+
+    def __init__(self):
+        self.columns: Dict[str, Dict[str, List[str]]] = {sheet: {column: [] for column in columns} for sheet, columns in _COLUMNS.items()}
+        self.fields_by_source: Dict[str, List[int]] = defaultdict(list)  # Réf technique rows
+        self.rows_by_field: Dict[str, List[int]] = defaultdict(list)      # Réf technique rows
+        self.flows_by_name: Dict[str, List[int]] = defaultdict(list)      # Référentiel Sources rows (flux or procedure)
+        self.flows_by_source: Dict[str, List[int]] = defaultdict(list)    # Référentiel Sources rows
+        self.multi_word_keys: List[str] = []
+        self.built_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return sum(len(columns[_COLUMNS[sheet][0]]) for sheet, columns in self.columns.items())
+
+    def add_row(self, sheet_name: str, original_data: Dict[str, Any]) -> None:
+        columns = self.columns.get(sheet_name)
+        if columns is None:
+            return
+        row = len(columns[_COLUMNS[sheet_name][0]])
+        for column, values in columns.items():
+            values.append(_clean(original_data.get(column)))
+        if sheet_name == TECHNICAL_SHEET:
+            self._post(self.fields_by_source, columns["Nom source"][row], row)
+            self._post(self.rows_by_field, columns["Libellé champ"][row], row)
+        elif sheet_name == SOURCES_SHEET:
+            self._post(self.flows_by_name, columns["Flux/Scénario SD"][row], row)
+            self._post(self.flows_by_name, columns["Nom Flux/Procedure"][row], row)
+            self._post(self.flows_by_source, columns["Nom source"][row], row)
+
+    def _post(self, postings: Dict[str, List[int]], value: str, row: int) -> None:
+        key = normalize_identifier(value)
+        if len(key) < 2:
+            return
+        postings[key].append(row)
+        if " " in key and len(key) >= 4:
+            self.multi_word_keys.append(key)
+
+    def finalize(self) -> None:
+        self.multi_word_keys = sorted(set(self.multi_word_keys), key=len, reverse=True)
+        self.built_at = time.time()
+
+    def mentioned(self, folded_query: str, postings: Dict[str, List[int]]) -> List[str]:
+        return mentioned_keys(folded_query, postings, self.multi_word_keys)
+
+    def identifiers(self) -> List[str]:
+        """Source, flux and field names, for the fuzzy identifier resolver."""
+        return [value for sheet, columns in self.columns.items() for column in _IDENTIFIER_COLUMNS[sheet]
+                for value in columns[column] if value]
+
+    def suggestions(self) -> List[Tuple[str, str]]:
+        """(name, kind) pairs for the catalog typeahead, one per row occurrence."""
+        return [(value, kind) for sheet, columns in self.columns.items() for column, kind in _SUGGEST_COLUMNS[sheet]
+                for value in columns[column] if value]
+
+    def row(self, sheet_name: str, row: int, columns: List[str]) -> Dict[str, str]:
+        return {column: self.columns[sheet_name][column][row] for column in columns}
+
+
+_index = CatalogIndex()
+
+
+def get_index() -> CatalogIndex:
+    return _index
+
+
+async def build_index(qdrant_client: AsyncQdrantClient) -> CatalogIndex:
+    """Builds a new index from the original_data of the catalog points (payload only, no vectors)."""
+    index = CatalogIndex()
+    scroll_filter = qdrant_models.Filter(must=[
+        qdrant_models.FieldCondition(key="source_sheet", match=qdrant_models.MatchAny(any=INDEXED_SHEETS))
+    ])
+    offset = None
+    while True:
+        points, offset = await qdrant_client.scroll(
+            collection_name=settings.QDRANT_COLLECTION_NAME,
+            scroll_filter=scroll_filter,
+            limit=SCROLL_PAGE_SIZE,
+            offset=offset,
+            with_payload=["source_sheet", "original_data"],
+            with_vectors=False
+        )
+        for point in points:
+            payload = point.payload or {}
+            if isinstance(payload.get("original_data"), dict):
+                index.add_row(payload.get("source_sheet"), payload["original_data"])
+        if offset is None:
+            break
+    index.finalize()
+    return index
+
+
+async def refresh(qdrant_client: AsyncQdrantClient) -> None:
+    """Rebuilds the index and swaps it in (requests keep using the previous one meanwhile)."""
+    global _index
+    start = time.perf_counter()
+    index = await build_index(qdrant_client)
+    _index = index
+    await identifier_resolver.update("catalog", index.identifiers())
+    await catalog_suggest.update("catalog", index.suggestions())
+    logger.info(f"Catalog lookup index built: {len(index)} rows, {len(index.fields_by_source)} sources, "
+                f"{len(index.flows_by_name)} flux in {(time.perf_counter() - start) * 1000:.0f} ms.")
+
+
+_refresh_task: Optional[asyncio.Task] = None
+
+
+async def last_ingestion_marker() -> Any:
+    """finished_at of the last completed ingestion job; a change means Qdrant holds a new catalog."""
+    return await asyncio.get_event_loop().run_in_executor(None, crud_ingestion_job.last_completed_ingestion_at)
+
+
+async def run_refresh_loop(name: str, refresh_fn, get_client, interval_seconds: float,
+                           poll_seconds: float, retry_seconds: float) -> None:
+    """
+    Rebuilds with refresh_fn(client) as soon as an ingestion job completes (polled
+    every poll_seconds), and at least every interval_seconds for the writes that do
+    not go through the worker (Atlas sync). Retries every retry_seconds until the
+    first build succeeds (Qdrant down at startup...).
+    """
+    built_marker, built_at = None, None
+    while True:
+        delay = retry_seconds
+        try:
+            marker = await last_ingestion_marker()
+            if built_at is None or marker != built_marker or time.monotonic() - built_at >= interval_seconds:
+                client = await get_client()
+                if client is not None:
+                    await refresh_fn(client)
+                    built_marker, built_at = marker, time.monotonic()
+                    delay = poll_seconds
+            else:
+                delay = poll_seconds
+        except Exception as e:
+            logger.warning(f"{name} refresh failed: {e}")
+        await asyncio.sleep(delay)
+
+
+def start_refresh(get_client, interval_seconds: float, poll_seconds: float, retry_seconds: float = 10.0) -> None:
+    """Keeps the index in sync with what the ingestion worker wrote to Qdrant."""
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(run_refresh_loop(
+            "Catalog lookup index", refresh, get_client, interval_seconds, poll_seconds, retry_seconds
+        ))
+
+
+async def stop_refresh() -> None:
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
+
+
+def _requested_columns(folded_query: str, attributes: List[Tuple[Tuple[str, ...], List[str]]]) -> List[str]:
+    columns: List[str] = []
+    for keywords, attribute_columns in attributes:
+        if has_keyword(folded_query, keywords):
+            columns.extend(column for column in attribute_columns if column not in columns)
+    return columns
+
+
+def _table(headers: List[str], rows: List[Dict[str, str]]) -> List[str]:
+    lines = ["| " + " | ".join(headers) + " |", "|" + "---|" * len(headers)]
+    for row in rows[:settings.CATALOG_LOOKUP_MAX_ROWS]:
+        lines.append("| " + " | ".join(row.get(header) or "-" for header in headers) + " |")
+    if len(rows) > settings.CATALOG_LOOKUP_MAX_ROWS:
+        lines.append(f"\n*{len(rows) - settings.CATALOG_LOOKUP_MAX_ROWS} lignes supplémentaires non affichées.*")
+    return lines
+
+
+def _field_answer(index: CatalogIndex, folded_query: str) -> Optional[str]:
+    sources = index.mentioned(folded_query, index.fields_by_source)
+    fields = index.mentioned(folded_query, index.rows_by_field)
+    attributes = _requested_columns(folded_query, _FIELD_ATTRIBUTES)
+    technical = index.columns[TECHNICAL_SHEET]
+
+    # Colonnes d'une source : « quels sont les types des colonnes de CLIENT_QT »
+    if sources and (has_keyword(folded_query, _LIST_FIELDS_MARKERS) or (attributes and not fields)):
+        headers = ["Libellé champ"] + (attributes or ["Type", "Taille", "Obligatoire", "Confidentialité"])
+        lines = []
+        for source in sources:
+            rows = [index.row(TECHNICAL_SHEET, row, headers) for row in index.fields_by_source[source]]
+            name = technical["Nom source"][index.fields_by_source[source][0]]
+            lines += [f"## Champs de la source **{name}** ({len(rows)})", ""] + _table(headers, rows) + [""]
+        return "\n".join(lines).strip()
+
+    # Attribut d'un champ : « quel est le type du champ RIB (de CLIENT_QT) »
+    if fields and attributes:
+        rows = [row for field in fields for row in index.rows_by_field[field]]
+        if sources:
+            source_rows = {row for source in sources for row in index.fields_by_source[source]}
+            rows = [row for row in rows if row in source_rows] or rows
+        headers = ["Libellé champ", "Nom source"] + attributes
+        return "\n".join(_table(headers, [index.row(TECHNICAL_SHEET, row, headers) for row in rows]))
+    return None
+
+
+def _flow_answer(index: CatalogIndex, folded_query: str) -> Optional[str]:
+    attributes = _requested_columns(folded_query, _FLOW_ATTRIBUTES)
+    if not attributes:
+        return None
+    rows = [row for flow in index.mentioned(folded_query, index.flows_by_name) for row in index.flows_by_name[flow]]
+    if not rows:
+        rows = [row for source in index.mentioned(folded_query, index.flows_by_source) for row in index.flows_by_source[source]]
+    if not rows:
+        return None
+    headers = ["Nom Flux/Procedure", "Nom source"] + attributes
+    rows = list(dict.fromkeys(rows))
+    return "\n".join(_table(headers, [index.row(SOURCES_SHEET, row, headers) for row in rows]))
+
+
+def answer(query: str) -> Optional[str]:
+    """
+    Answers an exact metadata question from the index, as compact Markdown.
+    Returns None when the question is open or names no known source/flux/field.
+    """
+    index = _index
+    if not settings.CATALOG_LOOKUP_ENABLED or index.built_at is None:
+        return None
+    folded_query = fold_text(query)
+    if has_keyword(folded_query, _OPEN_QUESTION_MARKERS):
+        return None
+    start = time.perf_counter()
+    # Les questions de flux (fréquence, cible, chargement...) sont plus spécifiques que celles de structure,
+    # sauf si un champ est cité : « le format du champ RIB de CLIENT_QT » porte sur le champ, pas sur le flux
+    if index.mentioned(folded_query, index.rows_by_field):
+        result = _field_answer(index, folded_query) or _flow_answer(index, folded_query)
+    else:
+        result = _flow_answer(index, folded_query) or _field_answer(index, folded_query)
+    if result:
+        logger.info(f"Catalog lookup answered in {(time.perf_counter() - start) * 1000:.1f} ms without RAG.")
+    return result
@@ -0,0 +1,44 @@
+# api/services/catalog_suggest.py
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.suggest_index import SuggestIndex
+
+logger = logging.getLogger(__name__)
+
+# Autocomplétion du catalogue (/api/v1/catalog/suggest) : noms de sources, de
+# champs, de termes du glossaire et de flux. Comme pour identifier_resolver,
+# l'index est reconstruit à partir des noms que publient l'index structuré
+# (catalog_lookup) et le graphe de lignage à chaque rafraîchissement, donc dès
+# qu'un job d'ingestion se termine ; une frappe ne coûte qu'une recherche
+# dichotomique dans un tableau trié.
+
+_entries_by_origin: Dict[str, List[Tuple[str, str]]] = {}
+_index: Optional[SuggestIndex] = None
+
+
+async def update(origin: str, entries: List[Tuple[str, str]]) -> None:
+    """Replaces the (name, kind) entries published by `origin` and rebuilds the index off the event loop."""
+    global _index
+    _entries_by_origin[origin] = list(entries)
+    all_entries = [entry for origin_entries in _entries_by_origin.values() for entry in origin_entries]
+    start = time.perf_counter()
+    _index = await asyncio.get_event_loop().run_in_executor(
+        None, SuggestIndex, all_entries, settings.CATALOG_SUGGEST_MAX_LIMIT
+    )
+    logger.info(f"Catalog suggest index built: {len(_index)} names in {(time.perf_counter() - start) * 1000:.0f} ms.")
+
+
+def is_ready() -> bool:
+    return _index is not None
+
+
+def suggest(query: str, limit: int) -> List[Tuple[str, str]]:
+    """Ranked (name, kind) completions; empty until the first index is built."""
+    index = _index
+    if index is None:
+        return []
+    return index.suggest(query, limit)
@@ -0,0 +1,103 @@
+# api/services/catalog_sync_service.py
+import logging
+from typing import Any, Dict, List, Set, Tuple
+
+from qdrant_client import QdrantClient, models as qdrant_models
+
+logger = logging.getLogger(__name__)
+
+# Payload fields read back from Qdrant to diff a new upload against the collection
+_STATE_FIELDS = ["content_hash", "original_row_index", "source_file", "facets"]
+# Payload fields refreshed in place when a row is unchanged but moved/renamed
+# (facets: also backfills points ingested before the browse filters existed)
+_REFRESHABLE_FIELDS = ["original_row_index", "source_file", "facets"]
+
+SCROLL_PAGE_SIZE = 1024
+DELETE_BATCH_SIZE = 1024
+SET_PAYLOAD_BATCH_SIZE = 128
+
+
+def fetch_catalog_state(
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    sheet_names: List[str]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns {point_id: payload subset} for every point of the given sheets
+    (payload only, no vectors).
+    """
+    state: Dict[str, Dict[str, Any]] = {}
+    if not sheet_names:
+        return state
+    scroll_filter = qdrant_models.Filter(must=[
+        qdrant_models.FieldCondition(key="source_sheet", match=qdrant_models.MatchAny(any=sheet_names))
+    ])
+    offset = None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=collection_name,
+            scroll_filter=scroll_filter,
+            limit=SCROLL_PAGE_SIZE,
+            offset=offset,
+            with_payload=_STATE_FIELDS,
+            with_vectors=False
+        )
+        for point in points:
+            state[str(point.id)] = point.payload or {}
+        if offset is None:
+            return state
+
+
+def diff_rows(
+    point_ids: List[str],
+    payloads: List[Dict[str, Any]],
+    existing: Dict[str, Dict[str, Any]]
+) -> Tuple[List[int], List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Diffs a batch of new rows against the stored state.
+
+    Returns:
+        - indexes of the rows to (re-)embed: new ids or changed content_hash,
+        - (point_id, fields) payload refreshes for unchanged rows whose position or source file changed.
+    """
+    to_embed: List[int] = []
+    to_refresh: List[Tuple[str, Dict[str, Any]]] = []
+    for i, (point_id, payload) in enumerate(zip(point_ids, payloads)):
+        stored = existing.get(point_id)
+        if stored is None or stored.get("content_hash") != payload["content_hash"]:
+            to_embed.append(i)
+            continue
+        changed_fields = {field: payload[field] for field in _REFRESHABLE_FIELDS
+                          if field in payload and stored.get(field) != payload[field]}
+        if changed_fields:
+            to_refresh.append((point_id, changed_fields))
+    return to_embed, to_refresh
+
+
+def stale_point_ids(existing: Dict[str, Dict[str, Any]], seen_ids: Set[str]) -> List[str]:
+    """Ids of stored points that are no longer in the upload (including legacy random-id points)."""
+    return [point_id for point_id in existing if point_id not in seen_ids]
+
+
+def refresh_payloads(
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    refreshes: List[Tuple[str, Dict[str, Any]]]
+) -> None:
+    """Updates payload fields of unchanged points without re-uploading their vectors."""
+    for i in range(0, len(refreshes), SET_PAYLOAD_BATCH_SIZE):
+        operations = [
+            qdrant_models.SetPayloadOperation(set_payload=qdrant_models.SetPayload(payload=fields, points=[point_id]))
+            for point_id, fields in refreshes[i:i + SET_PAYLOAD_BATCH_SIZE]
+        ]
+        qdrant_client.batch_update_points(collection_name=collection_name, update_operations=operations, wait=True)
+
+
+def delete_points(qdrant_client: QdrantClient, collection_name: str, point_ids: List[str]) -> None:
+    """Deletes points by id, in batches."""
+    for i in range(0, len(point_ids), DELETE_BATCH_SIZE):
+        qdrant_client.delete(
+            collection_name=collection_name,
+            points_selector=qdrant_models.PointIdsList(points=point_ids[i:i + DELETE_BATCH_SIZE]),
+            wait=True
+        )
@@ -1,13 +1,19 @@
+import asyncio
+import functools
 import logging
 import pandas as pd
 import uuid
 import os
 import time
 from typing import List, Dict, Optional, Any
-from qdrant_client import QdrantClient, models as qdrant_models
+from qdrant_client import QdrantClient, AsyncQdrantClient, models as qdrant_models
 from sentence_transformers import SentenceTransformer
 
 from ..core.config import settings
+from ..core.chunking import build_chunk_payloads, FILE_STYLE
+from ..core.embedding_cache import encode_with_cache, encode_query
+from ..core.models import get_embedding_cache, get_query_embedding_cache
+from ..core import qdrant_collections
 
 logger = logging.getLogger(__name__)
 
@@ -30,58 +36,46 @@ async def process_excel_for_conversation(
     """
     Process an Excel file for a conversation, creating embeddings for each row
     and storing them in a custom collection for user-uploaded files.
+    Parsing, encoding and the (sync) Qdrant calls run in a worker thread so an
+    upload does not block the other requests on the event loop.
     """
+    return await asyncio.get_event_loop().run_in_executor(None, functools.partial(
+        _process_excel_file, file_path, file_id, conversation_id, user_id, embedding_model, qdrant_client
+    ))
+
+
+def _process_excel_file(
+    file_path: str,
+    file_id: str,
+    conversation_id: str,
+    user_id: int,
+    embedding_model: SentenceTransformer,
+    qdrant_client: QdrantClient
+) -> bool:
     start_time = time.time()
     logger.info(f"Processing file {file_path} for conversation {conversation_id}")
     
-    collection_name = f"user_files_{settings.QDRANT_COLLECTION_NAME}"
-    
     try:
-        # Ensure the collection exists
-        try:
-            collection_info = qdrant_client.get_collection(collection_name=collection_name)
-            logger.info(f"Collection {collection_name} exists")
-        except Exception:
-            # Create collection if it doesn't exist
-            qdrant_client.create_collection(
-                collection_name=collection_name,
-                vectors_config=qdrant_models.VectorParams(
-                    size=embedding_model.get_sentence_embedding_dimension(),
-                    distance=qdrant_models.Distance.COSINE
-                )
-            )
-            logger.info(f"Created new collection {collection_name}")
+        # Ensure the collection and its payload indexes (file_id, conversation_id, user_id) exist
+        collection_name = qdrant_collections.ensure_user_files_collection(
+            qdrant_client, embedding_model.get_sentence_embedding_dimension()
+        )
         
         # Read Excel file
         excel_data = pd.ExcelFile(file_path)
         all_sheets_data = {sheet: excel_data.parse(sheet) for sheet in excel_data.sheet_names}
         
-        texts_to_embed = []
-        metadata_list = []
-        
-        for sheet_name, df in all_sheets_data.items():
-            df = df.fillna('').astype(str)  # Ensure all data is string
-            
-            # Process each row
-            for index, row in df.iterrows():
-                row_dict = row.to_dict()
-                
-                # Create text from row data
-                text_chunk = _create_text_chunk(row_dict, sheet_name)
-                
-                if text_chunk:
-                    texts_to_embed.append(text_chunk)
-                    metadata = {
-                        "source_sheet": sheet_name,
-                        "source_file": os.path.basename(file_path),
-                        "file_id": file_id,
-                        "conversation_id": conversation_id,
-                        "user_id": user_id,
-                        "original_row_index": index,
-                        "text": text_chunk,
-                        "original_data": row_dict
-                    }
-                    metadata_list.append(metadata)
+        # Chunks and payloads are built column-wise for each sheet (see core/chunking.py)
+        texts_to_embed, metadata_list = build_chunk_payloads(
+            all_sheets_data,
+            style=FILE_STYLE,
+            base_payload={
+                "source_file": os.path.basename(file_path),
+                "file_id": file_id,
+                "conversation_id": conversation_id,
+                "user_id": user_id,
+            }
+        )
         
         if not texts_to_embed:
             logger.warning(f"No processable text found in file {file_path}")
@@ -89,7 +83,8 @@ async def process_excel_for_conversation(
         
         # Generate embeddings
         logger.info(f"Generating embeddings for {len(texts_to_embed)} points from file {file_path}")
-        embeddings = embedding_model.encode(texts_to_embed, show_progress_bar=False)
+        # Re-uploads of the same spreadsheet are served from the embedding cache
+        embeddings = encode_with_cache(embedding_model, texts_to_embed, get_embedding_cache(), show_progress_bar=False)
         
         # Prepare points for Qdrant
         points_to_upsert = [
@@ -116,24 +111,24 @@ async def process_excel_for_conversation(
         raise FileProcessingError(f"Failed to process file: {str(e)}")
 
 
-def get_file_context(
+async def get_file_context(
     file_id: str,
     query: str,
     embedding_model: SentenceTransformer,
-    qdrant_client: QdrantClient,
+    qdrant_client: AsyncQdrantClient,
     limit: int = 5
 ) -> Optional[str]:
     """
     Retrieve relevant context from a file based on the query.
     """
-    collection_name = f"user_files_{settings.QDRANT_COLLECTION_NAME}"
+    collection_name = qdrant_collections.user_files_collection_name()
     
     try:
         # Create embedding for query
-        query_embedding = embedding_model.encode(query).tolist()
+        query_embedding = encode_query(embedding_model, query, get_query_embedding_cache())
         
         # Search for relevant context
-        search_results = qdrant_client.search(
+        search_results = await qdrant_client.search(
             collection_name=collection_name,
             query_vector=query_embedding,
             query_filter=qdrant_models.Filter(
@@ -144,7 +139,8 @@ def get_file_context(
                     )
                 ]
             ),
-            limit=limit
+            limit=limit,
+            search_params=qdrant_collections.search_params()  # Quantized search + rescoring
         )
         
         if not search_results:
@@ -172,16 +168,3 @@ def get_file_context(
     except Exception as e:
         logger.error(f"Error retrieving context from file {file_id}: {e}", exc_info=True)
         raise FileContextRetrievalError(f"Failed to get context from file: {str(e)}")
-
-
-def _create_text_chunk(row_dict: dict, sheet_name: str) -> str:
-    """
-    Create a text representation of a row from an Excel sheet.
-    """
-    text_chunk = f"Sheet: {sheet_name}\n"
-    
-    for key, value in row_dict.items():
-        if value and str(value).strip():
-            text_chunk += f"{key}: {value}\n"
-    
-    return text_chunk.strip() 
\ No newline at end of file
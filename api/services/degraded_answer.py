@@ -0,0 +1,71 @@
+# api/services/degraded_answer.py
+import html
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Réponse de repli sans LLM : quand la génération est impossible dans le délai
+# (file d'attente saturée, budget restant trop court, erreur du modèle), les
+# meilleurs résultats de la recherche sont rendus directement à partir de leurs
+# champs `original_data`. La réponse est signalée comme dégradée.
+
+REASON_QUEUE = "llm_queue_saturated"
+REASON_DEADLINE = "deadline"
+REASON_LLM_ERROR = "llm_error"
+
+_INTROS = {
+    REASON_QUEUE: "L'assistant est très sollicité en ce moment.",
+    REASON_DEADLINE: "La génération de la réponse aurait dépassé le délai imparti.",
+    REASON_LLM_ERROR: "Le modèle de langage est momentanément indisponible.",
+}
+
+# Payload fields shown for entries without original_data (Atlas entities)
+_ATLAS_FIELDS = [("typeName", "Type"), ("name", "Nom"), ("qualifiedName", "Nom qualifié"), ("description", "Description")]
+
+Entry = Tuple[str, Optional[Dict[str, Any]]]  # (chunk text, payload)
+
+
+def _fields(text: str, payload: Optional[Dict[str, Any]]) -> Tuple[str, List[Tuple[str, str]]]:
+    """Title and (field, value) pairs of one retrieved entry."""
+    payload = payload or {}
+    original_data = payload.get("original_data")
+    if isinstance(original_data, dict) and original_data:
+        title = payload.get("source_sheet") or payload.get("source_file") or "Catalogue"
+        pairs = [(str(key), str(value)) for key, value in original_data.items() if str(value).strip() and str(value).lower() != "nan"]
+        return title, pairs[:settings.DEGRADED_ANSWER_MAX_FIELDS]
+    if payload.get("source") == "apache_atlas":
+        pairs = [(label, str(payload[key])) for key, label in _ATLAS_FIELDS if str(payload.get(key) or "").strip()]
+        return "Apache Atlas", pairs
+    excerpt = text if len(text) <= 400 else text[:400] + "..."
+    return "Extrait", [("", excerpt)]
+
+
+def render(entries: List[Entry], reason: str, html_formatting: bool = False) -> str:
+    """Structured answer built from the top retrieved entries, without calling the LLM."""
+    entries = entries[:settings.DEGRADED_ANSWER_MAX_ITEMS]
+    intro = _INTROS.get(reason, _INTROS[REASON_LLM_ERROR])
+    if not entries:
+        return f"{intro} Aucun élément pertinent n'a été trouvé dans le catalogue. Veuillez réessayer dans quelques instants."
+    lead = f"{intro} Voici les éléments du catalogue les plus pertinents pour votre question (réponse rapide, sans synthèse) :"
+
+    if html_formatting:
+        items = []
+        for text, payload in entries:
+            title, pairs = _fields(text, payload)
+            rows = "".join(
+                f"<li><strong>{html.escape(key)}</strong> : {html.escape(value)}</li>" if key else f"<li>{html.escape(value)}</li>"
+                for key, value in pairs
+            )
+            items.append(f"<li><strong>{html.escape(title)}</strong><ul>{rows}</ul></li>")
+        return f"<p>{html.escape(lead)}</p><ol>{''.join(items)}</ol><p><em>Reposez la question dans quelques instants pour une réponse rédigée.</em></p>"
+
+    lines = [lead, ""]
+    for position, (text, payload) in enumerate(entries, start=1):
+        title, pairs = _fields(text, payload)
+        lines.append(f"{position}. {title}")
+        lines.extend(f"   - {key} : {value}" if key else f"   - {value}" for key, value in pairs)
+    lines += ["", "Reposez la question dans quelques instants pour une réponse rédigée."]
+    return "\n".join(lines)
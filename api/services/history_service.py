@@ -4,7 +4,6 @@ import uuid
 import datetime
 from typing import List, Optional
 
-import ollama
 from ..core.config import settings
 
 # --- MODIFICATION START ---
@@ -13,16 +12,31 @@ from ..schemas.message import Message, Conversation
 # --- MODIFICATION END ---
 
 from .. import crud
+from ..core.models import get_ollama_client
+from ..core.llm_gateway import LLMPriority
+from .prompt_budget import ollama_options
 
 logger = logging.getLogger(__name__)
 
 # The _extract_topic_from_question function and its associated [TITLE_DEBUG] prints are removed.
 
+def _question_title(question: str) -> str:
+    """Title built from the first question alone, shaped like the fallback of generate_conversation_title."""
+    if question.endswith("?") or question.endswith("؟"):
+        question = question[:-1].strip()
+    if len(question) <= 1:
+        return "Nouvelle conversation"
+    title = "Sujet : " + question
+    return title[:47] + "..." if len(title) > 50 else title
+
 # --- MODIFICATION START ---
 # Use the directly imported Message schema
-def generate_conversation_title(messages: List[Message]) -> str:
+async def generate_conversation_title(messages: List[Message], use_llm: bool = True) -> str:
 # --- MODIFICATION END ---
-    """Generates a concise, non-question title reflecting the topic of the conversation using an LLM."""
+    """
+    Generates a concise, non-question title reflecting the topic of the conversation using an LLM.
+    With use_llm=False (degraded answers, LLM saturated) the title is built from the first question only.
+    """
     logger.info("[LLM_TITLE_GEN] Attempting to generate title with LLM.")
 
     if not messages or len(messages) < 1:
@@ -40,9 +54,15 @@ def generate_conversation_title(messages: List[Message]) -> str:
         logger.warning("[LLM_TITLE_GEN] User message content for title base is empty.")
         return "Nouvelle conversation"
 
+    if not use_llm:
+        logger.info("[LLM_TITLE_GEN] LLM skipped (degraded answer), title built from the first question.")
+        return _question_title(first_user_message_content)
+
     llm_generated_title = None
     try:
-        client = ollama.Client(host=settings.OLLAMA_HOST)
+        client = await get_ollama_client()
+        if client is None:
+            raise RuntimeError("LLM gateway not available")
         
         llm_prompt = ""
         user_question = first_user_message_content # Use already extracted and cleaned version
@@ -76,10 +96,12 @@ def generate_conversation_title(messages: List[Message]) -> str:
             return "Nouvelle conversation"
 
         logger.info(f"[LLM_TITLE_GEN] Prompting LLM with: {llm_prompt}")
-        response = client.chat(
+        response = await client.chat(
             model=settings.OLLAMA_MODEL_NAME,
             messages=[{'role': 'user', 'content': llm_prompt}],
-            options={'temperature': 0.3}
+            options=ollama_options(temperature=0.3, num_predict=settings.NUM_PREDICT_TITLE),  # Même num_ctx que le chat : pas de rechargement du modèle
+            keep_alive=settings.OLLAMA_KEEP_ALIVE,
+            priority=LLMPriority.BACKGROUND  # Les réponses du chat passent avant les titres
         )
         
         raw_title = response['message']['content'].strip()
@@ -173,7 +195,7 @@ def start_new_conversation(user_id: int) -> Optional[Conversation]:
 
 # --- MODIFICATION START ---
 # Use the directly imported Conversation and Message schemas
-def add_message_and_save(
+async def add_message_and_save(
     conversation_id: str,
     user_id: int,
     user_message: Message,
@@ -193,7 +215,7 @@ def add_message_and_save(
 
     if len(conversation.messages) == 2: # user + assistant = 2
          logger.info(f"Conversation {conversation_id} has 2 messages. Attempting to generate title.") # LOG DE TEST AJOUTÉ
-         conversation.title = generate_conversation_title(conversation.messages)
+         conversation.title = await generate_conversation_title(conversation.messages)
 
     conversation.timestamp = datetime.datetime.now(datetime.timezone.utc)
 
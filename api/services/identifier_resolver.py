@@ -0,0 +1,40 @@
+# api/services/identifier_resolver.py
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from ..core.config import settings
+from ..core.identifier_index import IdentifierIndex, looks_like_identifier
+
+logger = logging.getLogger(__name__)
+
+# Correction des identifiants mal saisis ou mal transcrits par Whisper
+# (« client cute » -> CLIENT_QT) avant la recherche. L'index trigramme est
+# reconstruit à partir des identifiants que publient l'index structuré
+# (catalog_lookup) et le graphe de lignage à chaque rafraîchissement.
+
+_identifiers_by_origin: Dict[str, Set[str]] = {}
+_index: Optional[IdentifierIndex] = None
+
+
+async def update(origin: str, identifiers: Iterable[str]) -> None:
+    """Replaces the identifiers published by `origin` and rebuilds the index off the event loop."""
+    global _index
+    _identifiers_by_origin[origin] = {identifier.strip() for identifier in identifiers if looks_like_identifier(identifier.strip())}
+    all_identifiers = sorted(set().union(*_identifiers_by_origin.values()))
+    start = time.perf_counter()
+    _index = await asyncio.get_event_loop().run_in_executor(None, IdentifierIndex, all_identifiers)
+    logger.info(f"Identifier resolver index built: {len(_index)} identifiers in {(time.perf_counter() - start) * 1000:.0f} ms.")
+
+
+def rewrite(query: str) -> str:
+    """Returns the query with fuzzy identifier mentions replaced by their canonical spelling."""
+    index = _index
+    if not settings.IDENTIFIER_RESOLVER_ENABLED or index is None or not len(index):
+        return query
+    start = time.perf_counter()
+    rewritten, replacements = index.rewrite(query, settings.IDENTIFIER_MIN_SIMILARITY, settings.IDENTIFIER_WORD_SIMILARITY)
+    if replacements:
+        logger.info(f"Resolved identifiers {replacements} in {(time.perf_counter() - start) * 1000:.2f} ms: '{rewritten[:80]}'")
+    return rewritten
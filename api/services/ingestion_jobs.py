@@ -0,0 +1,84 @@
+# api/services/ingestion_jobs.py
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from ..core.config import settings
+from ..crud import ingestion_job as crud_ingestion_job
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionJob:
+    """
+    Progress of one attempt of a catalog ingestion job, updated by the pipeline
+    stages (thread-safe) and persisted to the ingestion_jobs table at every
+    checkpoint, which also serves as the worker heartbeat. The checkpoint only
+    reports progress: a retry re-reads the whole file and the content-hash diff
+    skips the rows a previous attempt already wrote.
+    """
+
+    COUNTERS = ("rows_read", "chunks", "unchanged", "embedded", "upserted", "refreshed", "deleted")
+
+    def __init__(self, job_id: str, filename: str, checkpoint: Optional[Dict[str, Any]] = None):
+        self.job_id = job_id
+        self.filename = filename
+        self.resumed_from = checkpoint  # Last batch written by a previous attempt (logged only)
+        self.stage: Optional[str] = None
+        self.sheets_total = 0
+        self.sheets_done = 0
+        self.counters: Dict[str, int] = {name: 0 for name in self.COUNTERS}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "IngestionJob":
+        return cls(record["id"], record["filename"], record.get("checkpoint"))
+
+    def start(self, sheets_total: int) -> None:
+        with self._lock:
+            self.sheets_total = sheets_total
+        self._save()
+
+    def set_stage(self, stage: str) -> None:
+        with self._lock:
+            self.stage = stage
+        self._save()
+
+    def sheet_done(self) -> None:
+        with self._lock:
+            self.sheets_done += 1
+        self._save()
+
+    def add(self, **increments: int) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                self.counters[name] += value
+
+    def checkpoint(self, sheet_name: str, batch_index: int) -> None:
+        """Called once a batch is durably written to Qdrant."""
+        self._save(checkpoint={"sheet": sheet_name, "batch": batch_index})
+
+    def heartbeat(self) -> None:
+        """Tells other workers this job is still alive (between checkpoints)."""
+        self._save()
+
+    def progress(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"sheets_total": self.sheets_total, "sheets_done": self.sheets_done, **self.counters}
+
+    def finish(self, error: Optional[str] = None) -> str:
+        """Records the end of the attempt; returns the job status (queued again for a retry, completed or failed)."""
+        try:
+            return crud_ingestion_job.finish_ingestion_job(
+                self.job_id, self.progress(), error, settings.INGESTION_JOB_RETRY_BACKOFF_SECONDS
+            )
+        except Exception as e:
+            logger.error(f"Could not record the end of ingestion job {self.job_id}: {e}", exc_info=True)
+            return crud_ingestion_job.JOB_FAILED
+
+    def _save(self, checkpoint: Optional[Dict[str, Any]] = None) -> None:
+        try:
+            crud_ingestion_job.save_ingestion_progress(self.job_id, self.progress(), self.stage, checkpoint)
+        except Exception as e:
+            # Progress reporting must not fail the ingestion itself
+            logger.warning(f"Could not save progress of ingestion job {self.job_id}: {e}")
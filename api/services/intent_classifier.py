@@ -0,0 +1,140 @@
+# api/services/intent_classifier.py
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Petit jeu d'exemples étiquetés. Chaque intention est résumée par le centroïde
+# (normalisé) des embeddings de ses exemples ; la classification d'une requête
+# se réduit alors à un produit matriciel avec l'embedding déjà calculé par le RAG.
+LABELED_EXAMPLES: Dict[str, List[str]] = {
+    "greeting": [
+        "bonjour", "salut", "bonsoir", "hello", "coucou",
+        "bonjour, comment allez-vous ?", "salut, ça va ?", "bonne journée",
+    ],
+    "thanks": [
+        "merci", "merci beaucoup", "merci pour votre aide", "super, merci",
+        "parfait merci", "je vous remercie", "thanks", "thank you",
+    ],
+    "goodbye": [
+        "au revoir", "à bientôt", "bonne soirée, au revoir", "à plus tard",
+        "bye", "goodbye",
+    ],
+    "role": [
+        "qui êtes-vous ?", "qui es-tu ?", "quel est votre rôle ?",
+        "que faites-vous ?", "tu es un robot ?", "à quoi sers-tu ?",
+        "présente-toi",
+    ],
+    "help": [
+        "comment pouvez-vous m'aider ?", "que puis-je vous demander ?",
+        "que sais-tu faire ?", "quelles sont tes capacités ?",
+        "comment ça marche ?", "comment t'utiliser ?",
+    ],
+    "catalog": [
+        "quels sont les champs de la table CLIENT_QT ?",
+        "quelle est la fréquence de mise à jour du flux des comptes ?",
+        "d'où vient le champ NUM_COMPTE ?",
+        "quelle est la plateforme source des données de trésorerie ?",
+        "liste des sources de la filiale BankMA",
+        "quel est le type et la taille du champ RIB ?",
+        "définition du terme métier encours crédit",
+        "quelles données sont confidentielles dans le référentiel technique ?",
+        "quelle technologie de chargement utilise le flux cartes ?",
+    ],
+}
+
+# Intentions pour lesquelles une réponse prédéfinie suffit (pas de RAG ni de LLM)
+SMALL_TALK_INTENTS = frozenset({"greeting", "thanks", "goodbye", "role", "help"})
+
+
+class IntentClassifier:
+    """Nearest-centroid classifier over sentence embeddings."""
+
+    def __init__(self, labels: List[str], centroids: np.ndarray):
+        self.labels = labels
+        self.centroids = centroids  # shape (n_intents, dim), rows L2-normalized
+
+    @classmethod
+    def from_examples(cls, embedding_model: SentenceTransformer, examples: Dict[str, List[str]]) -> "IntentClassifier":
+        """Encodes the labeled examples once and builds the centroid matrix."""
+        labels = list(examples.keys())
+        centroids = []
+        for label in labels:
+            vectors = np.asarray(embedding_model.encode(examples[label], show_progress_bar=False), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+            centroid = vectors.mean(axis=0)
+            centroids.append(centroid / (np.linalg.norm(centroid) + 1e-12))
+        return cls(labels, np.vstack(centroids).astype(np.float32))
+
+    def classify(self, query_embedding: List[float]) -> Tuple[str, float, float]:
+        """
+        Returns (intent, similarity, margin) for the closest centroid.
+        The margin is the gap to the second-best centroid.
+        """
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) + 1e-12)  # Not in place: the embedding may be a cached array
+        scores = self.centroids @ vector
+        order = np.argsort(scores)[::-1]
+        best, second = order[0], order[1] if len(order) > 1 else order[0]
+        return self.labels[best], float(scores[best]), float(scores[best] - scores[second])
+
+
+_classifier: Optional[IntentClassifier] = None
+_build_task: Optional[asyncio.Task] = None
+
+
+def get_intent_classifier() -> Optional[IntentClassifier]:
+    """The classifier built at startup, or None while it is not (yet) available."""
+    return _classifier
+
+
+async def _build_loop(get_embedding_model, retry_seconds: float) -> None:
+    global _classifier
+    while _classifier is None:
+        try:
+            embedding_model = await get_embedding_model()
+            if embedding_model is not None:
+                # Encoding the examples is CPU-bound: done in a worker thread
+                _classifier = await asyncio.get_event_loop().run_in_executor(
+                    None, IntentClassifier.from_examples, embedding_model, LABELED_EXAMPLES
+                )
+                logger.info(f"Intent classifier built with {len(_classifier.labels)} intents.")
+                return
+        except Exception as e:
+            logger.error(f"Failed to build intent classifier: {e}", exc_info=True)
+        await asyncio.sleep(retry_seconds)
+
+
+def start_building(get_embedding_model, retry_seconds: float = 10.0) -> None:
+    """
+    Builds the classifier in the background at startup, once the embedding model
+    is loaded; until then every query goes through the RAG pipeline.
+    """
+    global _build_task
+    if settings.INTENT_CLASSIFIER_ENABLED and (_build_task is None or _build_task.done()):
+        _build_task = asyncio.create_task(_build_loop(get_embedding_model, retry_seconds))
+
+
+def detect_small_talk(query_embedding: List[float]) -> Optional[str]:
+    """
+    Returns the small-talk intent of the query when the classifier is confident,
+    otherwise None (the query must go through the RAG pipeline).
+    """
+    if not settings.INTENT_CLASSIFIER_ENABLED:
+        return None
+    classifier = get_intent_classifier()
+    if classifier is None:
+        return None
+    intent, similarity, margin = classifier.classify(query_embedding)
+    logger.info(f"Intent classifier: '{intent}' (similarity={similarity:.3f}, margin={margin:.3f})")
+    if (intent in SMALL_TALK_INTENTS
+            and similarity >= settings.INTENT_CONFIDENCE_THRESHOLD
+            and margin >= settings.INTENT_CONFIDENCE_MARGIN):
+        return intent
+    return None
@@ -0,0 +1,344 @@
+# api/services/lineage_graph.py
+import asyncio
+import logging
+import time
+from array import array
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from qdrant_client import AsyncQdrantClient, models as qdrant_models
+
+from ..core.config import settings
+from . import catalog_suggest, identifier_resolver
+from .catalog_lookup import fold_text, has_keyword, mentioned_keys, normalize_identifier, run_refresh_loop, SCROLL_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Graphe de lignage précalculé : champ source -> mapping (ligne de flux) -> champ
+# cible, construit à partir de la feuille `Référentiel Flux` du catalogue et des
+# entités Atlas `Process` (attributs custom_nom_champ_* et inputs/outputs).
+# Les arcs sont stockés en tableaux d'adjacence compacts (offsets + cibles, dans
+# les deux sens) : un parcours amont/aval à k sauts prend moins d'une milliseconde.
+
+FLOW_SHEET = "Référentiel Flux"
+
+FIELD_NODE = 0    # Champ d'une source (ou colonne Atlas)
+MAPPING_NODE = 1  # Une ligne de flux / un Process Atlas
+DATASET_NODE = 2  # Source entière (inputs/outputs Atlas au niveau dataset)
+
+_UPSTREAM_MARKERS = ("d'ou vient", "d'ou viennent", "provenance", "origine", "amont", "alimente par", "alimentee par",
+                     "alimentes par", "source du champ", "sources du champ")
+_DOWNSTREAM_MARKERS = ("cible", "alimente", "aval", "destination", "va vers", "vont vers", "utilise par", "impact")
+_OPEN_QUESTION_MARKERS = ("pourquoi", "comment", "expliqu")
+
+Step = Tuple[int, int, int, int]  # (depth, node, mapping node, next node)
+
+
+def _node_key(*parts: str) -> str:
+    """Same convention as the Atlas qualifiedNames (lowercase, spaces as underscores)."""
+    return ".".join(str(part).strip().lower().replace(" ", "_") for part in parts)
+
+
+class LineageGraphBuilder:
+    """Collects nodes and mappings, deduplicating what the catalog and Atlas both describe."""
+
+    def __init__(self):
+        self.keys: Dict[str, int] = {}
+        self.labels: List[str] = []
+        self.kinds = array("b")
+        self.rules: Dict[int, str] = {}
+        self.edges: List[Tuple[int, int]] = []
+        self.fields_by_name: Dict[str, List[int]] = defaultdict(list)
+        self.fields_by_dataset: Dict[str, List[int]] = defaultdict(list)
+        self.identifiers = set()  # Raw dataset / field / flux names
+
+    def node(self, key: str, kind: int, label: str) -> int:
+        node = self.keys.get(key)
+        if node is None:
+            node = self.keys[key] = len(self.labels)
+            self.labels.append(label)
+            self.kinds.append(kind)
+        return node
+
+    def field(self, dataset: str, field: str) -> Optional[int]:
+        dataset, field = str(dataset or "").strip(), str(field or "").strip()
+        if not field or field.lower() == "nan":
+            return None
+        key = _node_key(dataset, field)
+        is_new = key not in self.keys
+        self.identifiers.update(name for name in (dataset, field) if name)
+        node = self.node(key, FIELD_NODE, f"{dataset}.{field}" if dataset else field)
+        if is_new:
+            self.fields_by_name[normalize_identifier(field)].append(node)
+            self.fields_by_name[normalize_identifier(f"{dataset}.{field}")].append(node)
+            if dataset:
+                self.fields_by_dataset[normalize_identifier(dataset)].append(node)
+        return node
+
+    def dataset(self, name: str) -> int:
+        key = _node_key("dataset", name)
+        is_new = key not in self.keys
+        node = self.node(key, DATASET_NODE, name)
+        if is_new:
+            self.fields_by_dataset[normalize_identifier(name)].append(node)
+        return node
+
+    def mapping(self, flow: str, sources: List[int], targets: List[int], rule: str = "") -> None:
+        """Adds source -> mapping -> target edges (one mapping node per distinct flow/source/target triple)."""
+        if not sources or not targets:
+            return
+        flow = str(flow or "").strip() or "Flux"
+        self.identifiers.add(flow)
+        key = _node_key("mapping", flow, *map(str, sorted(sources)), "->", *map(str, sorted(targets)))
+        is_new = key not in self.keys
+        node = self.node(key, MAPPING_NODE, flow)
+        if not is_new:
+            return
+        if rule and str(rule).strip().lower() not in ("", "nan"):
+            self.rules[node] = str(rule).strip()
+        self.edges.extend((source, node) for source in sources)
+        self.edges.extend((node, target) for target in targets)
+
+    def add_flow_row(self, row: Dict[str, Any]) -> None:
+        source = self.field(row.get("Nom SD Source"), row.get("Nom Champ SD Source"))
+        target = self.field(row.get("Nom SD Cible"), row.get("Nom Champ Cible"))
+        if source is not None and target is not None:
+            self.mapping(row.get("Nom Flux"), [source], [target], row.get("Règle de Gestion", ""))
+
+    def add_atlas_process(self, payload: Dict[str, Any]) -> None:
+        # Process créé depuis le Référentiel Flux : mapping champ à champ dans les attributs custom
+        source = self.field(payload.get("custom_nom_sd_source"), payload.get("custom_nom_champ_source"))
+        target = self.field(payload.get("custom_nom_sd_cible"), payload.get("custom_nom_champ_cible"))
+        if source is not None and target is not None:
+            self.mapping(payload.get("name"), [source], [target], payload.get("custom_regle_gestion", ""))
+        # Process Atlas générique : inputs/outputs (qualifiedNames relevés par sync_atlas_to_qdrant.py)
+        inputs = [self._qualified_node(name) for name in payload.get("lineage_inputs") or []]
+        outputs = [self._qualified_node(name) for name in payload.get("lineage_outputs") or []]
+        self.mapping(payload.get("name"), [n for n in inputs if n is not None], [n for n in outputs if n is not None])
+
+    def _qualified_node(self, qualified_name: str) -> Optional[int]:
+        name = str(qualified_name or "").split("@")[0]
+        kind, _, rest = name.partition(".")
+        if kind == "column" and "." in rest:
+            dataset, field = rest.rsplit(".", 1)
+            return self.field(dataset, field)
+        if kind == "datasource" and rest:
+            return self.dataset(rest)
+        return self.dataset(name) if name else None
+
+    def build(self) -> "LineageGraph":
+        return LineageGraph(self)
+
+
+def _csr(node_count: int, edges: List[Tuple[int, int]]) -> Tuple[array, array]:
+    """Compressed adjacency: neighbours of n are targets[offsets[n]:offsets[n + 1]]."""
+    offsets = array("i", [0]) * (node_count + 1)
+    for source, _ in edges:
+        offsets[source + 1] += 1
+    for n in range(node_count):
+        offsets[n + 1] += offsets[n]
+    targets = array("i", [0]) * len(edges)
+    cursor = array("i", offsets[:-1])
+    for source, target in edges:
+        targets[cursor[source]] = target
+        cursor[source] += 1
+    return offsets, targets
+
+
+class LineageGraph:
+    """Immutable lineage graph with forward and backward adjacency arrays."""
+
+    def __init__(self, builder: LineageGraphBuilder):
+        self.labels = builder.labels
+        self.kinds = builder.kinds
+        self.rules = builder.rules
+        self.fields_by_name = dict(builder.fields_by_name)
+        self.fields_by_dataset = dict(builder.fields_by_dataset)
+        self.multi_word_keys = sorted({key for key in list(self.fields_by_name) + list(self.fields_by_dataset) if " " in key},
+                                      key=len, reverse=True)
+        self.out_offsets, self.out_targets = _csr(len(self.labels), builder.edges)
+        self.in_offsets, self.in_targets = _csr(len(self.labels), [(target, source) for source, target in builder.edges])
+        self.edge_count = len(builder.edges)
+        self.identifiers = builder.identifiers
+        self.built_at = time.time()
+
+    def suggestions(self) -> List[Tuple[str, str]]:
+        """Flux / Process names (one per mapping) for the catalog typeahead."""
+        return [(label, "flux") for node, label in enumerate(self.labels)
+                if self.kinds[node] == MAPPING_NODE and label != "Flux"]
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def _walk(self, start: List[int], offsets: array, targets: array, hops: int) -> List[Step]:
+        """Breadth-first walk; one hop = one mapping crossed (node -> mapping -> next node)."""
+        seen = set(start)
+        frontier = list(start)
+        steps: List[Step] = []
+        for depth in range(1, hops + 1):
+            next_frontier = []
+            for node in frontier:
+                for mapping in targets[offsets[node]:offsets[node + 1]]:
+                    for next_node in targets[offsets[mapping]:offsets[mapping + 1]]:
+                        steps.append((depth, node, mapping, next_node))
+                        if next_node not in seen:
+                            seen.add(next_node)
+                            next_frontier.append(next_node)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return steps
+
+    def downstream(self, nodes: List[int], hops: int = 1) -> List[Step]:
+        """Targets fed by `nodes`, up to `hops` flows away."""
+        return self._walk(nodes, self.out_offsets, self.out_targets, hops)
+
+    def upstream(self, nodes: List[int], hops: int = 1) -> List[Step]:
+        """Sources feeding `nodes`, up to `hops` flows away."""
+        return self._walk(nodes, self.in_offsets, self.in_targets, hops)
+
+    def nodes_in(self, folded_query: str) -> Tuple[List[int], List[str]]:
+        """Field/dataset nodes mentioned in the query, and the names that matched."""
+        names = mentioned_keys(folded_query, self.fields_by_name, self.multi_word_keys)
+        nodes = [node for name in names for node in self.fields_by_name[name]]
+        datasets = mentioned_keys(folded_query, self.fields_by_dataset, self.multi_word_keys)
+        nodes += [node for name in datasets for node in self.fields_by_dataset[name]]
+        return list(dict.fromkeys(nodes)), names + datasets
+
+
+_graph: Optional[LineageGraph] = None
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def get_graph() -> Optional[LineageGraph]:
+    return _graph
+
+
+async def _scroll(qdrant_client: AsyncQdrantClient, collection_name: str, scroll_filter, payload_fields):
+    offset = None
+    while True:
+        points, offset = await qdrant_client.scroll(
+            collection_name=collection_name,
+            scroll_filter=scroll_filter,
+            limit=SCROLL_PAGE_SIZE,
+            offset=offset,
+            with_payload=payload_fields,
+            with_vectors=False
+        )
+        for point in points:
+            yield point.payload or {}
+        if offset is None:
+            return
+
+
+async def build_graph(qdrant_client: AsyncQdrantClient) -> LineageGraph:
+    """Builds the graph from the Référentiel Flux rows of the catalog and the Atlas Process entities."""
+    builder = LineageGraphBuilder()
+    flow_filter = qdrant_models.Filter(must=[
+        qdrant_models.FieldCondition(key="source_sheet", match=qdrant_models.MatchValue(value=FLOW_SHEET))
+    ])
+    async for payload in _scroll(qdrant_client, settings.QDRANT_COLLECTION_NAME, flow_filter, ["original_data"]):
+        if isinstance(payload.get("original_data"), dict):
+            builder.add_flow_row(payload["original_data"])
+
+    process_filter = qdrant_models.Filter(must=[
+        qdrant_models.FieldCondition(key="typeName", match=qdrant_models.MatchValue(value="Process"))
+    ])
+    try:
+        async for payload in _scroll(qdrant_client, settings.ATLAS_COLLECTION_NAME, process_filter, True):
+            builder.add_atlas_process(payload)
+    except Exception as e:
+        # Atlas est optionnel : le graphe du catalogue reste utilisable
+        logger.warning(f"Atlas Process entities not loaded into the lineage graph: {e}")
+    return builder.build()
+
+
+async def refresh(qdrant_client: AsyncQdrantClient) -> None:
+    global _graph
+    start = time.perf_counter()
+    graph = await build_graph(qdrant_client)
+    _graph = graph
+    await identifier_resolver.update("lineage", graph.identifiers)
+    await catalog_suggest.update("lineage", graph.suggestions())
+    logger.info(f"Lineage graph built: {len(graph)} nodes, {graph.edge_count} edges "
+                f"in {(time.perf_counter() - start) * 1000:.0f} ms.")
+
+
+def start_refresh(get_client, interval_seconds: float, poll_seconds: float, retry_seconds: float = 10.0) -> None:
+    """Rebuilds the graph from Qdrant after each completed ingestion and every interval_seconds (Atlas sync)."""
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(run_refresh_loop(
+            "Lineage graph", refresh, get_client, interval_seconds, poll_seconds, retry_seconds
+        ))
+
+
+async def stop_refresh() -> None:
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
+
+
+def _edge_rows(graph: LineageGraph, steps: List[Step], upstream: bool) -> List[str]:
+    rows = []
+    for depth, node, mapping, next_node in steps[:settings.CATALOG_LOOKUP_MAX_ROWS]:
+        source, target = (next_node, node) if upstream else (node, next_node)
+        rule = graph.rules.get(mapping, "-").replace("|", "/")
+        rows.append(f"| {depth} | {graph.labels[source]} | {graph.labels[mapping]} | {rule} | {graph.labels[target]} |")
+    if len(steps) > settings.CATALOG_LOOKUP_MAX_ROWS:
+        rows.append(f"\n*{len(steps) - settings.CATALOG_LOOKUP_MAX_ROWS} liens supplémentaires non affichés.*")
+    return rows
+
+
+def answer(query: str) -> Optional[str]:
+    """
+    Answers "d'où vient le champ X" / "quelles cibles alimente la source Y" exactly
+    from the graph, as compact Markdown. None if not a lineage question on a known field/source.
+    """
+    graph = _graph
+    if not settings.LINEAGE_ENABLED or graph is None:
+        return None
+    folded_query = fold_text(query)
+    if has_keyword(folded_query, _OPEN_QUESTION_MARKERS):
+        return None
+    upstream = has_keyword(folded_query, _UPSTREAM_MARKERS)
+    if not upstream and not has_keyword(folded_query, _DOWNSTREAM_MARKERS):
+        return None
+    nodes, names = graph.nodes_in(folded_query)
+    if not nodes:
+        return None
+    start = time.perf_counter()
+    steps = graph.upstream(nodes, settings.LINEAGE_MAX_HOPS) if upstream else graph.downstream(nodes, settings.LINEAGE_MAX_HOPS)
+    if not steps:
+        return None
+    direction = "amont" if upstream else "aval"
+    lines = [f"## Lignage {direction} de **{', '.join(names)}**", "",
+             "| Niveau | Champ source | Flux | Règle | Champ cible |", "|---|---|---|---|---|"]
+    lines += _edge_rows(graph, steps, upstream)
+    logger.info(f"Lineage question answered from the graph ({len(steps)} links) in {(time.perf_counter() - start) * 1000:.2f} ms.")
+    return "\n".join(lines)
+
+
+def context_for(query: str) -> Optional[str]:
+    """Compact lineage of the fields/sources named in the query, to add to the RAG context."""
+    graph = _graph
+    if not settings.LINEAGE_ENABLED or graph is None:
+        return None
+    nodes, _ = graph.nodes_in(fold_text(query))
+    if not nodes:
+        return None
+    steps = [(step, True) for step in graph.upstream(nodes, settings.LINEAGE_CONTEXT_HOPS)]
+    steps += [(step, False) for step in graph.downstream(nodes, settings.LINEAGE_CONTEXT_HOPS)]
+    if not steps:
+        return None
+    lines = ["Lignage (source -> flux -> cible):"]
+    for (_, node, mapping, next_node), upstream in steps[:settings.LINEAGE_CONTEXT_MAX_EDGES]:
+        source, target = (next_node, node) if upstream else (node, next_node)
+        rule = graph.rules.get(mapping)
+        lines.append(f"{graph.labels[source]} -> {graph.labels[mapping]}{f' ({rule})' if rule else ''} -> {graph.labels[target]}")
+    return "\n".join(lines)
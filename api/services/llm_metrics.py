@@ -0,0 +1,68 @@
+# api/services/llm_metrics.py
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PromptCacheStats:
+    """
+    Aggregates Ollama prompt-evaluation counters to measure KV-prefix reuse.
+
+    Ollama only evaluates the prompt tokens that are not already in its KV cache,
+    so `prompt_eval_count` drops when the stable system prefix is reused. The
+    cached share is estimated against the locally counted prompt tokens.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.evaluated_tokens = 0
+        self.prompt_eval_seconds = 0.0
+        self.cache_hits = 0
+
+    def record(self, call_name: str, prompt_tokens: int, response: Any) -> None:
+        """Records the prompt-eval counters of one Ollama chat response."""
+        evaluated = _response_field(response, "prompt_eval_count")
+        eval_duration_ns = _response_field(response, "prompt_eval_duration")
+        if evaluated is None:
+            return
+        cached = max(0, prompt_tokens - evaluated)
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.evaluated_tokens += evaluated
+            self.prompt_eval_seconds += (eval_duration_ns or 0) / 1e9
+            if cached > 0:
+                self.cache_hits += 1
+        logger.info(
+            f"[{call_name}] Prompt eval: {evaluated}/{prompt_tokens} tokens evaluated "
+            f"(~{cached} reused from cache) in {(eval_duration_ns or 0) / 1e6:.0f} ms"
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(0, self.prompt_tokens - self.evaluated_tokens)
+            return {
+                "requests": self.requests,
+                "cache_hit_requests": self.cache_hits,
+                "cache_hit_rate": round(self.cache_hits / self.requests, 3) if self.requests else 0.0,
+                "prompt_tokens": self.prompt_tokens,
+                "evaluated_prompt_tokens": self.evaluated_tokens,
+                "reused_prompt_tokens_ratio": round(reused / self.prompt_tokens, 3) if self.prompt_tokens else 0.0,
+                "avg_prompt_eval_ms": round(self.prompt_eval_seconds * 1000 / self.requests, 1) if self.requests else 0.0,
+            }
+
+
+def _response_field(response: Any, key: str) -> Optional[int]:
+    """Reads a field from an Ollama response (dict or response object)."""
+    try:
+        value = response[key]
+    except (KeyError, TypeError):
+        value = getattr(response, key, None)
+    return int(value) if value is not None else None
+
+
+prompt_cache_stats = PromptCacheStats()
@@ -0,0 +1,106 @@
+# api/services/markdown_renderer.py
+import html
+import re
+from typing import List
+
+# Le LLM répond dans un Markdown compact (titres #, listes -, 1., tableaux |,
+# **gras**, *italique*) : bien moins de tokens générés que du HTML balisé.
+# Ce rendu, en une passe ligne par ligne et sans dépendance, produit le HTML
+# attendu par le frontend (mêmes balises que l'ancienne consigne HTML).
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*$")
+_BULLET = re.compile(r"^[-*+•]\s+(.*)$")
+_NUMBERED = re.compile(r"^\d+[.)]\s+(.*)$")
+_TABLE_SEPARATOR = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$")
+_CODE = re.compile(r"`([^`]+)`")
+_BOLD = re.compile(r"\*\*(.+?)\*\*|__(.+?)__")
+_ITALIC = re.compile(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])|(?<![\w_])_(?!\s)(.+?)(?<!\s)_(?![\w_])")
+# Réponse déjà en HTML (ancien format, ou modèle qui ignore la consigne) : rendue telle quelle
+_ALREADY_HTML = re.compile(r"^\s*<(h[1-6]|p|ul|ol|table|div|strong)\b", re.IGNORECASE)
+
+
+def _inline(text: str) -> str:
+    """Escapes the text and converts inline code, bold and italic."""
+    text = html.escape(text, quote=False)
+    text = _CODE.sub(lambda m: f"<code>{m.group(1)}</code>", text)
+    text = _BOLD.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+    return _ITALIC.sub(lambda m: f"<em>{m.group(1) or m.group(2)}</em>", text)
+
+
+def _cells(row: str) -> List[str]:
+    return [cell.strip() for cell in row.strip().strip("|").split("|")]
+
+
+def _table(rows: List[str]) -> str:
+    header, body = rows[0], [row for row in rows[1:] if not _TABLE_SEPARATOR.match(row)]
+    parts = ["<table><tr>", "".join(f"<th>{_inline(cell)}</th>" for cell in _cells(header)), "</tr>"]
+    for row in body:
+        parts.append("<tr>" + "".join(f"<td>{_inline(cell)}</td>" for cell in _cells(row)) + "</tr>")
+    parts.append("</table>")
+    return "".join(parts)
+
+
+def render(markdown: str) -> str:
+    """Converts the compact Markdown answer of the LLM into HTML."""
+    if not markdown or _ALREADY_HTML.match(markdown):
+        return markdown
+    lines = markdown.replace("\r\n", "\n").split("\n")
+    out: List[str] = []
+    paragraph: List[str] = []
+    list_tag = None
+
+    def flush_paragraph():
+        if paragraph:
+            out.append(f"<p>{'<br>'.join(_inline(line) for line in paragraph)}</p>")
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            out.append(f"</{list_tag}>")
+            list_tag = None
+
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if not line:
+            flush_paragraph()
+            close_list()
+            i += 1
+            continue
+
+        # Tableau : ligne d'entête suivie d'un séparateur |---|---|
+        if line.startswith("|") and i + 1 < len(lines) and _TABLE_SEPARATOR.match(lines[i + 1].strip()):
+            flush_paragraph()
+            close_list()
+            rows = []
+            while i < len(lines) and lines[i].strip().startswith("|"):
+                rows.append(lines[i].strip())
+                i += 1
+            out.append(_table(rows))
+            continue
+
+        heading = _HEADING.match(line)
+        bullet = _BULLET.match(line)
+        numbered = _NUMBERED.match(line)
+        if heading:
+            flush_paragraph()
+            close_list()
+            level = min(len(heading.group(1)), 3)  # Le frontend stylise h1 à h3
+            out.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+        elif bullet or numbered:
+            flush_paragraph()
+            tag = "ul" if bullet else "ol"
+            if list_tag != tag:
+                close_list()
+                out.append(f"<{tag}>")
+                list_tag = tag
+            out.append(f"<li>{_inline((bullet or numbered).group(1))}</li>")
+        else:
+            close_list()
+            paragraph.append(line)
+        i += 1
+
+    flush_paragraph()
+    close_list()
+    return "".join(out)
@@ -0,0 +1,160 @@
+# api/services/prompt_budget.py
+import asyncio
+import logging
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Approximation utilisée si le tokenizer du modèle cible n'est pas disponible
+# (volontairement pessimiste pour du français : ~3 caractères par token)
+_FALLBACK_CHARS_PER_TOKEN = 3
+
+# Questions dont la réponse est une énumération (champs, sources, comparaison...)
+_LIST_QUESTION = re.compile(
+    r"\b(liste[rz]?|quels sont|quelles sont|tous les|toutes les|champs|colonnes|sources|compar\w*|différences?|étapes)\b",
+    re.IGNORECASE
+)
+
+
+# Le tokenizer est chargé (ou téléchargé) au démarrage dans un thread ; tant
+# qu'il n'est pas là, ou s'il n'a pas pu être chargé, l'estimation par nombre
+# de caractères ci-dessus est utilisée.
+_tokenizer = None
+_load_task: Optional[asyncio.Task] = None
+
+
+def get_prompt_tokenizer():
+    """The target LLM tokenizer, or None (not configured, failed, or still loading at startup)."""
+    return _tokenizer
+
+
+def _load_prompt_tokenizer():
+    """Loads the target LLM tokenizer locally (no Ollama round-trip). Returns None on failure."""
+    tokenizer_name = settings.PROMPT_TOKENIZER_NAME
+    if not tokenizer_name:
+        logger.info("No PROMPT_TOKENIZER_NAME configured. Using character-based token estimate.")
+        return None
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        logger.info(f"Prompt tokenizer '{tokenizer_name}' loaded successfully.")
+        return tokenizer
+    except Exception as e:
+        logger.warning(f"Could not load prompt tokenizer '{tokenizer_name}': {e}. Using character-based token estimate.")
+        return None
+
+
+async def _load() -> None:
+    global _tokenizer
+    _tokenizer = await asyncio.get_event_loop().run_in_executor(None, _load_prompt_tokenizer)
+
+
+def start_loading() -> None:
+    """Loads (or downloads) the tokenizer in a worker thread at startup; until then token counts are estimated."""
+    global _load_task
+    if _tokenizer is None and (_load_task is None or _load_task.done()):
+        _load_task = asyncio.create_task(_load())
+
+
+def count_tokens(text: str) -> int:
+    """Counts tokens of `text` with the target model tokenizer."""
+    if not text:
+        return 0
+    tokenizer = get_prompt_tokenizer()
+    if tokenizer is None:
+        return math.ceil(len(text) / _FALLBACK_CHARS_PER_TOKEN)
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts `text` to at most `max_tokens` tokens, appending '...' when truncated."""
+    if max_tokens <= 0:
+        return ""
+    tokenizer = get_prompt_tokenizer()
+    if tokenizer is None:
+        max_chars = max_tokens * _FALLBACK_CHARS_PER_TOKEN
+        return text if len(text) <= max_chars else text[:max_chars] + "..."
+    token_ids = tokenizer.encode(text, add_special_tokens=False)
+    if len(token_ids) <= max_tokens:
+        return text
+    return tokenizer.decode(token_ids[:max_tokens]).strip() + "..."
+
+
+def pack_chunks(
+    chunks: List[str],
+    scores: Optional[List[float]] = None,
+    token_budget: Optional[int] = None
+) -> Tuple[List[str], int]:
+    """
+    Packs context chunks by descending relevance into a token budget.
+    A chunk that does not fit entirely is truncated if enough budget remains,
+    so the most relevant fields are never dropped for a lower-ranked chunk.
+    Returns the selected chunks (in relevance order) and their token count.
+    """
+    budget = token_budget if token_budget is not None else settings.PROMPT_CONTEXT_TOKEN_BUDGET
+    if scores is None:
+        ranked = list(chunks)
+    else:
+        ranked = [chunk for chunk, _ in sorted(zip(chunks, scores), key=lambda x: x[1], reverse=True)]
+
+    selected = []
+    used_tokens = 0
+    for chunk in ranked:
+        remaining = budget - used_tokens
+        if remaining < settings.PROMPT_MIN_CHUNK_TOKENS:
+            break
+        chunk_tokens = count_tokens(chunk)
+        if chunk_tokens > remaining:
+            chunk = truncate_to_tokens(chunk, remaining)
+            chunk_tokens = count_tokens(chunk)
+        selected.append(chunk)
+        used_tokens += chunk_tokens
+    return selected, used_tokens
+
+
+def stable_num_ctx() -> int:
+    """
+    Context window derived from the configured token budgets, rounded up to 512.
+    It is constant on purpose: a per-request num_ctx makes Ollama reload the
+    model and drops the KV cache of the shared system prompt.
+    """
+    needed = (settings.PROMPT_STATIC_TOKEN_ALLOWANCE + settings.PROMPT_CONTEXT_TOKEN_BUDGET
+              + settings.PROMPT_HISTORY_TOKEN_BUDGET + settings.PROMPT_QUERY_TOKEN_ALLOWANCE
+              + settings.PROMPT_RESPONSE_TOKEN_RESERVE)
+    return max(settings.OLLAMA_MIN_NUM_CTX, int(math.ceil(needed / 512.0)) * 512)
+
+
+def ollama_options(**overrides) -> Dict[str, Any]:
+    """Options shared by every Ollama call so the loaded runner (and its cache) is reused."""
+    options = {"num_ctx": stable_num_ctx()}
+    options.update(overrides)
+    return options
+
+
+def response_token_cap(query: str, general: bool = False) -> int:
+    """
+    num_predict for an answer: short for general questions and single facts,
+    larger for enumerations. On CPU the generation time grows with the number
+    of output tokens; unlike num_ctx, num_predict does not reload the model.
+    """
+    if general:
+        cap = settings.NUM_PREDICT_GENERAL
+    elif _LIST_QUESTION.search(query):
+        cap = settings.NUM_PREDICT_LIST
+    else:
+        cap = settings.NUM_PREDICT_SHORT
+    return min(cap, settings.PROMPT_RESPONSE_TOKEN_RESERVE)
+
+
+def derive_generation_params(prompt_tokens: int) -> Dict[str, int]:
+    """
+    Derives the Ollama `num_ctx` (from the token budgets) and the request
+    timeout (from the real prompt size).
+    """
+    timeout = settings.OLLAMA_TIMEOUT_BASE_SECONDS + prompt_tokens * settings.OLLAMA_TIMEOUT_PER_1K_PROMPT_TOKENS / 1000.0
+    timeout = int(min(max(timeout, settings.OLLAMA_MIN_REQUEST_TIMEOUT), settings.OLLAMA_MAX_REQUEST_TIMEOUT))
+    return {"num_ctx": stable_num_ctx(), "timeout": timeout}
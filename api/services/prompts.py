@@ -0,0 +1,22 @@
+# api/services/prompts.py
+"""
+Static prompt texts sent as the `system` message to Ollama.
+
+These strings must stay byte-identical between requests: Ollama reuses the
+KV cache of the longest common prompt prefix, so the fixed instructions come
+first (system message) and the variable parts (history, context, question)
+last (user message).
+"""
+
+RAG_SYSTEM_PROMPT = """Assistant bancaire Banque Populaire. Français uniquement.
+Réponds à la question de l'utilisateur en t'appuyant uniquement sur le CONTEXTE fourni."""
+
+# Format compact demandé au modèle : le HTML attendu par le frontend est produit
+# côté serveur (services/markdown_renderer.py), ce qui économise les tokens
+# générés par les balises.
+MARKDOWN_FORMAT_INSTRUCTIONS = """Format : Markdown concis. ## pour les titres, - pour les listes, 1. pour les étapes, **gras** pour les noms de tables et de champs, tableaux | a | b | pour comparer. Pas de HTML, pas de phrase d'introduction."""
+
+RAG_MARKDOWN_SYSTEM_PROMPT = RAG_SYSTEM_PROMPT + "\n" + MARKDOWN_FORMAT_INSTRUCTIONS
+
+GENERAL_SYSTEM_PROMPT = """Tu es l'assistant virtuel de la Banque Populaire. Réponds de manière professionnelle et concise aux questions générales (sans données spécifiques).
+Garde un ton professionnel et oriente vers les services d'analyse de données si pertinent."""
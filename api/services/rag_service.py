@@ -1,12 +1,13 @@
 # api/services/rag_service.py
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Awaitable
+import asyncio
 import re
+import time
 
 import ollama
 import httpx # Import httpx to catch potential timeout errors specifically
-from fastapi import Request
-from qdrant_client import QdrantClient, models as qdrant_models
+from qdrant_client import AsyncQdrantClient, models as qdrant_models
 from qdrant_client.http.models import PointStruct
 from sentence_transformers import SentenceTransformer
 
@@ -15,6 +16,11 @@ from sentence_transformers import SentenceTransformer
 # If rag_service.py is inside 'services' which is inside 'api',
 # and config.py is inside 'core' which is inside 'api':
 from ..core.config import settings
+from ..core.llm_gateway import LLMGateway
+from ..core.embedding_cache import encode_query
+from ..core.models import get_query_embedding_cache, dependency_registry, OLLAMA_DEPENDENCY
+from ..core import qdrant_collections
+from . import intent_classifier, prompt_budget, prompts, llm_metrics, reranker, retrieval_service, degraded_answer, markdown_renderer, catalog_lookup, lineage_graph, identifier_resolver
 # If the structure is different, adjust the relative import path accordingly.
 
 logger = logging.getLogger(__name__)
@@ -119,15 +125,25 @@ def _get_embedding(query: str, embedding_model: SentenceTransformer) -> List[flo
     """Generates embedding for the query."""
     try:
         logger.info("Generating embedding for query...")
-        embedding = embedding_model.encode(query).tolist()
+        # Retries and repeated questions (dashboard, voice, avatar) are served from the LRU
+        embedding = encode_query(embedding_model, query, get_query_embedding_cache())
         logger.info("Embedding generated successfully.")
         return embedding
     except Exception as e:
         logger.error(f"Failed to generate embedding: {e}", exc_info=True)
         raise RagEmbeddingError(f"Failed to generate embedding: {e}")
 
-def _search_qdrant(query_embedding: List[float], qdrant_client: QdrantClient, query_text: str = "") -> List[str]:
+async def _search_qdrant(query_embedding: List[float], qdrant_client: AsyncQdrantClient, query_text: str = "") -> List[str]:
     """Searches Qdrant for relevant context."""
+    return [text for text, _ in await _search_qdrant_scored(query_embedding, qdrant_client, query_text)]
+
+async def _search_qdrant_scored(query_embedding: List[float], qdrant_client: AsyncQdrantClient, query_text: str = "") -> List[Tuple[str, float]]:
+    """Searches Qdrant for relevant context, returning (text, relevance score) pairs sorted by relevance."""
+    return [(text, score) for _, text, score, _ in await _search_qdrant_candidates(query_embedding, qdrant_client, query_text)]
+
+async def _search_qdrant_candidates(query_embedding: List[float], qdrant_client: AsyncQdrantClient, query_text: str = "", limit: Optional[int] = None) -> List[Tuple[Any, str, float, Dict[str, Any]]]:
+    """Searches Qdrant for relevant context, returning (point id, text, relevance score, payload) sorted by relevance."""
+    limit = limit or settings.NUM_RESULTS_TO_RETRIEVE
     try:
         logger.info(f"Searching Qdrant collection '{settings.QDRANT_COLLECTION_NAME}'...")
         
@@ -160,10 +176,11 @@ def _search_qdrant(query_embedding: List[float], qdrant_client: QdrantClient, qu
         logger.info(f"Identified important search terms: {important_terms}")
         
         # Recherche vectorielle standard
-        search_result = qdrant_client.search(
+        search_result = await qdrant_client.search(
             collection_name=settings.QDRANT_COLLECTION_NAME,
             query_vector=query_embedding,
-            limit=settings.NUM_RESULTS_TO_RETRIEVE * 2,  # On récupère plus de résultats pour filtrer après
+            limit=limit * 2,  # On récupère plus de résultats pour filtrer après
+            search_params=qdrant_collections.search_params()  # Quantized search + rescoring
         )
         
         # Filtrer et trier les résultats par pertinence
@@ -182,25 +199,67 @@ def _search_qdrant(query_embedding: List[float], qdrant_client: QdrantClient, qu
                 if term.lower() in text.lower():
                     relevance_score += 0.1  # Bonus pour chaque terme important présent
             
-            filtered_results.append((text, relevance_score))
+            filtered_results.append((hit.id, text, relevance_score, hit.payload))
         
         # Trier par score de pertinence
-        filtered_results.sort(key=lambda x: x[1], reverse=True)
+        filtered_results.sort(key=lambda x: x[2], reverse=True)
         
         # Prendre uniquement les meilleurs résultats
-        top_results = filtered_results[:settings.NUM_RESULTS_TO_RETRIEVE]
-        
-        # Extraire uniquement les textes
-        context_chunks = [text for text, _ in top_results]
+        top_results = filtered_results[:limit]
         
-        logger.info(f"Retrieved {len(context_chunks)} relevant text chunks from Qdrant.")
-        if not context_chunks:
+        logger.info(f"Retrieved {len(top_results)} relevant text chunks from Qdrant.")
+        if not top_results:
             logger.warning("No relevant context chunks found in Qdrant.")
-        return context_chunks
+        return top_results
     except Exception as e:
         logger.error(f"Failed to search Qdrant: {e}", exc_info=True)
         raise RagSearchError(f"Failed to search Qdrant: {e}")
 
+async def _retrieve_candidates(
+    query_embedding: List[float],
+    qdrant_client: AsyncQdrantClient,
+    query_text: str,
+    conversation_id: Optional[str],
+    user_id: Optional[int],
+    limit: int,
+    conversation_ready: Optional[Awaitable[Any]] = None
+) -> List[Tuple[Any, str, float, Optional[Dict[str, Any]]]]:
+    """
+    Fans the search out to the catalog, the conversation's files and Atlas, each with its own timeout.
+    The catalog and Atlas searches start at once; conversation_ready (the pending conversation load,
+    falsy when it does not belong to user_id) is only awaited before adding the files source.
+    """
+    sources = {
+        retrieval_service.CATALOG_SOURCE: asyncio.ensure_future(_search_qdrant_candidates(query_embedding, qdrant_client, query_text, limit=limit)),
+    }
+    if settings.ATLAS_COLLECTION_NAME:
+        sources[retrieval_service.ATLAS_SOURCE] = asyncio.ensure_future(retrieval_service.search_atlas(query_embedding, qdrant_client))
+    try:
+        if conversation_id and user_id is not None and await _conversation_owned(conversation_ready):
+            sources[retrieval_service.USER_FILES_SOURCE] = retrieval_service.search_user_files(
+                query_embedding, qdrant_client, conversation_id, user_id
+            )
+    except asyncio.CancelledError:
+        # Request cancelled while waiting for the conversation: stop the searches already started
+        for search in sources.values():
+            search.cancel()
+        raise
+    candidates, answered = await retrieval_service.fan_out(sources, limit)
+    if not answered:
+        raise RagSearchError("No retrieval source answered in time.")
+    return candidates
+
+async def _conversation_owned(conversation_ready: Optional[Awaitable[Any]]) -> bool:
+    """Without conversation_ready the caller has already checked ownership."""
+    if conversation_ready is None:
+        return True
+    try:
+        return bool(await conversation_ready)
+    except Exception as e:
+        # The caller reports the failed load itself; the files source is just left out
+        logger.warning(f"Conversation load failed ({e}). Searching without the conversation's files.")
+        return False
+
 def _format_conversation_history(messages: List[Dict[str, Any]]) -> str:
     """Format the conversation history for inclusion in the prompt."""
     if not messages:
@@ -229,24 +288,21 @@ def _format_conversation_history(messages: List[Dict[str, Any]]) -> str:
     
     return history_text
 
-async def _generate_response(query: str, context_chunks: List[str], ollama_client: ollama.AsyncClient, conversation_history: Optional[List[Dict[str, Any]]] = None) -> str:
-    """Generates a response using the Ollama LLM with context, forcing French output."""
+async def _generate_response(query: str, context_chunks: List[str], ollama_client: LLMGateway, conversation_history: Optional[List[Dict[str, Any]]] = None, chunk_scores: Optional[List[float]] = None, html_formatting: bool = False, timeout_cap: Optional[float] = None) -> str:
+    """
+    Generates a response using the Ollama LLM with context, forcing French output.
+    The static instructions go in a stable system message (reused from Ollama's
+    KV cache); history, context and question are sent last as the user message.
+    With html_formatting the model answers in compact Markdown, rendered to HTML here.
+    """
     if not context_chunks:
         context_string = "Aucun contexte pertinent trouvé." # Context notice in French
+        context_tokens = prompt_budget.count_tokens(context_string)
     else:
-        # OPTIMISATION AGRESSIVE pour modèle léger llama3.2:1b
-        max_chunks = 8 if conversation_history else 10  # Réduction drastique
-        limited_chunks = context_chunks[:max_chunks]
-        
-        # Limiter drastiquement la longueur de chaque chunk à 150 caractères max
-        truncated_chunks = []
-        for chunk in limited_chunks:
-            if len(chunk) > 150:
-                truncated_chunks.append(chunk[:150] + "...")
-            else:
-                truncated_chunks.append(chunk)
-        
-        context_string = "\n---\n".join(truncated_chunks)
+        # Sélection des chunks par pertinence dans un budget de tokens (tokenizer du modèle cible)
+        packed_chunks, context_tokens = prompt_budget.pack_chunks(context_chunks, chunk_scores)
+        context_string = "\n---\n".join(packed_chunks)
+        logger.info(f"Packed {len(packed_chunks)}/{len(context_chunks)} context chunks into {context_tokens} tokens (budget: {settings.PROMPT_CONTEXT_TOKEN_BUDGET}).")
 
     # Format conversation history if provided - VERSION ULTRA COURTE
     history_string = ""
@@ -263,49 +319,53 @@ async def _generate_response(query: str, context_chunks: List[str], ollama_clien
                 role = "U" if msg.get("role") == "user" else "A"
                 content = msg.get("content", "")
             
-            # Limiter à 100 caractères max
-            if len(content) > 100:
-                content = content[:100] + "..."
-                
+            content = prompt_budget.truncate_to_tokens(content, settings.PROMPT_HISTORY_TOKEN_BUDGET)
             history_string = f"Dernier: {role}: {content}\n"
         
         logger.info(f"Including conversation history with {len(conversation_history)} messages")
     
-    # PROMPT ULTRA SIMPLIFIÉ pour modèle léger
-    prompt = f"""Assistant bancaire Banque Populaire. Français uniquement.
-
-{history_string}
+    # Partie fixe (system) d'abord, partie variable (user) en dernier
+    system_prompt = prompts.RAG_MARKDOWN_SYSTEM_PROMPT if html_formatting else prompts.RAG_SYSTEM_PROMPT
+    user_prompt = f"""{history_string}
 CONTEXTE:
 {context_string}
 
 Q: {query}
 R:"""
 
-    # End of improved prompt
-
+    system_tokens = prompt_budget.count_tokens(system_prompt)
+    prompt_tokens = system_tokens + prompt_budget.count_tokens(user_prompt)
     logger.info(f"Sending request to Ollama model: {settings.OLLAMA_MODEL_NAME}...")
-    logger.info(f"Prompt length: {len(prompt)} characters")
+    logger.info(
+        f"Prompt tokens: total={prompt_tokens}, system={system_tokens}, history={prompt_budget.count_tokens(history_string)}, "
+        f"context={context_tokens}, query={prompt_budget.count_tokens(query)}"
+    )
 
     try:
-        # Timeouts encore plus agressifs
-        if len(prompt) > 2000:  # Prompt long
-            request_timeout = 180  # 3 minutes max
-            logger.warning(f"Large prompt detected ({len(prompt)} chars). Using extended timeout.")
-        elif len(prompt) > 1000:  # Prompt moyen
-            request_timeout = 90   # 1.5 minutes
-        else:  # Prompt court
-            request_timeout = 45   # 45 secondes
-            
-        logger.info(f"Using optimized timeout of {request_timeout} seconds for Ollama request")
+        # Timeout et num_ctx dérivés du nombre réel de tokens du prompt
+        generation_params = prompt_budget.derive_generation_params(prompt_tokens)
+        request_timeout = generation_params["timeout"]
+        if timeout_cap is not None:
+            # Never wait past the request deadline (the caller then answers in degraded mode)
+            request_timeout = max(1, min(request_timeout, timeout_cap))
+        num_predict = prompt_budget.response_token_cap(query)
+        logger.info(f"Using timeout of {request_timeout} seconds, num_ctx={generation_params['num_ctx']} and num_predict={num_predict} for Ollama request")
         
-        # Note: ollama.Client timeout is set during initialization elsewhere (e.g., models.py or main app setup)
-        response = await ollama_client.chat(
-            model=settings.OLLAMA_MODEL_NAME,
-            messages=[{'role': 'user', 'content': prompt}]
-            # Removed timeout and keep_alive arguments as they are not supported
-            # stream=False, # Keep stream False if you expect the full response object
+        # Note: the client-level timeout is set in the LLM gateway (core/models.py); this bounds this request only
+        response = await asyncio.wait_for(
+            ollama_client.chat(
+                model=settings.OLLAMA_MODEL_NAME,
+                messages=[
+                    {'role': 'system', 'content': system_prompt},
+                    {'role': 'user', 'content': user_prompt}
+                ],
+                options=prompt_budget.ollama_options(num_predict=num_predict),
+                keep_alive=settings.OLLAMA_KEEP_ALIVE
+            ),
+            timeout=request_timeout
         )
         logger.info("Received response from Ollama.")
+        llm_metrics.prompt_cache_stats.record("rag", prompt_tokens, response)
 
         if response and 'message' in response and 'content' in response['message']:
              assistant_content = response['message']['content'].strip()
@@ -315,13 +375,20 @@ R:"""
                  # Return an error message also in French, if desired
                  return "Désolé, je n'ai pas pu générer de réponse."
              logger.info("Extracted content from Ollama response.")
-             return assistant_content
+             if 'done_reason' in response and response['done_reason'] == 'length':
+                 logger.info(f"Answer stopped at the num_predict cap ({num_predict} tokens).")
+             return markdown_renderer.render(assistant_content) if html_formatting else assistant_content
         else:
             logger.error(f"Unexpected response structure from Ollama: {response}")
             # Keep exception message in English for dev clarity, or change if needed
             raise RagGenerationError("Received unexpected response structure from the language model.")
 
-    except httpx.TimeoutException as e:
+    except httpx.ConnectError as e:
+        # Every host refused the connection: open the circuit without waiting for the next probe
+        logger.error(f"Could not connect to Ollama: {e}", exc_info=True)
+        dependency_registry.report_failure(OLLAMA_DEPENDENCY, e, force_open=True)
+        raise RagGenerationError(f"Could not connect to the language model: {e}")
+    except (httpx.TimeoutException, asyncio.TimeoutError) as e:
         logger.error(f"Timeout error connecting to Ollama: {e}", exc_info=True)
         # Keep exception message in English for dev clarity, or change if needed
         raise RagGenerationError(f"Request to language model timed out: {e}")
@@ -340,98 +407,182 @@ R:"""
 async def get_rag_response(
     user_query: str,
     embedding_model: SentenceTransformer,
-    qdrant_client: QdrantClient,
-    ollama_client: ollama.AsyncClient,
+    qdrant_client: AsyncQdrantClient,
+    ollama_client: LLMGateway,
     file_context: Optional[str] = None,
-    request_object: Optional[Request] = None,
     conversation_history: Optional[List[Dict[str, Any]]] = None,
-    html_formatting_request: Optional[str] = None
+    html_formatting: bool = False,
+    conversation_id: Optional[str] = None,
+    user_id: Optional[int] = None,
+    deadline: Optional[float] = None,
+    answer_meta: Optional[Dict[str, Any]] = None,
+    conversation_ready: Optional[Awaitable[Any]] = None
 ) -> str:
     """
     Generates a response using Retrieval-Augmented Generation.
     If file_context is provided, it prioritizes it and skips the general search.
+    Otherwise the catalog, the files of conversation_id and Atlas are searched concurrently
+    (the files only with user_id: callers must have checked the conversation belongs to that user,
+    or pass its pending load as conversation_ready so retrieval starts before it completes).
     If conversation_history is provided, includes it for context.
-    If html_formatting_request is provided, uses it for technical questions that need HTML formatting.
+    If html_formatting is True, the answer is returned as HTML (Markdown rendered server-side).
+    Exact metadata lookups (see catalog_lookup) are answered from the structured index.
+    deadline (time.monotonic() value) bounds the whole request: if the LLM queue is
+    saturated or generation cannot finish in time, a retrieval-only answer is
+    returned instead and answer_meta (if given) receives degraded/degraded_reason.
     Raises specific exceptions on failure.
-    Checks for client disconnection if request_object is provided.
     """
     logger.info(f"RAG Service: Processing query '{user_query[:50]}...'")
-
-    if request_object and await request_object.is_disconnected():
-        logger.warning("Client disconnected before RAG processing started.")
-        raise ClientDisconnectedError()
+    if deadline is None:
+        deadline = time.monotonic() + settings.rag_request_deadline_seconds
 
     # Détecter les questions générales et y répondre directement
     if _is_general_question(user_query):
         logger.info("General question detected. Providing direct response without RAG.")
         return await _generate_general_response(user_query, ollama_client)
 
+    # Identifiants mal orthographiés ou mal transcrits (CLIEN_QT, « client cute ») :
+    # orthographe canonique du catalogue avant la consultation et la recherche
+    user_query = identifier_resolver.rewrite(user_query)
+
+    # Questions de pure consultation (lignage d'un champ, types des champs d'une source,
+    # fréquence d'un flux...) : réponse exacte depuis le graphe de lignage ou l'index
+    # structuré, sans embedding, recherche ni LLM
+    if not file_context:
+        lookup_answer = lineage_graph.answer(user_query) or catalog_lookup.answer(user_query)
+        if lookup_answer:
+            return markdown_renderer.render(lookup_answer) if html_formatting else lookup_answer
+
     query_embedding = _get_embedding(user_query, embedding_model)
 
-    if request_object and await request_object.is_disconnected():
-        logger.warning("Client disconnected after embedding generation.")
-        raise ClientDisconnectedError()
+    # Questions générales manquées par les listes de mots-clés : classifieur
+    # d'intention sur l'embedding déjà calculé (aucun appel Qdrant ni LLM)
+    if not file_context:
+        small_talk_intent = intent_classifier.detect_small_talk(query_embedding)
+        if small_talk_intent:
+            logger.info(f"Small-talk intent '{small_talk_intent}' detected by classifier. Returning canned response.")
+            return _CANNED_RESPONSES[small_talk_intent]
 
     context_chunks = []
+    chunk_scores = None
+    payload_by_text: Dict[str, Any] = {}
     if file_context:
         logger.info("File context provided. Using it as primary context and skipping general search.")
         file_context_chunk = f"CONTENU DU FICHIER TÉLÉVERSÉ:\n---\n{file_context}\n---"
         context_chunks = [file_context_chunk]
     else:
-        logger.info("No file context provided. Searching general Qdrant collection.")
-        context_chunks = _search_qdrant(query_embedding, qdrant_client, user_query)
-
-    if request_object and await request_object.is_disconnected():
-        logger.warning("Client disconnected after context retrieval.")
-        raise ClientDisconnectedError()
-    
-    # Pour les questions techniques, utiliser le formatage HTML si demandé
-    final_query = html_formatting_request if html_formatting_request else user_query
-    
-    assistant_response = await _generate_response(
-        query=final_query, 
-        context_chunks=context_chunks, 
-        ollama_client=ollama_client,
-        conversation_history=conversation_history
-    )
+        # Wider candidate pool when the cross-encoder narrows it to fewer and better chunks
+        pool_size = max(settings.NUM_RESULTS_TO_RETRIEVE, settings.RERANK_TOP_K) if settings.RERANK_ENABLED else settings.NUM_RESULTS_TO_RETRIEVE
+        if settings.RETRIEVAL_FANOUT_ENABLED:
+            logger.info("No file context provided. Searching catalog, conversation files and Atlas concurrently.")
+            candidates = await _retrieve_candidates(query_embedding, qdrant_client, user_query, conversation_id, user_id, pool_size, conversation_ready)
+        else:
+            logger.info("No file context provided. Searching general Qdrant collection.")
+            candidates = await _search_qdrant_candidates(query_embedding, qdrant_client, user_query, limit=pool_size)
+        if settings.RERANK_ENABLED:
+            scored_chunks = await reranker.rerank(user_query, candidates)
+        else:
+            scored_chunks = [(text, score) for _, text, score, _ in candidates]
+        payload_by_text = {text: payload for _, text, _, payload in candidates}
+        context_chunks = [text for text, _ in scored_chunks]
+        chunk_scores = [score for _, score in scored_chunks]
+        # Lignage exact des champs/sources cités, placé en tête du contexte
+        lineage_context = lineage_graph.context_for(user_query)
+        if lineage_context:
+            context_chunks.insert(0, lineage_context)
+            chunk_scores.insert(0, max(chunk_scores, default=0.0) + 1.0)
+
+    # Retrieval-only fallback entries: (chunk, payload with original_data)
+    fallback_entries = [(file_context, None)] if file_context else [(text, payload_by_text.get(text)) for text in context_chunks]
+    degraded_reason = _degradation_reason(ollama_client, deadline)
+    if degraded_reason:
+        return _degraded_response(fallback_entries, degraded_reason, html_formatting, answer_meta)
 
-    if request_object and await request_object.is_disconnected():
-        logger.warning("Client disconnected after Ollama response generation (but response was generated).")
-        # La réponse est générée, mais le client est parti. On pourrait quand même logger/stocker la réponse.
-        raise ClientDisconnectedError()
+    try:
+        assistant_response = await _generate_response(
+            query=user_query,
+            context_chunks=context_chunks,
+            ollama_client=ollama_client,
+            conversation_history=conversation_history,
+            chunk_scores=chunk_scores,
+            html_formatting=html_formatting,
+            timeout_cap=deadline - time.monotonic()
+        )
+    except RagGenerationError:
+        if not settings.DEGRADED_ANSWERS_ENABLED:
+            raise
+        reason = degraded_answer.REASON_DEADLINE if time.monotonic() >= deadline - 1 else degraded_answer.REASON_LLM_ERROR
+        return _degraded_response(fallback_entries, reason, html_formatting, answer_meta)
 
     logger.info("RAG Service: Successfully generated response based on provided context and conversation history.")
     return assistant_response
 
-async def _generate_general_response(query: str, ollama_client: ollama.AsyncClient) -> str:
+def _degradation_reason(ollama_client: LLMGateway, deadline: float) -> Optional[str]:
+    """Returns why generation should be skipped (saturated queue / not enough time left), or None."""
+    if not settings.DEGRADED_ANSWERS_ENABLED:
+        return None
+    queue_depth = getattr(ollama_client, "queue_depth", 0)
+    if queue_depth >= settings.LLM_DEGRADE_QUEUE_DEPTH:
+        logger.warning(f"LLM queue depth {queue_depth} >= {settings.LLM_DEGRADE_QUEUE_DEPTH}: answering from retrieval only.")
+        return degraded_answer.REASON_QUEUE
+    remaining = deadline - time.monotonic()
+    if remaining < settings.LLM_MIN_GENERATION_SECONDS:
+        logger.warning(f"Only {remaining:.1f}s left before the request deadline: answering from retrieval only.")
+        return degraded_answer.REASON_DEADLINE
+    return None
+
+def _degraded_response(entries, reason: str, html_formatting: bool, answer_meta: Optional[Dict[str, Any]]) -> str:
+    logger.warning(f"RAG Service: returning a degraded retrieval-only answer ({reason}).")
+    if answer_meta is not None:
+        answer_meta["degraded"] = True
+        answer_meta["degraded_reason"] = reason
+    return degraded_answer.render(entries, reason, html_formatting)
+
+# Réponses prédéfinies par intention (partagées par la détection par mots-clés
+# et par le classifieur d'intention sur embeddings)
+_CANNED_RESPONSES = {
+    "greeting": "Bonjour ! Je suis votre assistant virtuel de la Banque Populaire. Je peux vous aider à analyser vos données bancaires, répondre à vos questions sur les comptes et les opérations. Comment puis-je vous assister aujourd'hui ?",
+    "role": "Je suis l'assistant virtuel de la Banque Populaire, spécialisé dans l'analyse de données bancaires. Je peux vous aider à :\n\n• Analyser vos fichiers de données\n• Comprendre les structures de comptes\n• Interpréter les flux financiers\n• Répondre aux questions sur les opérations bancaires\n\nPosez-moi une question spécifique sur vos données !",
+    "help": "Je peux vous assister sur plusieurs aspects :\n\n• **Analyse de fichiers** : Téléversez vos données Excel/CSV\n• **Questions techniques** : Formats, champs, structures\n• **Interprétation** : Flux, comptes, opérations\n• **Aide métier** : Processus bancaires, terminologie\n\nCommencez par me poser une question ou téléverser un fichier à analyser !",
+    "thanks": "Je vous en prie ! N'hésitez pas si vous avez d'autres questions sur vos données bancaires.",
+    "goodbye": "Au revoir ! À bientôt pour vos prochaines analyses de données.",
+}
+
+async def _generate_general_response(query: str, ollama_client: LLMGateway) -> str:
     """Génère une réponse appropriée pour les questions générales sans contexte RAG."""
     query_lower = query.lower().strip()
     
     # Réponses prédéfinies pour des cas courants
     if any(greeting in query_lower for greeting in ["bonjour", "salut", "hello", "hi", "bonsoir"]):
-        return "Bonjour ! Je suis votre assistant virtuel de la Banque Populaire. Je peux vous aider à analyser vos données bancaires, répondre à vos questions sur les comptes et les opérations. Comment puis-je vous assister aujourd'hui ?"
+        return _CANNED_RESPONSES["greeting"]
     
     if any(role in query_lower for role in ["rôle", "qui êtes-vous", "qui es-tu", "que faites-vous"]):
-        return "Je suis l'assistant virtuel de la Banque Populaire, spécialisé dans l'analyse de données bancaires. Je peux vous aider à :\n\n• Analyser vos fichiers de données\n• Comprendre les structures de comptes\n• Interpréter les flux financiers\n• Répondre aux questions sur les opérations bancaires\n\nPosez-moi une question spécifique sur vos données !"
+        return _CANNED_RESPONSES["role"]
     
     if any(help_term in query_lower for help_term in ["comment m'aider", "que puis-je demander", "capacités"]):
-        return "Je peux vous assister sur plusieurs aspects :\n\n• **Analyse de fichiers** : Téléversez vos données Excel/CSV\n• **Questions techniques** : Formats, champs, structures\n• **Interprétation** : Flux, comptes, opérations\n• **Aide métier** : Processus bancaires, terminologie\n\nCommencez par me poser une question ou téléverser un fichier à analyser !"
+        return _CANNED_RESPONSES["help"]
     
     if any(thanks in query_lower for thanks in ["merci", "thank you"]):
-        return "Je vous en prie ! N'hésitez pas si vous avez d'autres questions sur vos données bancaires."
+        return _CANNED_RESPONSES["thanks"]
     
     if any(goodbye in query_lower for goodbye in ["au revoir", "goodbye", "bye"]):
-        return "Au revoir ! À bientôt pour vos prochaines analyses de données."
+        return _CANNED_RESPONSES["goodbye"]
     
     # Pour les autres questions générales, utiliser le LLM avec un prompt simple
-    simple_prompt = f"""Tu es l'assistant virtuel de la Banque Populaire. Réponds de manière professionnelle et concise à cette question générale (sans données spécifiques) : {query}
-
-Garde un ton professionnel et oriente vers les services d'analyse de données si pertinent."""
-    
     try:
         response = await ollama_client.chat(
             model=settings.OLLAMA_MODEL_NAME,
-            messages=[{'role': 'user', 'content': simple_prompt}]
+            messages=[
+                {'role': 'system', 'content': prompts.GENERAL_SYSTEM_PROMPT},
+                {'role': 'user', 'content': query}
+            ],
+            options=prompt_budget.ollama_options(num_predict=prompt_budget.response_token_cap(query, general=True)),
+            keep_alive=settings.OLLAMA_KEEP_ALIVE
+        )
+        llm_metrics.prompt_cache_stats.record(
+            "general",
+            prompt_budget.count_tokens(prompts.GENERAL_SYSTEM_PROMPT) + prompt_budget.count_tokens(query),
+            response
         )
         if response and 'message' in response and 'content' in response['message']:
             return response['message']['content'].strip()
@@ -0,0 +1,52 @@
+# api/services/request_cancellation.py
+import asyncio
+import logging
+from typing import Awaitable, TypeVar
+
+from fastapi import Request
+
+from .rag_service import ClientDisconnectedError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Au lieu d'interroger request.is_disconnected() entre chaque étape, une tâche
+# de surveillance attend le message ASGI "http.disconnect" et annule le
+# traitement en cours (recherche, génération LLM...) dès que le client part.
+
+
+async def _wait_for_disconnect(request: Request) -> bool:
+    """Returns True once the client disconnects (the request body has already been read)."""
+    try:
+        while True:
+            message = await request.receive()
+            if message["type"] == "http.disconnect":
+                return True
+    except Exception as e:
+        logger.debug(f"Disconnect watcher stopped: {e}")
+        return False
+
+
+async def run_until_disconnected(request: Request, work: Awaitable[T]) -> T:
+    """
+    Awaits `work` while watching the client connection. If the client
+    disconnects first, `work` is cancelled and ClientDisconnectedError raised.
+    """
+    work_task = asyncio.ensure_future(work)
+    watcher = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({work_task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if watcher in done and watcher.result() and not work_task.done():
+            logger.warning("Client disconnected. Cancelling request processing.")
+            work_task.cancel()
+            try:
+                await work_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            raise ClientDisconnectedError()
+        return await work_task
+    finally:
+        watcher.cancel()
+        if not work_task.done():
+            work_task.cancel()  # The handler itself was cancelled
@@ -0,0 +1,153 @@
+# api/services/reranker.py
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Réordonnancement des candidats de la recherche vectorielle par un cross-encoder
+# (paire requête/chunk notée conjointement). Les scores sont mis en cache par
+# (hash de la requête, id du point) ; si le budget de temps est dépassé, l'ordre
+# vectoriel est conservé. Le modèle est chargé au démarrage et la notation
+# tourne dans un thread : la boucle d'événements n'est jamais bloquée.
+
+Candidate = Tuple[Any, str, float, Optional[Dict[str, Any]]]  # (point id, text, vector relevance score, payload)
+
+
+_model = None
+_load_task: Optional[asyncio.Task] = None
+
+
+def get_rerank_model():
+    """The loaded cross-encoder, or None (disabled, failed, or still loading at startup)."""
+    return _model
+
+
+def _load_rerank_model():
+    """Loads the CPU cross-encoder used for reranking. Returns None if disabled or on failure."""
+    if not settings.RERANK_ENABLED:
+        return None
+    try:
+        from sentence_transformers import CrossEncoder
+        model = CrossEncoder(settings.RERANK_MODEL_NAME, device="cpu", max_length=settings.RERANK_MAX_LENGTH)
+        logger.info(f"Rerank model '{settings.RERANK_MODEL_NAME}' loaded successfully.")
+        return model
+    except Exception as e:
+        logger.error(f"Could not load rerank model '{settings.RERANK_MODEL_NAME}': {e}. Reranking disabled.", exc_info=True)
+        return None
+
+
+class RerankScoreCache:
+    """Bounded LRU of cross-encoder scores keyed on (query hash, point id)."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def query_hash(query: str) -> str:
+        return hashlib.sha256(normalize_text(query).lower().encode("utf-8")).hexdigest()
+
+    def get(self, query_hash: str, point_id: Any) -> Optional[float]:
+        key = (query_hash, str(point_id))
+        with self._lock:
+            score = self._scores.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._scores.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def put(self, query_hash: str, point_id: Any, score: float) -> None:
+        key = (query_hash, str(point_id))
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_size:
+                self._scores.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._scores), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0}
+
+
+score_cache = RerankScoreCache(settings.RERANK_SCORE_CACHE_SIZE)
+
+
+async def _load() -> None:
+    global _model
+    _model = await asyncio.get_event_loop().run_in_executor(None, _load_rerank_model)
+
+
+def start_loading() -> None:
+    """Loads (or downloads) the model in a worker thread at startup; until then rerank() keeps the vector order."""
+    global _load_task
+    if settings.RERANK_ENABLED and _model is None and (_load_task is None or _load_task.done()):
+        _load_task = asyncio.create_task(_load())
+
+
+def _score_pool(query: str, pool: List[Candidate], to_score: List[int], scores: List[Optional[float]],
+                query_hash: str, model, start: float) -> bool:
+    """Fills scores[i] for i in to_score, in small batches. Returns False once the time budget is exceeded."""
+    budget_seconds = settings.RERANK_TIME_BUDGET_MS / 1000
+    # Small batches so the time budget is checked between them
+    for offset in range(0, len(to_score), settings.RERANK_BATCH_SIZE):
+        if time.perf_counter() - start > budget_seconds:
+            logger.warning(f"Rerank time budget ({settings.RERANK_TIME_BUDGET_MS} ms) exceeded after "
+                           f"{offset}/{len(to_score)} pairs. Keeping vector order.")
+            return False
+        batch = to_score[offset:offset + settings.RERANK_BATCH_SIZE]
+        batch_scores = model.predict([(query, pool[i][1]) for i in batch], show_progress_bar=False)
+        for i, score in zip(batch, batch_scores):
+            scores[i] = float(score)
+            score_cache.put(query_hash, pool[i][0], scores[i])
+    return True
+
+
+async def rerank(query: str, candidates: List[Candidate]) -> List[Tuple[str, float]]:
+    """
+    Reorders the top RERANK_TOP_K candidates with the cross-encoder and keeps the
+    RERANK_KEEP best as (text, score). Falls back to the vector order (same
+    number of chunks as without reranking) if the model is unavailable or the
+    time budget is exceeded.
+    """
+    vector_order = [(text, score) for _, text, score, _ in candidates]
+    model = get_rerank_model()
+    if model is None or not candidates:
+        return vector_order
+
+    start = time.perf_counter()
+    pool = candidates[:settings.RERANK_TOP_K]
+    query_hash = score_cache.query_hash(query)
+    scores: List[Optional[float]] = [score_cache.get(query_hash, point_id) for point_id, _, _, _ in pool]
+    to_score = [i for i, score in enumerate(scores) if score is None]
+
+    try:
+        # CrossEncoder.predict is CPU-bound and synchronous: scored in a worker thread
+        within_budget = await asyncio.get_event_loop().run_in_executor(
+            None, _score_pool, query, pool, to_score, scores, query_hash, model, start
+        )
+        if not within_budget:
+            return vector_order
+    except Exception as e:
+        logger.error(f"Reranking failed: {e}. Keeping vector order.", exc_info=True)
+        return vector_order
+
+    reranked = sorted(zip((text for _, text, _, _ in pool), scores), key=lambda x: x[1], reverse=True)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info(f"Reranked {len(pool)} candidates ({len(pool) - len(to_score)} cached scores) in {elapsed_ms:.0f} ms, "
+                f"keeping {min(settings.RERANK_KEEP, len(reranked))}.")
+    return reranked[:settings.RERANK_KEEP]
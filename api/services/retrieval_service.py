@@ -0,0 +1,129 @@
+# api/services/retrieval_service.py
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+from qdrant_client import AsyncQdrantClient, models as qdrant_models
+
+from ..core.config import settings
+from ..core import qdrant_collections
+
+logger = logging.getLogger(__name__)
+
+# Recherche parallèle sur plusieurs collections (catalogue, fichiers de la
+# conversation, Apache Atlas). Chaque source a son propre délai : une source
+# lente ou absente est ignorée au lieu de bloquer la réponse. Les scores de
+# chaque source sont normalisés (min-max) puis pondérés avant la fusion.
+
+Candidate = Tuple[Any, str, float, Optional[Dict[str, Any]]]  # (point id, text, score, payload)
+SourceSearch = Awaitable[List[Candidate]]
+
+CATALOG_SOURCE = "catalog"
+USER_FILES_SOURCE = "user_files"
+ATLAS_SOURCE = "atlas"
+
+# Prefix telling the LLM where a non-catalog chunk comes from
+_SOURCE_LABELS = {
+    USER_FILES_SOURCE: "Fichier téléversé",
+    ATLAS_SOURCE: "Apache Atlas",
+}
+
+
+# Normalized score of a source whose hits all have the same score (e.g. a single hit)
+_DEGENERATE_SCORE = 0.5
+
+
+def source_weight(source: str) -> float:
+    return {
+        CATALOG_SOURCE: settings.RETRIEVAL_CATALOG_WEIGHT,
+        USER_FILES_SOURCE: settings.RETRIEVAL_USER_FILES_WEIGHT,
+        ATLAS_SOURCE: settings.RETRIEVAL_ATLAS_WEIGHT,
+    }.get(source, 1.0)
+
+
+def _hits_to_candidates(hits) -> List[Candidate]:
+    return [(hit.id, hit.payload["text"], hit.score, hit.payload) for hit in hits if hit.payload and hit.payload.get("text")]
+
+
+async def search_user_files(query_embedding: List[float], qdrant_client: AsyncQdrantClient, conversation_id: str, user_id: int) -> List[Candidate]:
+    """
+    Searches the files uploaded in this conversation (tenant-partitioned collection).
+    The user_id condition keeps a caller from reading another user's files with a foreign conversation id.
+    """
+    hits = await qdrant_client.search(
+        collection_name=qdrant_collections.user_files_collection_name(),
+        query_vector=query_embedding,
+        query_filter=qdrant_models.Filter(must=[
+            qdrant_models.FieldCondition(key="conversation_id", match=qdrant_models.MatchValue(value=conversation_id)),
+            qdrant_models.FieldCondition(key="user_id", match=qdrant_models.MatchValue(value=user_id))
+        ]),
+        limit=settings.RETRIEVAL_USER_FILES_LIMIT,
+        search_params=qdrant_collections.search_params()
+    )
+    return _hits_to_candidates(hits)
+
+
+async def search_atlas(query_embedding: List[float], qdrant_client: AsyncQdrantClient) -> List[Candidate]:
+    """Searches the collection filled by apache-atlas/scripts/sync_atlas_to_qdrant.py."""
+    hits = await qdrant_client.search(
+        collection_name=settings.ATLAS_COLLECTION_NAME,
+        query_vector=query_embedding,
+        limit=settings.RETRIEVAL_ATLAS_LIMIT
+    )
+    return _hits_to_candidates(hits)
+
+
+def normalize_scores(candidates: List[Candidate], weight: float = 1.0) -> List[Candidate]:
+    """
+    Min-max normalizes the scores of one source into [0, weight].
+    A single hit (or identical scores) has no range to normalize on: it gets the
+    neutral mid value instead of 1.0, so a lone weak hit does not outrank the best
+    hits of the other sources (raw scales differ between sources).
+    """
+    if not candidates:
+        return []
+    scores = [score for _, _, score, _ in candidates]
+    low, high = min(scores), max(scores)
+    span = high - low
+    return [(point_id, text, weight * ((score - low) / span if span > 0 else _DEGENERATE_SCORE), payload)
+            for point_id, text, score, payload in candidates]
+
+
+async def _run_source(name: str, search: SourceSearch, timeout_seconds: float) -> Tuple[str, Optional[List[Candidate]]]:
+    start = time.perf_counter()
+    try:
+        candidates = await asyncio.wait_for(search, timeout=timeout_seconds)
+        logger.info(f"Retrieval source '{name}': {len(candidates)} hits in {(time.perf_counter() - start) * 1000:.0f} ms.")
+        return name, candidates
+    except asyncio.TimeoutError:
+        logger.warning(f"Retrieval source '{name}' timed out after {timeout_seconds:.1f}s. Ignoring it.")
+    except Exception as e:
+        logger.warning(f"Retrieval source '{name}' failed: {e}. Ignoring it.")
+    return name, None
+
+
+async def fan_out(sources: Dict[str, SourceSearch], limit: int, timeout_seconds: Optional[float] = None) -> Tuple[List[Candidate], List[str]]:
+    """
+    Awaits the source searches concurrently, each bounded by its own timeout, and
+    merges their normalized, weighted candidates (deduplicated by text).
+    Returns the merged candidates and the names of the sources that answered.
+    """
+    timeout_seconds = timeout_seconds or settings.RETRIEVAL_SOURCE_TIMEOUT_MS / 1000
+    results = await asyncio.gather(*(_run_source(name, search, timeout_seconds) for name, search in sources.items()))
+
+    merged: Dict[str, Candidate] = {}
+    answered = []
+    for name, candidates in results:
+        if candidates is None:
+            continue
+        answered.append(name)
+        label = _SOURCE_LABELS.get(name)
+        for point_id, text, score, payload in normalize_scores(candidates, source_weight(name)):
+            text = f"[{label}] {text}" if label else text
+            if text not in merged or merged[text][2] < score:
+                merged[text] = (point_id, text, score, payload)
+
+    ranked = sorted(merged.values(), key=lambda candidate: candidate[2], reverse=True)[:limit]
+    logger.info(f"Retrieval fan-out: {len(ranked)} merged chunks from sources {answered} (of {list(sources)}).")
+    return ranked, answered
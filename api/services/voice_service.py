@@ -443,7 +443,9 @@ class VoiceService:
                     qdrant_client=qdrant_client,
                     ollama_client=ollama_client,
                     conversation_history=None,
-                    file_context=None
+                    file_context=None,
+                    conversation_id=conversation_id,
+                    user_id=user_id  # Ownership of conversation_id checked by the router
                 )
             else:
                 # Fallback response if services not available
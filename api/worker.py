@@ -0,0 +1,67 @@
+# api/worker.py
+"""
+Catalog ingestion worker, run as its own process/container:
+
+    python -m api.worker
+
+Claims queued jobs from the ingestion_jobs table (FOR UPDATE SKIP LOCKED, so
+several workers can run side by side) and runs the read -> embed -> upsert
+pipeline outside of the API workers, so heavy uploads never compete with chat
+requests for CPU. A job whose worker stops sending heartbeats is resumed by
+another worker; already written rows are skipped by the content-hash diff.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+
+from qdrant_client import QdrantClient
+
+from .core.config import settings
+from .core.models import get_embedding_model
+from .crud import ingestion_job as crud_ingestion_job
+from .crud.db_utils import init_db
+from .services import admin_service
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_stop_requested = threading.Event()
+
+
+def _request_stop(signum, frame):
+    logger.info(f"Signal {signum} received, stopping after the current job...")
+    _stop_requested.set()
+
+
+def run_worker() -> None:
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    logger.info(f"Ingestion worker {worker_id} starting...")
+    init_db()
+
+    embedding_model = get_embedding_model()
+    if embedding_model is None:
+        raise SystemExit("Embedding model could not be loaded, ingestion worker cannot start.")
+    # Plain client: the catalog collection may not exist yet, the pipeline bootstraps it
+    qdrant_client = QdrantClient(url=settings.QDRANT_URL, timeout=settings.QDRANT_CLIENT_TIMEOUT)
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    while not _stop_requested.is_set():
+        try:
+            job_record = crud_ingestion_job.claim_next_ingestion_job(worker_id, settings.INGESTION_JOB_STALE_SECONDS)
+        except Exception as e:
+            logger.error(f"Could not poll the ingestion job table: {e}")
+            job_record = None
+        if job_record is None:
+            _stop_requested.wait(settings.INGESTION_WORKER_POLL_SECONDS)
+            continue
+        admin_service.run_ingestion_job(job_record, qdrant_client, embedding_model)
+
+    logger.info(f"Ingestion worker {worker_id} stopped.")
+
+
+if __name__ == "__main__":
+    run_worker()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'index d'autocomplétion du catalogue (api/core/suggest_index.py).
+
+Les noms du catalogue (sources, champs, termes du glossaire, flux) sont
+complétés par des noms synthétiques jusqu'à --names, puis chaque nom tiré au
+hasard est « tapé » lettre par lettre : une recherche par frappe. Affiche le
+temps de construction et la latence p50/p95/max d'une frappe.
+
+Usage (depuis la racine du dépôt) :
+    python benchmark_catalog_suggest.py [--names 100000] [--words 2000] [--excel catalogue_donnees_bancaires_modifie.xlsx]
+"""
+import argparse
+import os
+import random
+import string
+import time
+
+from api.core.suggest_index import KINDS, SuggestIndex
+
+SUGGEST_COLUMNS = {"Nom source": "source", "Libellé champ": "field", "Libellé Métier": "glossary",
+                   "Flux/Scénario SD": "flux", "Nom Flux/Procedure": "flux", "Nom Flux": "flux"}
+
+
+def catalog_entries(excel_path: str):
+    if not excel_path or not os.path.exists(excel_path):
+        print("Catalogue Excel introuvable, noms synthétiques uniquement.")
+        return []
+    import pandas as pd
+    entries = []
+    for df in pd.read_excel(excel_path, sheet_name=None).values():
+        for column, kind in SUGGEST_COLUMNS.items():
+            if column in df.columns:
+                entries += [(str(value).strip(), kind) for value in df[column].dropna()]
+    print(f"Noms du catalogue: {len(entries)}")
+    return entries
+
+
+def synthetic_entries(count: int, rng: random.Random):
+    prefixes = ["CLI", "CPT", "FLX", "PRC", "DWH", "DM", "REF", "TRS", "CRT", "AGC"]
+    return [(f"{rng.choice(prefixes)}_{''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, 8)))}_{i}",
+             rng.choice(KINDS)) for i in range(count)]
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--names", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=2000, help="Noms tapés lettre par lettre")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--excel", default="catalogue_donnees_bancaires_modifie.xlsx")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    entries = catalog_entries(args.excel)
+    entries += synthetic_entries(max(0, args.names - len(entries)), rng)
+
+    start = time.perf_counter()
+    index = SuggestIndex(entries)
+    print(f"Index: {len(index)} noms construits en {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    latencies = []
+    for _ in range(args.words):
+        name = rng.choice(index.names)
+        for length in range(1, len(name) + 1):
+            start = time.perf_counter()
+            index.suggest(name[:length], args.limit)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    print(f"Frappes : {len(latencies)}, p50 {percentile(latencies, 0.5):.3f} ms, "
+          f"p95 {percentile(latencies, 0.95):.3f} ms, max {max(latencies):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark du constructeur de chunks colonnaire (api/core/chunking.py)
+contre l'ancienne boucle df.iterrows() + row.to_dict() + f-strings.
+
+Le catalogue bancaire à 4 feuilles est répliqué jusqu'à --rows lignes au total
+(100 000 par défaut), puis les deux implémentations sont chronométrées et leurs
+sorties comparées.
+
+Usage (depuis la racine du dépôt) :
+    python benchmark_chunk_builder.py [--rows 100000] [--excel catalogue_donnees_bancaires_modifie.xlsx]
+"""
+import argparse
+import os
+import re
+import time
+
+import pandas as pd
+
+from api.core.chunking import SHEET_TEMPLATES, CATALOG_STYLE, build_chunk_payloads
+
+
+def legacy_create_text_chunk(row_dict: dict, sheet_name: str) -> str:
+    """Ancienne implémentation ligne à ligne, copiée telle quelle de admin_service.py (avant le constructeur colonnaire)."""
+    # Row is already a dict of strings here
+    text_chunk = ""
+    # Use .get(column, default_value) for robustness
+    if sheet_name == 'Référentiel Sources':
+        text_chunk = (
+            f"Source: {row_dict.get('Nom source','N/A')} ({row_dict.get('Type Source','N/A')} sur {row_dict.get('Plateforme source','N/A')}). "
+            f"Flux: {row_dict.get('Flux/Scénario SD','N/A')}. "
+            f"Domaine: {row_dict.get('Domaine','N/A')} / {row_dict.get('Sous domaine','N/A')}. "
+            f"Application source: {row_dict.get('Application Source','N/A')}. "
+            f"Cible: {row_dict.get('Plateforme cible','N/A')} ({row_dict.get('Nom cible','N/A')}). "
+            f"Chargement: {row_dict.get('Mode chargement','N/A')} ({row_dict.get('Fréquence MAJ','N/A')}) via {row_dict.get('Technologie de chargement(Outil)','N/A')} ({row_dict.get('Technologie','N/A')}). "
+            f"Procédure: {row_dict.get('Nom Flux/Procedure','N/A')}. "
+            f"Taille: {row_dict.get('Taille Objet','N/A')}. Format: {row_dict.get('Format','N/A')}. "
+            f"Description: {row_dict.get('Description','N/A')}. "
+            f"Filiale: {row_dict.get('Filiale','N/A')}."
+        )
+    elif sheet_name == 'Glossaire Métier':
+        text_chunk = (
+            f"Terme métier: {row_dict.get('Libellé Métier','N/A')}. Propriétaire: {row_dict.get('Propriétaire','N/A')}. "
+            f"Description: {row_dict.get('Description','N/A')}. Confidentialité: {row_dict.get('Confidentialité','N/A')}. "
+            f"Règle métier: {row_dict.get('Règle métier','N/A')}. "
+            f"Criticité: {row_dict.get('Criticité','N/A')}. "
+            f"Qualité adressée: {row_dict.get('Aspect de performance adressé (Qualité)','N/A')}. "
+            f"Commentaire: {row_dict.get('Commentaire','N/A')}."
+        )
+    elif sheet_name == 'Réf technique':
+        text_chunk = (
+            f"Champ technique: {row_dict.get('Libellé champ','N/A')} dans la source {row_dict.get('Nom source','N/A')} (Plateforme: {row_dict.get('Plateforme','N/A')}). "
+            f"Type: {row_dict.get('Type','N/A')}({row_dict.get('Taille','N/A')}). Obligatoire: {row_dict.get('Obligatoire','N/A')}. "
+            f"Confidentialité: {row_dict.get('Confidentialité','N/A')}. Règle métier: {row_dict.get('Règle métier','N/A')}. "
+            f"Libellé métier: {row_dict.get('Libellé Métier','N/A')}. "
+            f"Commentaire: {row_dict.get('Commentaire','N/A')}."
+        )
+    elif sheet_name == 'Référentiel Flux':
+        text_chunk = (
+            f"Traitement dans Flux: {row_dict.get('Nom Flux','N/A')}. Champ source: {row_dict.get('Nom Champ SD Source','N/A')} (de {row_dict.get('Nom SD Source','N/A')} sur {row_dict.get('Plateforme source','N/A')}). "
+            f"Règle: {row_dict.get('Règle de Gestion','N/A')}. Champ cible: {row_dict.get('Nom Champ Cible','N/A')} (vers {row_dict.get('Nom SD Cible','N/A')} sur {row_dict.get('Plateforme cible','N/A')}). "
+            f"Confidentialité: {row_dict.get('Confidentialité','N/A')}. Description traitement: {row_dict.get('Description traitement','N/A')}. "
+            f"Commentaire: {row_dict.get('Commentaire','N/A')}."
+        )
+    else:
+        chunk_parts = [f"{col}: {val}" for col, val in row_dict.items() if str(val).strip()]
+        text_chunk = ". ".join(chunk_parts)
+
+    return text_chunk.replace('\n', ' ').strip()
+
+
+def legacy_build(all_sheets_data):
+    texts_to_embed = []
+    metadata_list = []
+    for sheet_name, df in all_sheets_data.items():
+        df = df.fillna('').astype(str)
+        for index, row in df.iterrows():
+            row_dict = row.to_dict()
+            text_chunk = legacy_create_text_chunk(row_dict, sheet_name)
+            if text_chunk:
+                texts_to_embed.append(text_chunk)
+                metadata_list.append({
+                    "source_file": "benchmark.xlsx",
+                    "source_sheet": sheet_name,
+                    "original_row_index": index,
+                    "text": text_chunk,
+                    "original_data": row_dict
+                })
+    return texts_to_embed, metadata_list
+
+
+def synthetic_catalog(rows_per_sheet: int):
+    """Catalogue synthétique avec les colonnes attendues par les templates."""
+    sheets = {}
+    for sheet_name, template in SHEET_TEMPLATES.items():
+        columns = list(dict.fromkeys(re.findall(r'\{([^{}]+)\}', template)))
+        sheets[sheet_name] = pd.DataFrame({
+            column: [f"{column[:6].upper()}_{i % 997}" if i % 11 else None for i in range(rows_per_sheet)]
+            for column in columns
+        })
+    return sheets
+
+
+def scaled_catalog(excel_path: str, total_rows: int):
+    """Réplique les feuilles du catalogue réel jusqu'à total_rows lignes."""
+    if excel_path and os.path.exists(excel_path):
+        base = pd.read_excel(excel_path, sheet_name=None)
+        print(f"Catalogue de base: {excel_path} ({sum(len(df) for df in base.values())} lignes)")
+    else:
+        print("Catalogue Excel introuvable, utilisation d'un catalogue synthétique.")
+        base = synthetic_catalog(1000)
+    rows_per_sheet = max(1, total_rows // len(base))
+    scaled = {}
+    for sheet_name, df in base.items():
+        repeats = -(-rows_per_sheet // max(1, len(df)))
+        scaled[sheet_name] = pd.concat([df] * repeats, ignore_index=True).iloc[:rows_per_sheet]
+    return scaled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--excel", default="catalogue_donnees_bancaires_modifie.xlsx")
+    args = parser.parse_args()
+
+    sheets = scaled_catalog(args.excel, args.rows)
+    print(f"Lignes à traiter: {sum(len(df) for df in sheets.values())} sur {len(sheets)} feuilles")
+
+    start = time.perf_counter()
+    legacy_texts, legacy_payloads = legacy_build(sheets)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    texts, payloads = build_chunk_payloads(sheets, style=CATALOG_STYLE, base_payload={"source_file": "benchmark.xlsx"})
+    columnar_seconds = time.perf_counter() - start
+
+    identical = texts == legacy_texts and payloads == legacy_payloads
+    print(f"iterrows   : {legacy_seconds:8.2f}s ({len(legacy_texts)} chunks)")
+    print(f"colonnaire : {columnar_seconds:8.2f}s ({len(texts)} chunks)")
+    print(f"Accélération: x{legacy_seconds / max(columnar_seconds, 1e-9):.1f}")
+    print(f"Sorties identiques: {'✅' if identical else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
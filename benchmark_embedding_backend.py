@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Parité et latence des backends d'embedding (torch / onnx / onnx-int8).
+
+Pour un jeu de textes (questions typiques + lignes du catalogue Excel) :
+  - parité : similarité cosinus entre les vecteurs PyTorch FP32 (référence)
+    et ceux de chaque backend ONNX, et recouvrement du top-k des voisins ;
+  - latence : p50/p95 d'une requête unitaire (chemin de recherche du chatbot)
+    et débit en lots (chemin d'ingestion).
+
+Le script se termine avec un code 1 si la similarité cosinus minimale d'un
+backend est inférieure à --min-cosine : il sert de test de parité avant de
+changer EMBEDDING_BACKEND (voir api/core/embedding_backend.py).
+
+Usage :
+    python benchmark_embedding_backend.py [--excel catalogue_donnees_bancaires_modifie.xlsx] [--texts 500] [--min-cosine 0.98]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from api.core.embedding_backend import BACKENDS, TORCH_BACKEND, load_embedding_model  # noqa: E402
+
+QUERIES = [
+    "Quelles sont les sources de données du domaine Trésorerie ?",
+    "Quels flux alimentent le datawarehouse ?",
+    "Quelle est la règle métier du champ numéro de compte ?",
+    "Qui est le propriétaire du terme métier Client ?",
+    "Quels champs sont confidentiels dans la source Core Banking ?",
+    "Quelle est la fréquence de mise à jour des flux de crédit ?",
+    "Comment est chargé le référentiel des agences ?",
+    "Où trouver la date d'ouverture du compte ?",
+]
+
+
+def load_texts(excel_path: str, count: int):
+    texts = list(QUERIES)
+    if excel_path and os.path.exists(excel_path):
+        import pandas as pd
+        from api.core.chunking import build_chunk_payloads
+        sheets = pd.read_excel(excel_path, sheet_name=None)
+        catalog_texts, _ = build_chunk_payloads(sheets)
+        texts.extend(catalog_texts)
+    else:
+        print(f"Fichier '{excel_path}' introuvable, textes synthétiques utilisés.")
+        texts.extend(f"Source: SRC_{i} | Libellé champ: champ numéro {i} | Domaine: Crédit" for i in range(count))
+    return texts[:count]
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+
+
+def topk_overlap(reference: np.ndarray, candidate: np.ndarray, queries: int, k: int) -> float:
+    """Recouvrement moyen du top-k des voisins des requêtes dans le corpus."""
+    ref, cand = normalize(reference), normalize(candidate)
+    overlaps = []
+    for i in range(queries):
+        ref_top = set(np.argsort(-ref[queries:] @ ref[i])[:k])
+        cand_top = set(np.argsort(-cand[queries:] @ cand[i])[:k])
+        overlaps.append(len(ref_top & cand_top) / k)
+    return statistics.mean(overlaps)
+
+
+def measure(model, texts, single_runs: int, batch_size: int):
+    model.encode(texts[:8], show_progress_bar=False)  # Warm-up
+    latencies = []
+    for i in range(single_runs):
+        start = time.perf_counter()
+        model.encode(QUERIES[i % len(QUERIES)], show_progress_bar=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    vectors = np.asarray(model.encode(texts, batch_size=batch_size, show_progress_bar=False), dtype=np.float32)
+    throughput = len(texts) / (time.perf_counter() - start)
+    return vectors, latencies, throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="paraphrase-multilingual-MiniLM-L12-v2")
+    parser.add_argument("--excel", default="catalogue_donnees_bancaires_modifie.xlsx")
+    parser.add_argument("--texts", type=int, default=500)
+    parser.add_argument("--single-runs", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--quantization", default="avx2", help="avx2 / avx512 / avx512_vnni / arm64")
+    parser.add_argument("--export-dir", default=os.path.join("api", "onnx_models"))
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+
+    texts = load_texts(args.excel, args.texts)
+    print(f"{len(texts)} textes, modèle '{args.model}'.\n")
+
+    reference = None
+    failures = []
+    print(f"{'backend':<10} {'cos min':>8} {'cos moy':>8} {'top-k':>6} {'p50 ms':>8} {'p95 ms':>8} {'textes/s':>9}")
+    for backend in BACKENDS:
+        model = load_embedding_model(args.model, backend, args.quantization, args.export_dir)
+        vectors, latencies, throughput = measure(model, texts, args.single_runs, args.batch_size)
+        if backend == TORCH_BACKEND:
+            reference = vectors
+        cosines = np.sum(normalize(vectors) * normalize(reference), axis=1)
+        overlap = topk_overlap(reference, vectors, len(QUERIES), min(args.k, len(texts) - len(QUERIES)))
+        print(f"{backend:<10} {cosines.min():>8.4f} {cosines.mean():>8.4f} {overlap:>6.2f} "
+              f"{percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.95):>8.2f} {throughput:>9.1f}")
+        if cosines.min() < args.min_cosine:
+            failures.append(backend)
+
+    if failures:
+        print(f"\n❌ Parité insuffisante (cosinus < {args.min_cosine}) : {', '.join(failures)}")
+        sys.exit(1)
+    print(f"\n✅ Tous les backends sont à parité (cosinus ≥ {args.min_cosine}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Latence de la boucle d'événements sous charge mixte : client Qdrant
+synchrone (avant) contre AsyncQdrantClient (après).
+
+Simule dans une seule boucle asyncio, comme dans un worker uvicorn :
+  - N « utilisateurs » qui enchaînent des recherches vectorielles (et un
+    scroll de type /statistics de temps en temps),
+  - une sonde qui se réveille toutes les 10 ms et mesure son retard : c'est la
+    latence ajoutée à toute autre requête (login, historique, streaming...).
+
+Mode « sync » : les recherches appellent QdrantClient directement dans la
+coroutine (comportement des handlers avant la migration).
+Mode « async » : les recherches attendent AsyncQdrantClient (pool de connexions).
+
+Usage (Qdrant et le catalogue doivent être disponibles) :
+    python benchmark_event_loop.py [--qdrant-url http://localhost:6333] [--users 20] [--duration 15] [--grpc]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+PROBE_INTERVAL = 0.01  # 10 ms
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def probe(lags, stop: asyncio.Event):
+    """Retard de réveil de la sonde = temps pendant lequel la boucle était bloquée."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+
+async def user_sync(client: QdrantClient, collection, vectors, latencies, stop, rng):
+    while not stop.is_set():
+        start = time.perf_counter()
+        if rng.random() < 0.05:
+            client.scroll(collection_name=collection, limit=1000, with_payload=True, with_vectors=False)
+        else:
+            client.search(collection_name=collection, query_vector=rng.choice(vectors), limit=18)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0)  # Le handler rend la main entre deux étapes
+
+
+async def user_async(client: AsyncQdrantClient, collection, vectors, latencies, stop, rng):
+    while not stop.is_set():
+        start = time.perf_counter()
+        if rng.random() < 0.05:
+            await client.scroll(collection_name=collection, limit=1000, with_payload=True, with_vectors=False)
+        else:
+            await client.search(collection_name=collection, query_vector=rng.choice(vectors), limit=18)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run(mode: str, args, vectors):
+    stop = asyncio.Event()
+    lags, latencies = [], []
+    if mode == "sync":
+        client = QdrantClient(url=args.qdrant_url, timeout=60, prefer_grpc=args.grpc)
+        users = [user_sync(client, args.collection, vectors, latencies, stop, random.Random(i)) for i in range(args.users)]
+    else:
+        client = AsyncQdrantClient(url=args.qdrant_url, timeout=60, prefer_grpc=args.grpc)
+        users = [user_async(client, args.collection, vectors, latencies, stop, random.Random(i)) for i in range(args.users)]
+
+    tasks = [asyncio.create_task(probe(lags, stop))] + [asyncio.create_task(user) for user in users]
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    if mode == "async":
+        await client.close()
+    else:
+        client.close()
+
+    print(f"{mode:<6} {len(latencies) / args.duration:>9.1f} "
+          f"{percentile(latencies, 0.5):>9.1f} {percentile(latencies, 0.95):>9.1f} "
+          f"{percentile(lags, 0.5):>9.1f} {percentile(lags, 0.95):>9.1f} {max(lags, default=0):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--qdrant-url", default="http://localhost:6333")
+    parser.add_argument("--collection", default="banque_ma_data_catalog")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--grpc", action="store_true", help="Utiliser gRPC (port 6334)")
+    args = parser.parse_args()
+
+    # Vecteurs de requête réels : échantillon de points du catalogue
+    client = QdrantClient(url=args.qdrant_url, timeout=60)
+    points, _ = client.scroll(collection_name=args.collection, limit=200, with_payload=False, with_vectors=True)
+    client.close()
+    if not points:
+        print(f"Collection '{args.collection}' vide ou introuvable.")
+        return
+    vectors = [list(point.vector) for point in points]
+    print(f"{args.users} utilisateurs concurrents pendant {args.duration:g}s, {len(vectors)} vecteurs de requête.\n")
+
+    print(f"{'mode':<6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'lag p50':>9} {'lag p95':>9} {'lag max':>9}")
+    for mode in ("sync", "async"):
+        asyncio.run(run(mode, args, vectors))
+    print("\nlag = retard de la boucle d'événements (ms) subi par toute autre requête.")
+
+
+if __name__ == "__main__":
+    main()
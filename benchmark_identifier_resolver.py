@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'index trigramme des identifiants (api/core/identifier_index.py).
+
+Les identifiants du catalogue (noms de sources, de champs et de flux) sont
+complétés par des identifiants synthétiques jusqu'à --identifiers, puis des
+mentions altérées (lettre supprimée, doublée ou remplacée, underscore remplacé
+par un espace, comme les transcriptions Whisper) sont résolues. Affiche le
+temps de construction, la latence p50/p95 d'une recherche et le taux de
+résolution vers l'identifiant d'origine.
+
+Usage (depuis la racine du dépôt) :
+    python benchmark_identifier_resolver.py [--identifiers 50000] [--queries 2000] [--excel catalogue_donnees_bancaires_modifie.xlsx]
+"""
+import argparse
+import os
+import random
+import string
+import time
+
+from api.core.identifier_index import IdentifierIndex, looks_like_identifier
+
+IDENTIFIER_COLUMNS = ["Nom source", "Libellé champ", "Flux/Scénario SD", "Nom Flux/Procedure", "Nom cible",
+                      "Nom Flux", "Nom SD Source", "Nom Champ SD Source", "Nom SD Cible", "Nom Champ Cible"]
+
+
+def catalog_identifiers(excel_path: str):
+    if not excel_path or not os.path.exists(excel_path):
+        print("Catalogue Excel introuvable, identifiants synthétiques uniquement.")
+        return []
+    import pandas as pd
+    identifiers = set()
+    for df in pd.read_excel(excel_path, sheet_name=None).values():
+        for column in IDENTIFIER_COLUMNS:
+            if column in df.columns:
+                identifiers.update(str(value).strip() for value in df[column].dropna())
+    identifiers = sorted(identifier for identifier in identifiers if looks_like_identifier(identifier))
+    print(f"Identifiants du catalogue: {len(identifiers)}")
+    return identifiers
+
+
+def synthetic_identifiers(count: int, rng: random.Random):
+    prefixes = ["CLI", "CPT", "FLX", "PRC", "DWH", "DM", "REF", "TRS", "CRT", "AGC"]
+    return [f"{rng.choice(prefixes)}_{''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, 8)))}_{i}"
+            for i in range(count)]
+
+
+def mangle(identifier: str, rng: random.Random) -> str:
+    """Altération de type faute de frappe / transcription."""
+    chars = list(identifier.replace("_", " ") if rng.random() < 0.5 else identifier)
+    position = rng.randrange(len(chars))
+    operation = rng.choice(["delete", "double", "replace"])
+    if operation == "delete" and len(chars) > 4:
+        del chars[position]
+    elif operation == "double":
+        chars.insert(position, chars[position])
+    else:
+        chars[position] = rng.choice(string.ascii_uppercase)
+    return "".join(chars).lower() if rng.random() < 0.5 else "".join(chars)
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--identifiers", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--min-similarity", type=float, default=0.6)
+    parser.add_argument("--excel", default="catalogue_donnees_bancaires_modifie.xlsx")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    identifiers = catalog_identifiers(args.excel)
+    identifiers += synthetic_identifiers(max(0, args.identifiers - len(identifiers)), rng)
+
+    start = time.perf_counter()
+    index = IdentifierIndex(identifiers)
+    print(f"Index: {len(index)} identifiants construits en {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    latencies, resolved = [], 0
+    for _ in range(args.queries):
+        identifier = rng.choice(index.canonical)
+        mention = mangle(identifier, rng)
+        start = time.perf_counter()
+        match = index.best_match(mention, args.min_similarity)
+        latencies.append((time.perf_counter() - start) * 1000)
+        resolved += bool(match and match[0] == identifier)
+
+    print(f"Recherche : p50 {percentile(latencies, 0.5):.3f} ms, p95 {percentile(latencies, 0.95):.3f} ms, "
+          f"max {max(latencies):.3f} ms")
+    print(f"Mentions altérées résolues vers l'identifiant d'origine : {resolved}/{args.queries} "
+          f"({100 * resolved / args.queries:.1f} %)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Benchmark rappel/latence de la quantification Qdrant pour le catalogue.
+
+Copie les vecteurs de la collection du catalogue dans des collections
+temporaires (sans quantification, scalar int8, binary), puis compare pour un
+jeu de requêtes réalistes :
+  - le rappel@k par rapport à une recherche exacte (float32, sans index),
+  - la latence p50/p95 par requête,
+  - la taille estimée des vecteurs en RAM,
+pour plusieurs réglages de recherche (rescoring, oversampling).
+
+Le résultat sert à choisir QDRANT_QUANTIZATION / QDRANT_SEARCH_OVERSAMPLING /
+QDRANT_SEARCH_RESCORE (voir api/core/config.py).
+
+Usage (Qdrant et le catalogue doivent être disponibles) :
+    python benchmark_quantization.py [--qdrant-url http://localhost:6333] [--collection banque_ma_data_catalog] [--k 10]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from qdrant_client import QdrantClient, models
+from sentence_transformers import SentenceTransformer
+
+# Questions typiques posées au chatbot
+BASE_QUERIES = [
+    "Quelles sont les sources de données du domaine Trésorerie ?",
+    "Quels flux alimentent le datawarehouse ?",
+    "Quelle est la règle métier du champ numéro de compte ?",
+    "Qui est le propriétaire du terme métier Client ?",
+    "Quels champs sont confidentiels dans la source Core Banking ?",
+    "Quelle est la fréquence de mise à jour des flux de crédit ?",
+    "Quels sont les champs obligatoires de la table des comptes ?",
+    "Comment est chargé le référentiel des agences ?",
+    "Quelles données concernent la filiale BankMA Leasing ?",
+    "Quel est le format du fichier des transactions ?",
+    "Quels termes métier ont une criticité élevée ?",
+    "Quelle technologie de chargement est utilisée pour les flux quotidiens ?",
+    "Où trouver la date d'ouverture du compte ?",
+    "Quels traitements sont appliqués au champ montant ?",
+    "Liste des sources sur la plateforme Oracle",
+]
+
+# Modèles de questions générées à partir des lignes du catalogue
+FIELD_QUERY_TEMPLATES = {
+    "Libellé Métier": "Que signifie le terme métier {} ?",
+    "Nom source": "Quelles informations contient la source {} ?",
+    "Libellé champ": "Quelle est la définition du champ {} ?",
+    "Nom Flux": "Que fait le flux {} ?",
+}
+
+MODES = ["none", "scalar", "binary"]
+
+
+def quantization_config(mode: str):
+    if mode == "scalar":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=0.99, always_ram=True))
+    if mode == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def vector_bytes(mode: str, count: int, dim: int) -> int:
+    """Taille en RAM des vecteurs utilisés pour la recherche (hors index HNSW)."""
+    if mode == "scalar":
+        return count * dim
+    if mode == "binary":
+        return count * dim // 8
+    return count * dim * 4
+
+
+def load_points(client: QdrantClient, collection: str):
+    points, offset = [], None
+    while True:
+        batch, offset = client.scroll(collection_name=collection, limit=1024, offset=offset,
+                                      with_payload=True, with_vectors=True)
+        points.extend(batch)
+        if offset is None:
+            return points
+
+
+def build_queries(points, count: int, seed: int):
+    rng = random.Random(seed)
+    queries = list(BASE_QUERIES)
+    candidates = []
+    for point in points:
+        original = (point.payload or {}).get("original_data") or {}
+        for field, template in FIELD_QUERY_TEMPLATES.items():
+            value = str(original.get(field, "")).strip()
+            if value:
+                candidates.append(template.format(value))
+    candidates = sorted(set(candidates))
+    rng.shuffle(candidates)
+    queries.extend(candidates[:max(0, count - len(queries))])
+    return queries[:count]
+
+
+def create_copy(client: QdrantClient, name: str, mode: str, dim: int, points) -> None:
+    if client.collection_exists(collection_name=name):
+        client.delete_collection(collection_name=name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE),
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=1),  # Force the HNSW index as in production
+        quantization_config=quantization_config(mode),
+    )
+    for i in range(0, len(points), 256):
+        client.upsert(collection_name=name, wait=True, points=[
+            models.PointStruct(id=p.id, vector=p.vector, payload={}) for p in points[i:i + 256]
+        ])
+    # Attendre la fin de l'indexation
+    for _ in range(600):
+        info = client.get_collection(collection_name=name)
+        if info.status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(0.5)
+    print(f"  ⚠️ indexation de {name} non terminée, résultats indicatifs")
+
+
+def run_queries(client, collection, query_vectors, k, search_params):
+    results, latencies = [], []
+    for vector in query_vectors:
+        start = time.perf_counter()
+        hits = client.search(collection_name=collection, query_vector=vector, limit=k, search_params=search_params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([hit.id for hit in hits])
+    return results, latencies
+
+
+def recall_at_k(results, ground_truth) -> float:
+    scores = [len(set(r) & set(g)) / max(1, len(g)) for r, g in zip(results, ground_truth)]
+    return statistics.mean(scores) if scores else 0.0
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--qdrant-url", default="http://localhost:6333")
+    parser.add_argument("--collection", default="banque_ma_data_catalog")
+    parser.add_argument("--model", default="paraphrase-multilingual-MiniLM-L12-v2")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Conserver les collections temporaires")
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.qdrant_url, timeout=120)
+    points = load_points(client, args.collection)
+    if not points:
+        print(f"Collection '{args.collection}' vide ou introuvable.")
+        return
+    dim = len(points[0].vector)
+    print(f"{len(points)} vecteurs ({dim} dimensions) chargés depuis '{args.collection}'.")
+
+    queries = build_queries(points, args.queries, args.seed)
+    model = SentenceTransformer(args.model)
+    query_vectors = [v.tolist() for v in model.encode(queries, show_progress_bar=False)]
+    print(f"{len(queries)} requêtes, rappel@{args.k} mesuré contre une recherche exacte.\n")
+
+    names = {mode: f"{args.collection}_bench_{mode}" for mode in MODES}
+    try:
+        for mode in MODES:
+            print(f"Création de {names[mode]}...")
+            create_copy(client, names[mode], mode, dim, points)
+
+        ground_truth, _ = run_queries(client, names["none"], query_vectors, args.k, models.SearchParams(exact=True))
+        run_queries(client, names["none"], query_vectors[:5], args.k, None)  # Warm-up
+
+        variants = [("none", "hnsw float32", None)]
+        for mode in ("scalar", "binary"):
+            variants.append((mode, "sans rescoring", models.SearchParams(
+                quantization=models.QuantizationSearchParams(rescore=False))))
+            for oversampling in (1.0, 2.0, 3.0):
+                variants.append((mode, f"rescoring x{oversampling:g}", models.SearchParams(
+                    quantization=models.QuantizationSearchParams(rescore=True, oversampling=oversampling))))
+
+        print(f"\n{'mode':<8} {'recherche':<18} {'rappel@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'RAM vecteurs':>13}")
+        for mode, label, params in variants:
+            results, latencies = run_queries(client, names[mode], query_vectors, args.k, params)
+            ram_mb = vector_bytes(mode, len(points), dim) / (1024 * 1024)
+            print(f"{mode:<8} {label:<18} {recall_at_k(results, ground_truth):>9.3f} "
+                  f"{percentile(latencies, 0.5):>8.2f} {percentile(latencies, 0.95):>8.2f} {ram_mb:>10.1f} MB")
+    finally:
+        if not args.keep:
+            for name in names.values():
+                if client.collection_exists(collection_name=name):
+                    client.delete_collection(collection_name=name)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,10 @@ excel_path = "catalogue_donnees_bancaires_modifie.xlsx"
 from sentence_transformers import SentenceTransformer
 from qdrant_client import QdrantClient, models
 import openpyxl # pandas needs this to read xlsx
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")) # Repository root, for api.core
+from api.core.embedding_cache import EmbeddingCache, encode_with_cache
 
 # --- Configuration ---
 # Qdrant Configuration
@@ -39,6 +43,10 @@ print(f"Loading embedding model: {embedding_model_name}...")
 model = SentenceTransformer(embedding_model_name)
 print("Model loaded.")
 
+# Embedding cache shared with the other ingestion paths
+embedding_cache_dir = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api", "embedding_cache"))
+embedding_cache = EmbeddingCache(embedding_cache_dir, embedding_model_name, model.get_sentence_embedding_dimension())
+
 # --- Step 1: Read Data from Excel ---
 print(f"Reading data from Excel file: {excel_path}...")
 try:
@@ -120,8 +128,8 @@ print(f"Prepared {len(texts_to_embed)} text chunks for embedding.")
 # --- Step 3: Generate Embeddings ---
 if texts_to_embed:
     print("Generating embeddings (this may take a while)...")
-    embeddings = model.encode(texts_to_embed, show_progress_bar=True)
-    print(f"Generated {len(embeddings)} embeddings.")
+    embeddings = encode_with_cache(model, texts_to_embed, embedding_cache, show_progress_bar=True)
+    print(f"Generated {len(embeddings)} embeddings ({embedding_cache.hits} from cache).")
 
     # --- Step 4 & 5: Setup Qdrant Collection ---
     vector_size = model.get_sentence_embedding_dimension()
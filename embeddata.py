@@ -1,6 +1,5 @@
 import pandas as pd
 import random
-import uuid # To generate unique IDs for Qdrant points
 
 # --- Your existing data generation code ---
 # (Keep your code from 'import pandas as pd' down to 
@@ -14,6 +13,11 @@ excel_path = "catalogue_donnees_bancaires_modifie.xlsx"
 from sentence_transformers import SentenceTransformer
 from qdrant_client import QdrantClient, models
 import openpyxl # pandas needs this to read xlsx
+from api.core.chunking import build_chunk_payloads, catalog_point_id, CATALOG_STYLE # Run from the repository root
+from api.core.embedding_cache import EmbeddingCache, encode_with_cache
+from api.core.config import settings
+from api.core import qdrant_collections # No api.services import: that package loads the whole API
+import os
 
 # --- Configuration ---
 # Qdrant Configuration
@@ -28,7 +32,7 @@ client = QdrantClient(url=qdrant_url)
 # qdrant_path = "./qdrant_data"
 # client = QdrantClient(path=qdrant_path)
 
-qdrant_collection_name = "banque_ma_data_catalog"
+qdrant_collection_name = settings.QDRANT_COLLECTION_NAME # Same collection (and settings) as the API
 
 # Embedding Model Configuration
 # Using a multilingual model as your data is in French.
@@ -39,6 +43,11 @@ print(f"Loading embedding model: {embedding_model_name}...")
 model = SentenceTransformer(embedding_model_name)
 print("Model loaded.")
 
+# Embedding cache shared with the API and the ingestion worker (./api is mounted in their containers)
+embedding_cache_dir = os.getenv("EMBEDDING_CACHE_DIR", os.path.join("api", "embedding_cache"))
+embedding_cache = EmbeddingCache(embedding_cache_dir, embedding_model_name, model.get_sentence_embedding_dimension())
+print(f"Embedding cache: {embedding_cache_dir} ({len(embedding_cache)} vectors)")
+
 # --- Step 1: Read Data from Excel ---
 print(f"Reading data from Excel file: {excel_path}...")
 try:
@@ -54,74 +63,20 @@ except Exception as e:
 
 # --- Step 2: Prepare Text Chunks and Metadata ---
 points_to_upsert = []
-texts_to_embed = []
-metadata_list = []
 
 print("Preparing data for embedding...")
-# Process each sheet
-for sheet_name, df in all_sheets_data.items():
-    print(f"Processing sheet: {sheet_name} ({len(df)} rows)")
-    # Convert NaN to empty strings for safer text processing
-    df = df.fillna('')
-    
-    for index, row in df.iterrows():
-        text_chunk = ""
-        # Create a meaningful text representation for each row based on the sheet
-        if sheet_name == 'Référentiel Sources':
-            text_chunk = (
-                f"Source: {row['Nom source']} ({row['Type Source']} sur {row['Plateforme source']}). "
-                f"Flux: {row['Flux/Scénario SD']}. Domaine: {row['Domaine']} / {row['Sous domaine']}. "
-                f"Application source: {row['Application Source']}. "
-                f"Cible: {row['Plateforme cible']} ({row['Nom cible']}). "
-                f"Chargement: {row['Mode chargement']} ({row['Fréquence MAJ']}) via {row['Technologie de chargement(Outil)']} ({row['Technologie']}). "
-                f"Procédure: {row['Nom Flux/Procedure']}. Taille: {row['Taille Objet']}. Format: {row['Format']}. "
-                f"Description: {row['Description']}. Filiale: {row['Filiale']}."
-            )
-        elif sheet_name == 'Glossaire Métier':
-            text_chunk = (
-                f"Terme métier: {row['Libellé Métier']}. Propriétaire: {row['Propriétaire']}. "
-                f"Description: {row['Description']}. Confidentialité: {row['Confidentialité']}. "
-                f"Règle métier: {row['Règle métier']}. Criticité: {row['Criticité']}. "
-                f"Qualité adressée: {row['Aspect de performance adressé (Qualité)']}. "
-                f"Commentaire: {row['Commentaire']}."
-            )
-        elif sheet_name == 'Réf technique':
-            text_chunk = (
-                f"Champ technique: {row['Libellé champ']} dans la source {row['Nom source']} (Plateforme: {row['Plateforme']}). "
-                f"Type: {row['Type']}({row['Taille']}). Obligatoire: {row['Obligatoire']}. "
-                f"Confidentialité: {row['Confidentialité']}. Règle métier: {row['Règle métier']}. "
-                f"Libellé métier: {row['Libellé Métier']}. Commentaire: {row['Commentaire']}."
-            )
-        elif sheet_name == 'Référentiel Flux':
-            text_chunk = (
-                f"Traitement dans Flux: {row['Nom Flux']}. Champ source: {row['Nom Champ SD Source']} (de {row['Nom SD Source']} sur {row['Plateforme source']}). "
-                f"Règle: {row['Règle de Gestion']}. Champ cible: {row['Nom Champ Cible']} (vers {row['Nom SD Cible']} sur {row['Plateforme cible']}). "
-                f"Confidentialité: {row['Confidentialité']}. Description traitement: {row['Description traitement']}. "
-                 f"Commentaire: {row['Commentaire']}."
-            )
-        else:
-            # Fallback for unexpected sheets: just join columns
-            text_chunk = ". ".join([f"{col}: {val}" for col, val in row.items() if val])
-
-        if text_chunk: # Only add if we have text
-            texts_to_embed.append(text_chunk)
-            # Store useful metadata
-            metadata = {
-                "source_sheet": sheet_name,
-                "original_row_index": index,
-                "text": text_chunk, # Store the text itself for easy retrieval
-                # Add all original columns from the row for full context
-                "original_data": row.to_dict() 
-            }
-            metadata_list.append(metadata)
+# Texts and payloads (source_sheet, original_row_index, text, original_data) are
+# built column-wise with the same templates as the API (api/core/chunking.py).
+# row_identity adds row_key + content_hash so later admin uploads only re-embed changed rows.
+texts_to_embed, metadata_list = build_chunk_payloads(all_sheets_data, style=CATALOG_STYLE, row_identity=True)
 
 print(f"Prepared {len(texts_to_embed)} text chunks for embedding.")
 
 # --- Step 3: Generate Embeddings ---
 if texts_to_embed:
     print("Generating embeddings (this may take a while)...")
-    embeddings = model.encode(texts_to_embed, show_progress_bar=True)
-    print(f"Generated {len(embeddings)} embeddings.")
+    embeddings = encode_with_cache(model, texts_to_embed, embedding_cache, show_progress_bar=True)
+    print(f"Generated {len(embeddings)} embeddings ({embedding_cache.hits} from cache).")
 
     # --- Step 4 & 5: Setup Qdrant Collection ---
     vector_size = model.get_sentence_embedding_dimension()
@@ -129,11 +84,11 @@ if texts_to_embed:
     print(f"Checking/Creating Qdrant collection: {qdrant_collection_name}...")
 
     try:
-        client.recreate_collection(
-            collection_name=qdrant_collection_name,
-            vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE)
-            # You can add hnsw_config or quantization_config here for optimization if needed
-        )
+        # Full reload: drop the previous collection, then create it exactly like the API
+        # does (HNSW/optimizer parameters, QDRANT_QUANTIZATION, payload indexes)
+        if client.collection_exists(collection_name=qdrant_collection_name):
+            client.delete_collection(collection_name=qdrant_collection_name)
+        qdrant_collections.ensure_catalog_collection(client, vector_size)
         print(f"Collection '{qdrant_collection_name}' created/recreated successfully.")
     except Exception as e:
         print(f"Error interacting with Qdrant collection: {e}")
@@ -157,7 +112,7 @@ if texts_to_embed:
     for i in range(len(embeddings)):
         points_to_upsert.append(
             models.PointStruct(
-                id=str(uuid.uuid4()), # Generate a unique UUID for each point
+                id=catalog_point_id(metadata_list[i]["source_sheet"], metadata_list[i]["row_key"]), # Same id as the admin upload for this row
                 vector=embeddings[i].tolist(), # Convert numpy array to list
                 payload=metadata_list[i]
             )
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires de l'index structuré du catalogue (api/services/catalog_lookup.py) :
+réponses de consultation sans RAG, questions ouvertes laissées au RAG, et
+reconstruction de l'index à la fin d'un job d'ingestion.
+
+Usage (depuis la racine du dépôt, dépendances de l'API installées) :
+    python -m pytest -q test_catalog_lookup.py
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("qdrant_client")
+pytest.importorskip("sentence_transformers")
+
+from api.services import catalog_lookup  # noqa: E402
+from api.services.catalog_lookup import SOURCES_SHEET, TECHNICAL_SHEET, CatalogIndex  # noqa: E402
+
+
+def _field(source, field, field_type, size, confidentiality="C1"):
+    return {"Nom source": source, "Libellé champ": field, "Type": field_type, "Taille": size,
+            "Obligatoire": "Oui", "Confidentialité": confidentiality, "Libellé Métier": "", "Plateforme": "DWH"}
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = CatalogIndex()
+    index.add_row(TECHNICAL_SHEET, _field("CLIENT_QT", "RIB", "VARCHAR", "24", "C3"))
+    index.add_row(TECHNICAL_SHEET, _field("CLIENT_QT", "DATE_NAISSANCE", "DATE", "8"))
+    index.add_row(TECHNICAL_SHEET, _field("COMPTES", "RIB", "CHAR", "24"))
+    index.add_row(TECHNICAL_SHEET, _field("COMPTES", "TYPE", "VARCHAR", "2"))
+    index.add_row(SOURCES_SHEET, {"Nom source": "CARTES", "Flux/Scénario SD": "FLX_CARTES_01",
+                                  "Nom Flux/Procedure": "PRC_CARTES", "Fréquence MAJ": "Quotidienne",
+                                  "Plateforme cible": "DWH", "Nom cible": "DWH_CARTES", "Filiale": float("nan")})
+    index.add_row(SOURCES_SHEET, {"Nom source": "CLIENT_QT", "Nom Flux/Procedure": "PRC_CLIENT_QT", "Format": "CSV"})
+    index.finalize()
+    monkeypatch.setattr(catalog_lookup, "_index", index)
+    monkeypatch.setattr(catalog_lookup.settings, "CATALOG_LOOKUP_ENABLED", True)
+    return index
+
+
+def test_columns_of_a_source(index):
+    result = catalog_lookup.answer("Quels sont les types des colonnes de CLIENT_QT ?")
+    assert "Champs de la source **CLIENT_QT** (2)" in result
+    assert "| RIB | VARCHAR | 24 |" in result and "COMPTES" not in result
+
+
+def test_attribute_of_a_field_is_restricted_to_the_named_source(index):
+    result = catalog_lookup.answer("Quelle est la confidentialité du champ RIB de CLIENT_QT ?")
+    assert "| RIB | CLIENT_QT | C3 |" in result and "COMPTES" not in result
+    both = catalog_lookup.answer("Quel est le type du champ RIB ?")
+    assert "CLIENT_QT" in both and "COMPTES" in both
+
+
+def test_format_of_a_field_is_not_the_flow_format(index):
+    result = catalog_lookup.answer("Quel est le format du champ RIB de CLIENT_QT ?")
+    assert "| RIB | CLIENT_QT | VARCHAR | 24 |" in result and "CSV" not in result
+    assert "| PRC_CLIENT_QT | CLIENT_QT | CSV |" in catalog_lookup.answer("Quel est le format de CLIENT_QT ?")
+
+
+def test_flow_attributes_by_flux_or_procedure_name(index):
+    assert "| PRC_CARTES | CARTES | Quotidienne |" in catalog_lookup.answer("Fréquence de mise à jour du flux FLX_CARTES_01 ?")
+    assert "DWH_CARTES" in catalog_lookup.answer("Quelle est la cible de prc_cartes ?")
+
+
+def test_question_words_are_never_taken_for_identifiers(index):
+    # Un champ nommé TYPE ne transforme pas « type » en mention de champ
+    assert catalog_lookup.answer("Quel est le type de la source inconnue ?") is None
+
+
+def test_open_or_unknown_questions_go_to_the_rag(index):
+    assert catalog_lookup.answer("Pourquoi le type du champ RIB de CLIENT_QT est VARCHAR ?") is None
+    assert catalog_lookup.answer("Bonjour") is None
+
+
+def test_no_answer_before_the_first_build(monkeypatch):
+    monkeypatch.setattr(catalog_lookup, "_index", CatalogIndex())
+    assert catalog_lookup.answer("Types des colonnes de CLIENT_QT") is None
+
+
+def test_suggestions_and_identifiers_are_published(index):
+    assert ("FLX_CARTES_01", "flux") in index.suggestions() and ("RIB", "field") in index.suggestions()
+    assert "DWH_CARTES" in index.identifiers()
+
+
+def test_refresh_loop_rebuilds_when_an_ingestion_completes(monkeypatch):
+    markers = iter([None, None, "job-1", "job-1", "job-1"])
+    builds = []
+
+    async def marker():
+        return next(markers, "job-1")
+
+    async def refresh_fn(client):
+        builds.append(client)
+
+    async def get_client():
+        return "client"
+
+    monkeypatch.setattr(catalog_lookup, "last_ingestion_marker", marker)
+
+    async def scenario():
+        loop = asyncio.create_task(catalog_lookup.run_refresh_loop(
+            "test", refresh_fn, get_client, interval_seconds=3600, poll_seconds=0.001, retry_seconds=0.001
+        ))
+        await asyncio.sleep(0.05)
+        loop.cancel()
+
+    asyncio.run(scenario())
+    # Une construction au démarrage, puis une seule après la fin du job
+    assert len(builds) == 2
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires des disjoncteurs des dépendances externes
+(api/core/dependency_registry.py) : seuil d'échecs, ouverture forcée,
+essai unique en demi-ouverture et fermeture après un essai réussi.
+
+Usage (depuis la racine du dépôt) :
+    python -m pytest -q test_circuit_breaker.py
+"""
+import asyncio
+import time
+
+from api.core.dependency_registry import (
+    CircuitBreaker,
+    CircuitState,
+    DependencyRegistry,
+    ManagedDependency,
+)
+
+
+def test_breaker_opens_after_the_failure_threshold():
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure("refused")
+    breaker.record_failure("refused")
+    assert breaker.state == CircuitState.CLOSED
+    breaker.record_failure("refused")
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_trial()
+
+
+def test_open_breaker_allows_one_trial_then_closes_on_success():
+    breaker = CircuitBreaker(failure_threshold=1, base_backoff=0.0)
+    breaker.record_failure("refused")
+    assert breaker.state == CircuitState.OPEN
+    breaker.retry_at = time.monotonic() - 1
+    assert breaker.allow_trial()
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert not breaker.allow_trial()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED and breaker.consecutive_failures == 0
+
+
+def test_failed_trial_reopens_with_a_longer_backoff():
+    breaker = CircuitBreaker(failure_threshold=1, base_backoff=10.0, max_backoff=60.0)
+    breaker.record_failure("refused")
+    first_delay = breaker.seconds_until_retry()
+    breaker.state = CircuitState.HALF_OPEN
+    breaker.record_failure("refused again")
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.seconds_until_retry() > first_delay
+
+
+def _registry_with_live_dependency():
+    async def connect():
+        return object()
+
+    async def probe(instance):
+        return None
+
+    registry = DependencyRegistry()
+    registry.register(ManagedDependency("ollama", connect, probe, CircuitBreaker(failure_threshold=3)))
+    assert asyncio.run(registry.get("ollama")) is not None
+    return registry
+
+
+def test_reported_failure_counts_toward_the_threshold():
+    registry = _registry_with_live_dependency()
+    registry.report_failure("ollama", TimeoutError("slow"))
+    assert registry["ollama"].breaker.state == CircuitState.CLOSED
+
+
+def test_refused_connection_opens_the_circuit_at_once():
+    registry = _registry_with_live_dependency()
+    registry.report_failure("ollama", ConnectionRefusedError("refused"), force_open=True)
+    assert registry["ollama"].breaker.state == CircuitState.OPEN
+    # Les requêtes suivantes échouent vite au lieu de retenter la connexion
+    assert asyncio.run(registry.get("ollama")) is None
+    assert registry.snapshot()["status"] == "degraded"
+
+
+def test_unknown_dependency_is_ignored():
+    DependencyRegistry().report_failure("missing", RuntimeError("x"), force_open=True)
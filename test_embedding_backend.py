@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires du choix du backend d'embedding (api/core/embedding_backend.py) :
+repli sur torch et identifiant de l'espace vectoriel utilisé par les caches.
+
+Usage (depuis la racine du dépôt, dépendances de l'API installées) :
+    python -m pytest -q test_embedding_backend.py
+"""
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from api.core import embedding_backend  # noqa: E402
+from api.core.embedding_backend import embedding_model_id, load_embedding_model, loaded_backend  # noqa: E402
+
+
+class _FakeModel:
+    """Stands in for SentenceTransformer: ONNX loads fail when onnx_available is False."""
+    onnx_available = True
+
+    def __init__(self, model_name, backend="torch", model_kwargs=None):
+        if backend == "onnx" and not _FakeModel.onnx_available:
+            raise RuntimeError("onnxruntime is not installed")
+        self.model_name = model_name
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    monkeypatch.setattr(embedding_backend, "SentenceTransformer", _FakeModel)
+    monkeypatch.setattr(_FakeModel, "onnx_available", True)
+    return _FakeModel
+
+
+def test_requested_backend_is_recorded(fake_model):
+    model = load_embedding_model("m", backend="onnx-int8")
+    assert loaded_backend(model) == "onnx-int8"
+    assert embedding_model_id("m", loaded_backend(model)) == "m@int8"
+
+
+def test_int8_fallback_to_torch_keeps_the_fp32_id(fake_model, tmp_path):
+    fake_model.onnx_available = False
+    model = load_embedding_model("m", backend="onnx-int8", export_dir=str(tmp_path))
+    assert loaded_backend(model) == "torch"
+    assert embedding_model_id("m", loaded_backend(model)) == "m"
+
+
+def test_unknown_backend_uses_torch(fake_model):
+    assert loaded_backend(load_embedding_model("m", backend="tpu")) == "torch"
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires du titre de conversation construit sans LLM
+(api/services/history_service.py, réponses dégradées).
+
+Usage (depuis la racine du dépôt, dépendances de l'API installées) :
+    python -m pytest -q test_history_service.py
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("ollama")
+pytest.importorskip("sentence_transformers")
+
+from api.schemas.message import Message  # noqa: E402
+from api.services import history_service  # noqa: E402
+
+
+def _title(*contents):
+    roles = ["user", "assistant"]
+    messages = [Message(role=roles[i % 2], content=content) for i, content in enumerate(contents)]
+    return asyncio.run(history_service.generate_conversation_title(messages, use_llm=False))
+
+
+def test_title_without_llm_never_calls_the_gateway(monkeypatch):
+    async def no_gateway():
+        raise AssertionError("LLM gateway must not be used")
+    monkeypatch.setattr(history_service, "get_ollama_client", no_gateway)
+    assert _title("Quels sont les champs de CLIENT_QT ?", "...") == "Sujet : Quels sont les champs de CLIENT_QT"
+
+
+def test_long_questions_are_cut_to_50_characters():
+    title = _title("Quelle est la règle de gestion appliquée au champ NUM_CLIENT dans le flux FLX_CLIENTS ?")
+    assert len(title) == 50 and title.endswith("...") and title.startswith("Sujet : Quelle est")
+
+
+def test_empty_questions_keep_the_default_title():
+    assert _title("?") == "Nouvelle conversation"
+    assert _title("   ") == "Nouvelle conversation"
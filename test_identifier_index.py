@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires de l'index trigramme des identifiants (api/core/identifier_index.py).
+
+Usage (depuis la racine du dépôt) :
+    python -m pytest -q test_identifier_index.py
+"""
+import pytest
+
+from api.core.identifier_index import IdentifierIndex, compact, looks_like_identifier
+
+CATALOG = ["CLIENT", "CLIENT_QT", "DATE", "DEVISE", "PROFESSION", "NUM_COMPTE", "DATE_NAISSANCE", "FLX_CARTES_01"]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return IdentifierIndex(CATALOG)
+
+
+def test_compact_ignores_case_accents_and_separators():
+    assert compact("Clïent_QT") == compact("client qt") == "clientqt"
+
+
+def test_looks_like_identifier():
+    assert looks_like_identifier("CLIENT_QT") and looks_like_identifier("FLX01") and looks_like_identifier("DEVISE")
+    assert not looks_like_identifier("client") and not looks_like_identifier("Devise")
+
+
+def test_best_match_tolerates_typos(index):
+    assert index.best_match("CLIEN_QT", 0.6)[0] == "CLIENT_QT"
+    assert index.best_match("FLX_CARTE_01", 0.6)[0] == "FLX_CARTES_01"
+    assert index.best_match("TRESORERIE", 0.6) is None
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("client cute", "CLIENT_QT"),                               # Transcription Whisper : la fenêtre la plus longue gagne
+    ("num compte du client qt", "NUM_COMPTE du CLIENT_QT"),
+    ("date naissance", "DATE_NAISSANCE"),
+    ("client qt actifs", "CLIENT_QT actifs"),                   # « actifs » n'est pas absorbé
+])
+def test_rewrite_resolves_mentions(index, query, expected):
+    assert index.rewrite(query)[0] == expected
+
+
+@pytest.mark.parametrize("query", [
+    "date de naissance",      # DATE est un mot courant : jamais substitué
+    "les clients actifs",     # Pluriel d'un identifiant mot simple
+    "la devise du compte",
+    "profession du client",
+    "CLIENT_QT",              # Déjà bien écrit
+    "client_qt",              # Ne diffère que par la casse
+])
+def test_rewrite_leaves_plain_words_and_correct_spellings(index, query):
+    assert index.rewrite(query) == (query, [])
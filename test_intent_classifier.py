@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires du classifieur d'intentions (api/services/intent_classifier.py)
+avec un modèle d'embedding simulé.
+
+Usage (depuis la racine du dépôt, dépendances de l'API installées) :
+    python -m pytest -q test_intent_classifier.py
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sentence_transformers")
+
+from api.services.intent_classifier import IntentClassifier  # noqa: E402
+
+
+class _FakeModel:
+    """One axis per intent: examples starting with 'a' -> x axis, with 'b' -> y axis."""
+
+    def encode(self, texts, show_progress_bar=False):
+        return np.array([[3.0, 0.1] if text.startswith("a") else [0.1, 2.0] for text in texts], dtype=np.float32)
+
+
+def test_classify_returns_the_nearest_centroid_with_its_margin():
+    classifier = IntentClassifier.from_examples(_FakeModel(), {"alpha": ["a1", "a2"], "beta": ["b1"]})
+    intent, similarity, margin = classifier.classify([5.0, 0.0])
+    assert intent == "alpha"
+    assert similarity == pytest.approx(1.0, abs=1e-2)
+    assert margin > 0.5
+
+
+def test_classify_does_not_modify_the_query_embedding():
+    classifier = IntentClassifier.from_examples(_FakeModel(), {"alpha": ["a1"], "beta": ["b1"]})
+    cached = np.array([4.0, 3.0], dtype=np.float32)  # e.g. an array held by the query embedding cache
+    classifier.classify(cached)
+    assert cached.tolist() == [4.0, 3.0]
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires du graphe de lignage (api/services/lineage_graph.py) :
+déduplication catalogue/Atlas, parcours amont/aval à k sauts, cycles et
+réponses aux questions de lignage.
+
+Usage (depuis la racine du dépôt, dépendances de l'API installées) :
+    python -m pytest -q test_lineage_graph.py
+"""
+import pytest
+
+pytest.importorskip("qdrant_client")
+pytest.importorskip("sentence_transformers")
+
+from api.services import lineage_graph  # noqa: E402
+from api.services.lineage_graph import LineageGraphBuilder  # noqa: E402
+
+
+def _flow(flow, source, source_field, target, target_field, rule=""):
+    return {"Nom Flux": flow, "Nom SD Source": source, "Nom Champ SD Source": source_field,
+            "Nom SD Cible": target, "Nom Champ Cible": target_field, "Règle de Gestion": rule}
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    builder = LineageGraphBuilder()
+    builder.add_flow_row(_flow("FLX_CLIENTS", "CRM", "ID_CLI", "CLIENT_QT", "NUM_CLIENT", "trim"))
+    builder.add_flow_row(_flow("FLX_DWH", "CLIENT_QT", "NUM_CLIENT", "DWH_CLIENT", "CLIENT_ID"))
+    builder.add_flow_row(_flow("FLX_VIDE", "CRM", "nan", "CLIENT_QT", "NUM_CLIENT"))  # Champ source absent : ignoré
+    # Le même mapping décrit par le Process Atlas créé depuis le Référentiel Flux
+    builder.add_atlas_process({"name": "FLX_CLIENTS", "custom_nom_sd_source": "CRM", "custom_nom_champ_source": "ID_CLI",
+                               "custom_nom_sd_cible": "CLIENT_QT", "custom_nom_champ_cible": "NUM_CLIENT"})
+    # Process Atlas générique, au niveau dataset
+    builder.add_atlas_process({"name": "EXPORT_BI", "lineage_inputs": ["datasource.DWH_CLIENT@bank"],
+                               "lineage_outputs": ["column.BI_CLIENTS.CLIENT_KEY@bank"]})
+    graph = builder.build()
+    monkeypatch.setattr(lineage_graph, "_graph", graph)
+    monkeypatch.setattr(lineage_graph.settings, "LINEAGE_ENABLED", True)
+    return graph
+
+
+def _labels(graph, steps):
+    return [(depth, graph.labels[node], graph.labels[mapping], graph.labels[next_node])
+            for depth, node, mapping, next_node in steps]
+
+
+def test_catalog_and_atlas_mappings_are_deduplicated(graph):
+    assert graph.edge_count == 6  # 3 mappings x (entrée + sortie)
+    assert sorted(name for name, _ in graph.suggestions()) == ["EXPORT_BI", "FLX_CLIENTS", "FLX_DWH"]
+
+
+def test_downstream_walk_is_bounded_by_hops(graph):
+    start, _ = graph.nodes_in("crm.id_cli")
+    assert _labels(graph, graph.downstream(start, hops=1)) == [(1, "CRM.ID_CLI", "FLX_CLIENTS", "CLIENT_QT.NUM_CLIENT")]
+    assert [step[3] for step in _labels(graph, graph.downstream(start, hops=2))][-1] == "DWH_CLIENT.CLIENT_ID"
+
+
+def test_upstream_walk(graph):
+    start, names = graph.nodes_in("d'ou vient client_id ?")
+    assert names == ["client_id"]
+    assert [label[3] for label in _labels(graph, graph.upstream(start, hops=3))] == ["CLIENT_QT.NUM_CLIENT", "CRM.ID_CLI"]
+
+
+def test_cycles_do_not_loop_forever():
+    builder = LineageGraphBuilder()
+    builder.add_flow_row(_flow("ALLER", "A", "X", "B", "Y"))
+    builder.add_flow_row(_flow("RETOUR", "B", "Y", "A", "X"))
+    graph = builder.build()
+    start, _ = graph.nodes_in("a.x")
+    assert len(graph.downstream(start, hops=10)) == 2
+
+
+def test_answer_lists_the_upstream_links_with_their_rule(graph):
+    result = lineage_graph.answer("D'où vient le champ NUM_CLIENT ?")
+    assert result.startswith("## Lignage amont de **num_client**")
+    assert "| 1 | CRM.ID_CLI | FLX_CLIENTS | trim | CLIENT_QT.NUM_CLIENT |" in result
+
+
+def test_typographic_apostrophe_is_an_upstream_question(graph):
+    result = lineage_graph.answer("D’où vient le champ NUM_CLIENT ?")
+    assert result.startswith("## Lignage amont de **num_client**")
+
+
+def test_answer_downstream_of_a_whole_source(graph):
+    result = lineage_graph.answer("Quelles cibles alimente la source DWH_CLIENT ?")
+    assert "EXPORT_BI" in result and "BI_CLIENTS.CLIENT_KEY" in result
+
+
+def test_non_lineage_open_or_unknown_questions(graph):
+    assert lineage_graph.answer("Quel est le type de NUM_CLIENT ?") is None
+    assert lineage_graph.answer("Pourquoi NUM_CLIENT alimente DWH_CLIENT ?") is None
+    assert lineage_graph.answer("D'où vient le champ INCONNU ?") is None
+
+
+def test_context_for_the_rag(graph):
+    context = lineage_graph.context_for("Que contient NUM_CLIENT ?")
+    assert context.splitlines() == ["Lignage (source -> flux -> cible):",
+                                    "CRM.ID_CLI -> FLX_CLIENTS (trim) -> CLIENT_QT.NUM_CLIENT",
+                                    "CLIENT_QT.NUM_CLIENT -> FLX_DWH -> DWH_CLIENT.CLIENT_ID"]
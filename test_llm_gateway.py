@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires de la passerelle LLM (api/core/llm_gateway.py) avec des
+clients Ollama simulés : limite par hôte, priorités, coalescence et annulation
+d'une génération abandonnée par tous ses appelants.
+
+Usage (depuis la racine du dépôt) :
+    python -m pytest -q test_llm_gateway.py
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("ollama")
+
+from api.core.llm_gateway import LLMGateway, LLMPriority  # noqa: E402
+
+
+class _FakeClient:
+    def __init__(self, host, log):
+        self.host = host
+        self.log = log
+        self.release = asyncio.Event()
+        self.active = 0
+        self.cancelled = 0
+
+    async def chat(self, model, messages, **kwargs):
+        self.active += 1
+        self.log.append((self.host, messages[0]["content"]))
+        try:
+            await self.release.wait()
+            return {"message": {"content": f"{self.host}:{messages[0]['content']}"}}
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.active -= 1
+
+
+def _gateway(hosts, per_host):
+    gateway = LLMGateway(hosts, timeout=5, max_in_flight_per_host=per_host)
+    log = []
+    gateway._clients = {host: _FakeClient(host, log) for host in hosts}
+    return gateway, log
+
+
+def _ask(gateway, text, priority=LLMPriority.INTERACTIVE):
+    return asyncio.create_task(gateway.chat(model="m", messages=[{"role": "user", "content": text}], priority=priority))
+
+
+def test_limit_is_per_host():
+    async def scenario():
+        gateway, _ = _gateway(["h1", "h2"], per_host=1)
+        tasks = [_ask(gateway, f"q{i}") for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert [client.active for client in gateway._clients.values()] == [1, 1]
+        assert gateway.queue_depth == 1
+        for client in gateway._clients.values():
+            client.release.set()
+        await asyncio.gather(*tasks)
+    asyncio.run(scenario())
+
+
+def test_interactive_calls_are_served_before_background_ones():
+    async def scenario():
+        gateway, log = _gateway(["h1"], per_host=1)
+        first = _ask(gateway, "first")
+        await asyncio.sleep(0.01)
+        background = _ask(gateway, "title", LLMPriority.BACKGROUND)
+        interactive = _ask(gateway, "answer")
+        await asyncio.sleep(0.01)
+        gateway._clients["h1"].release.set()
+        await asyncio.gather(first, background, interactive)
+        assert [text for _, text in log] == ["first", "answer", "title"]
+    asyncio.run(scenario())
+
+
+def test_generation_is_cancelled_when_every_caller_gives_up():
+    async def scenario():
+        gateway, _ = _gateway(["h1"], per_host=1)
+        client = gateway._clients["h1"]
+        callers = [_ask(gateway, "same"), _ask(gateway, "same")]
+        await asyncio.sleep(0.01)
+        assert gateway.coalesced_requests == 1
+        callers[0].cancel()
+        await asyncio.sleep(0.01)
+        assert client.cancelled == 0  # The other caller still waits for it
+        callers[1].cancel()
+        await asyncio.sleep(0.01)
+        assert client.cancelled == 1 and gateway.stats()["abandoned_generations"] == 1
+        # The slot is free again for the next call
+        client.release.set()
+        assert (await _ask(gateway, "next"))["message"]["content"] == "h1:next"
+    asyncio.run(scenario())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires du rendu Markdown -> HTML des réponses du LLM
+(api/services/markdown_renderer.py).
+
+Le module n'a aucune dépendance : il est chargé directement depuis son fichier,
+car importer le paquet api.services charge toute l'API (Ollama, Qdrant...).
+
+Usage (depuis la racine du dépôt) :
+    python -m pytest -q test_markdown_renderer.py
+"""
+import importlib.util
+import os
+
+_spec = importlib.util.spec_from_file_location(
+    "markdown_renderer", os.path.join(os.path.dirname(__file__), "api", "services", "markdown_renderer.py")
+)
+markdown_renderer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(markdown_renderer)
+render = markdown_renderer.render
+
+
+def test_headings_are_capped_at_h3():
+    assert render("# Titre\n#### Détail") == "<h1>Titre</h1><h3>Détail</h3>"
+
+
+def test_lists_switch_between_bullets_and_numbers():
+    assert render("- a\n* b\n1. c\n2) d") == "<ul><li>a</li><li>b</li></ul><ol><li>c</li><li>d</li></ol>"
+
+
+def test_paragraph_lines_are_joined_and_blocks_split_on_blank_lines():
+    assert render("ligne 1\nligne 2\n\nsuite") == "<p>ligne 1<br>ligne 2</p><p>suite</p>"
+
+
+def test_inline_bold_italic_and_code():
+    assert render("**Source** : *table* `CLIENT`") == \
+        "<p><strong>Source</strong> : <em>table</em> <code>CLIENT</code></p>"
+
+
+def test_identifiers_with_underscores_are_not_italicized():
+    assert render("Champs NUM_CLIENT_QT et DATE_NAISSANCE") == "<p>Champs NUM_CLIENT_QT et DATE_NAISSANCE</p>"
+
+
+def test_tables_with_separator_row():
+    html = render("| Champ | Type |\n|---|:---:|\n| CLIENT | VARCHAR |\n| DATE | DATE |")
+    assert html == ("<table><tr><th>Champ</th><th>Type</th></tr>"
+                    "<tr><td>CLIENT</td><td>VARCHAR</td></tr><tr><td>DATE</td><td>DATE</td></tr></table>")
+
+
+def test_pipe_line_without_separator_stays_a_paragraph():
+    assert render("| pas un tableau |") == "<p>| pas un tableau |</p>"
+
+
+def test_html_in_the_answer_is_escaped():
+    assert render("<script>alert(1)</script> & co") == "<p>&lt;script&gt;alert(1)&lt;/script&gt; &amp; co</p>"
+
+
+def test_html_answers_and_empty_answers_are_returned_unchanged():
+    assert render("<p>Déjà en HTML</p>") == "<p>Déjà en HTML</p>"
+    assert render("") == ""
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires du chargement du tokenizer de prompt au démarrage
+(api/services/prompt_budget.py) et de l'estimation utilisée en attendant.
+
+Usage (depuis la racine du dépôt, dépendances de l'API installées) :
+    python -m pytest -q test_prompt_budget.py
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("ollama")
+pytest.importorskip("sentence_transformers")
+
+from api.services import prompt_budget  # noqa: E402
+
+
+class _WordTokenizer:
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+    def decode(self, token_ids):
+        return " ".join(token_ids)
+
+
+@pytest.fixture(autouse=True)
+def _reset(monkeypatch):
+    monkeypatch.setattr(prompt_budget, "_tokenizer", None)
+    monkeypatch.setattr(prompt_budget, "_load_task", None)
+
+
+def test_character_estimate_until_the_tokenizer_is_loaded():
+    assert prompt_budget.count_tokens("a" * 10) == 4
+    assert prompt_budget.truncate_to_tokens("abcdefghij", 2) == "abcdef..."
+
+
+def test_tokenizer_is_loaded_off_the_event_loop_at_startup(monkeypatch):
+    monkeypatch.setattr(prompt_budget, "_load_prompt_tokenizer", _WordTokenizer)
+
+    async def startup():
+        prompt_budget.start_loading()
+        await prompt_budget._load_task
+
+    asyncio.run(startup())
+    assert isinstance(prompt_budget.get_prompt_tokenizer(), _WordTokenizer)
+    assert prompt_budget.count_tokens("trois mots ici") == 3
+    assert prompt_budget.truncate_to_tokens("un deux trois", 2) == "un deux..."
+
+
+def test_failed_load_keeps_the_estimate(monkeypatch):
+    monkeypatch.setattr(prompt_budget, "_load_prompt_tokenizer", lambda: None)
+
+    async def startup():
+        prompt_budget.start_loading()
+        await prompt_budget._load_task
+
+    asyncio.run(startup())
+    assert prompt_budget.get_prompt_tokenizer() is None
+    assert prompt_budget.count_tokens("abcdef") == 2
+
+
+def test_default_request_deadline_fits_the_longest_generation(monkeypatch):
+    settings = prompt_budget.settings
+    monkeypatch.setattr(settings, "RAG_REQUEST_DEADLINE_SECONDS", 0.0)
+    longest = prompt_budget.derive_generation_params(100_000)["timeout"]
+    assert settings.rag_request_deadline_seconds - settings.RAG_RETRIEVAL_ALLOWANCE_SECONDS >= longest
+    monkeypatch.setattr(settings, "RAG_REQUEST_DEADLINE_SECONDS", 20.0)
+    assert settings.rag_request_deadline_seconds == 20.0
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires de l'initialisation des collections Qdrant
+(api/services/qdrant_collections.py) avec un client Qdrant simulé.
+
+Usage (depuis la racine du dépôt, dépendances de l'API installées) :
+    python -m pytest -q test_qdrant_collections.py
+"""
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("qdrant_client")
+pytest.importorskip("sentence_transformers")
+
+from api.core import qdrant_collections  # noqa: E402
+
+
+class _FakeClient:
+    """Records create/update calls; get_collection returns the given live config."""
+
+    def __init__(self, exists=True, m=16, ef_construct=100, indexing_threshold=20000, quantization=None, payload_schema=None):
+        self.exists = exists
+        self.payload_schema = payload_schema or {"source_sheet": "keyword"}
+        self.index_schemas = {}
+        self.config = SimpleNamespace(
+            hnsw_config=SimpleNamespace(m=m, payload_m=None, ef_construct=ef_construct),
+            optimizer_config=SimpleNamespace(indexing_threshold=indexing_threshold),
+            quantization_config=quantization,
+        )
+        self.calls = []
+
+    def collection_exists(self, collection_name):
+        return self.exists
+
+    def get_collection(self, collection_name):
+        return SimpleNamespace(config=self.config, payload_schema=self.payload_schema)
+
+    def create_collection(self, **kwargs):
+        self.calls.append(("create", kwargs))
+
+    def update_collection(self, **kwargs):
+        self.calls.append(("update", kwargs))
+
+    def create_payload_index(self, **kwargs):
+        self.calls.append(("index", kwargs["field_name"]))
+        self.index_schemas[kwargs["field_name"]] = kwargs["field_schema"]
+
+    def delete_payload_index(self, **kwargs):
+        self.calls.append(("drop_index", kwargs["field_name"]))
+
+
+@pytest.fixture(autouse=True)
+def _settings(monkeypatch):
+    for name, value in {"QDRANT_HNSW_M": 16, "QDRANT_HNSW_EF_CONSTRUCT": 100,
+                        "QDRANT_INDEXING_THRESHOLD_KB": 20000, "QDRANT_QUANTIZATION": "none"}.items():
+        monkeypatch.setattr(qdrant_collections.settings, name, value)
+
+
+def _ensure(client):
+    qdrant_collections.ensure_collection(client, "catalog", 384, {"source_sheet": "keyword", "file_id": "keyword"})
+
+
+def test_matching_collection_is_left_alone():
+    client = _FakeClient()
+    _ensure(client)
+    assert client.calls == [("index", "file_id")]
+
+
+def test_changed_hnsw_and_optimizer_settings_are_applied():
+    client = _FakeClient(m=8, indexing_threshold=10000)
+    _ensure(client)
+    (kind, update), = [call for call in client.calls if call[0] == "update"]
+    assert update["hnsw_config"].m == 16 and update["optimizers_config"].indexing_threshold == 20000
+    assert "quantization_config" not in update
+
+
+def test_every_call_checks_the_live_collection():
+    client = _FakeClient()
+    _ensure(client)
+    client.config.hnsw_config.ef_construct = 64  # Recreated elsewhere with other settings
+    _ensure(client)
+    assert [kind for kind, _ in client.calls].count("update") == 1
+
+
+def test_missing_collection_is_created_with_the_settings():
+    client = _FakeClient(exists=False)
+    _ensure(client)
+    (kind, create), = [call for call in client.calls if call[0] == "create"]
+    assert create["hnsw_config"].m == 16 and create["vectors_config"].size == 384
+
+
+def test_existing_file_id_index_becomes_a_tenant_index():
+    plain_keyword = SimpleNamespace(data_type="keyword", params=None)
+    client = _FakeClient(payload_schema={"file_id": plain_keyword, "conversation_id": plain_keyword})
+    qdrant_collections.ensure_collection(client, "user_files", 384, {"file_id": "keyword", "conversation_id": "keyword"}, tenant_field="file_id")
+    assert [call for call in client.calls if call[0] != "update"] == [("drop_index", "file_id"), ("index", "file_id")]
+    assert client.index_schemas["file_id"].is_tenant is True
+
+
+def test_tenant_index_is_left_alone():
+    tenant_keyword = SimpleNamespace(data_type="keyword", params=SimpleNamespace(is_tenant=True))
+    client = _FakeClient(payload_schema={"file_id": tenant_keyword})
+    qdrant_collections.ensure_collection(client, "user_files", 384, {"file_id": "keyword"}, tenant_field="file_id")
+    assert [call for call in client.calls if call[0] != "update"] == []
+
+
+def test_quantization_setting_is_case_insensitive(monkeypatch):
+    monkeypatch.setattr(qdrant_collections.settings, "QDRANT_QUANTIZATION", "None")
+    assert qdrant_collections.search_params() is None
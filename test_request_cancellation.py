@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires de l'annulation d'une requête de chat quand le client se
+déconnecte (api/services/request_cancellation.py), avec une requête ASGI simulée.
+
+Usage (depuis la racine du dépôt, dépendances de l'API installées) :
+    python -m pytest -q test_request_cancellation.py
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("ollama")
+pytest.importorskip("qdrant_client")
+
+from api.services.rag_service import ClientDisconnectedError  # noqa: E402
+from api.services.request_cancellation import run_until_disconnected  # noqa: E402
+
+
+class _FakeRequest:
+    """Only receive() is used: it returns http.disconnect once `disconnect` is set."""
+
+    def __init__(self, fail: bool = False):
+        self.disconnect = asyncio.Event()
+        self.fail = fail
+
+    async def receive(self):
+        if self.fail:
+            raise RuntimeError("receive channel closed")
+        await self.disconnect.wait()
+        return {"type": "http.disconnect"}
+
+
+class _Work:
+    def __init__(self, seconds: float, result="answer"):
+        self.seconds = seconds
+        self.result = result
+        self.cancelled = False
+
+    async def run(self):
+        try:
+            await asyncio.sleep(self.seconds)
+            return self.result
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def test_result_is_returned_when_the_client_stays():
+    async def scenario():
+        work = _Work(0.01)
+        assert await run_until_disconnected(_FakeRequest(), work.run()) == "answer"
+        assert not work.cancelled
+    asyncio.run(scenario())
+
+
+def test_work_is_cancelled_when_the_client_disconnects():
+    async def scenario():
+        request, work = _FakeRequest(), _Work(10)
+        asyncio.get_running_loop().call_later(0.01, request.disconnect.set)
+        with pytest.raises(ClientDisconnectedError):
+            await run_until_disconnected(request, work.run())
+        assert work.cancelled
+    asyncio.run(scenario())
+
+
+def test_broken_watcher_does_not_cancel_the_work():
+    async def scenario():
+        work = _Work(0.02)
+        assert await run_until_disconnected(_FakeRequest(fail=True), work.run()) == "answer"
+        assert not work.cancelled
+    asyncio.run(scenario())
+
+
+def test_cancelling_the_handler_cancels_the_work():
+    async def scenario():
+        work = _Work(10)
+        handler = asyncio.create_task(run_until_disconnected(_FakeRequest(), work.run()))
+        await asyncio.sleep(0.01)
+        handler.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await handler
+        await asyncio.sleep(0)
+        assert work.cancelled
+    asyncio.run(scenario())
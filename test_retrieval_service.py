@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires de la recherche parallèle (api/services/retrieval_service.py).
+
+Usage (depuis la racine du dépôt, dépendances de l'API installées) :
+    python -m pytest -q test_retrieval_service.py
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("qdrant_client")
+pytest.importorskip("sentence_transformers")
+
+from api.services import retrieval_service  # noqa: E402
+
+
+class _RecordingClient:
+    """Async Qdrant client stub that records the search arguments."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def search(self, **kwargs):
+        self.calls.append(kwargs)
+        return []
+
+
+def test_user_files_search_is_restricted_to_the_caller():
+    client = _RecordingClient()
+    asyncio.run(retrieval_service.search_user_files([0.1, 0.2], client, "conv-1", user_id=42))
+    conditions = {condition.key: condition.match.value for condition in client.calls[0]["query_filter"].must}
+    assert conditions == {"conversation_id": "conv-1", "user_id": 42}
+
+
+def test_normalize_scores_spreads_a_source_over_its_range():
+    candidates = [("a", "A", 0.9, None), ("b", "B", 0.5, None), ("c", "C", 0.7, None)]
+    scores = [score for _, _, score, _ in retrieval_service.normalize_scores(candidates, weight=2.0)]
+    assert scores == pytest.approx([2.0, 0.0, 1.0])
+
+
+def test_single_hit_is_not_promoted_to_the_top_score():
+    (_, _, score, _), = retrieval_service.normalize_scores([("a", "A", 0.12, None)])
+    assert score < 1.0
+    ranked, _ = asyncio.run(retrieval_service.fan_out({
+        "catalog": _result([("c1", "strong", 0.9, None), ("c2", "weak", 0.4, None)]),
+        "atlas": _result([("x", "lone", 0.12, None)]),
+    }, limit=3))
+    assert ranked[0][1] == "strong"
+
+
+async def _result(candidates):
+    return candidates
+
+
+def _collections(client):
+    return [call["collection_name"] for call in client.calls]
+
+
+def test_catalog_search_starts_before_the_conversation_is_loaded():
+    pytest.importorskip("ollama")
+    from api.core import qdrant_collections
+    from api.services import rag_service
+
+    async def scenario():
+        client = _RecordingClient()
+        conversation = asyncio.get_running_loop().create_future()
+        retrieval = asyncio.create_task(rag_service._retrieve_candidates(
+            [0.1, 0.2], client, "question", "conv-1", 42, 5, conversation_ready=conversation
+        ))
+        for _ in range(5):
+            await asyncio.sleep(0)
+        searched_before_load = _collections(client)
+        conversation.set_result(object())  # Conversation owned by user 42
+        await retrieval
+        return searched_before_load, _collections(client)
+
+    before, after = asyncio.run(scenario())
+    assert rag_service.settings.QDRANT_COLLECTION_NAME in before
+    assert qdrant_collections.user_files_collection_name() not in before
+    assert qdrant_collections.user_files_collection_name() in after
+
+
+def test_conversation_files_are_skipped_when_not_owned():
+    pytest.importorskip("ollama")
+    from api.core import qdrant_collections
+    from api.services import rag_service
+
+    async def scenario():
+        client = _RecordingClient()
+        conversation = asyncio.get_running_loop().create_future()
+        conversation.set_result(None)  # Conversation not found for this user
+        await rag_service._retrieve_candidates([0.1, 0.2], client, "question", "conv-1", 42, 5, conversation_ready=conversation)
+        return _collections(client)
+
+    assert qdrant_collections.user_files_collection_name() not in asyncio.run(scenario())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires de l'index de préfixes de l'autocomplétion du catalogue
+(api/core/suggest_index.py).
+
+Usage (depuis la racine du dépôt) :
+    python -m pytest -q test_suggest_index.py
+"""
+import pytest
+
+from api.core.suggest_index import SuggestIndex, fold
+
+ENTRIES = [
+    ("CLIENT", "field"), ("CLIENT", "field"), ("CLIENT", "field"),
+    ("CLIENT_QT", "field"),
+    ("Clients Particuliers", "source"),
+    ("NUM_CLIENT", "field"),
+    ("Référentiel Clients", "glossary"),
+    ("FLX_CLIENTS_01", "flux"),
+    ("DATE_NAISSANCE", "field"),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SuggestIndex(ENTRIES, max_limit=5)
+
+
+def test_fold_ignores_case_accents_and_extra_spaces():
+    assert fold("  Référentiel   CLIENTS ") == "referentiel clients"
+
+
+def test_duplicates_are_merged_per_kind(index):
+    assert len(index) == len(set(ENTRIES))
+
+
+def test_exact_match_comes_first_then_name_prefixes(index):
+    names = [name for name, _ in index.suggest("client", limit=5)]
+    assert names[0] == "CLIENT"
+    # Débuts de nom avant les débuts de mot intérieur
+    assert set(names[1:3]) == {"CLIENT_QT", "Clients Particuliers"}
+    assert set(names[3:]) <= {"NUM_CLIENT", "Référentiel Clients", "FLX_CLIENTS_01"}
+
+
+def test_inner_word_starts_are_reachable(index):
+    assert ("CLIENT_QT", "field") in index.suggest("qt")
+    assert ("FLX_CLIENTS_01", "flux") in index.suggest("01")
+    assert ("DATE_NAISSANCE", "field") in index.suggest("naiss")
+
+
+def test_accents_are_folded(index):
+    assert index.suggest("REFE") == [("Référentiel Clients", "glossary")]
+
+
+def test_limit_is_clamped_to_max_limit(index):
+    assert len(index.suggest("c", limit=50)) == 5
+    assert len(index.suggest("c", limit=0)) == 1
+
+
+def test_empty_or_unknown_queries(index):
+    assert index.suggest("   ") == []
+    assert index.suggest("zzz") == []
+
+
+def test_unknown_kinds_and_empty_names_are_ignored():
+    assert len(SuggestIndex([("X", "table"), ("", "field"), (None, "field"), ("Y", "field")])) == 1
+
+
+def test_precomputed_rankings_match_a_full_scan():
+    # Assez de noms en "cli_" pour dépasser le seuil de précalcul
+    entries = [(f"CLI_{i:04d}", "field") for i in range(600)] + [("CLI", "source")] * 2
+    entries += [(f"X_CLI_{i}", "field") for i in range(300)]
+    big = SuggestIndex(entries, max_limit=20)
+    assert "cli" in big._precomputed and "c" in big._precomputed
+    for prefix in ("c", "cl", "cli", "cli_", "cli_0"):
+        start = next(i for i, key in enumerate(big.keys) if key.startswith(prefix))
+        end = max(i for i, key in enumerate(big.keys) if key.startswith(prefix)) + 1
+        expected = [(big.names[i], big.kinds[i]) for i in big._rank(start, end, prefix, 20)]
+        assert big.suggest(prefix, limit=20) == expected
+    assert big.suggest("cli", limit=1) == [("CLI", "source")]